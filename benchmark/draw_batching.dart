@@ -0,0 +1,82 @@
+import 'dart:ffi';
+import 'dart:io';
+import '../bin/codegen/libRenderWindow.dart';
+import '../bin/CodegenRuntime.dart';
+
+// A busy frame's worth of draw calls, through the generated RenderWindow (which batches them,
+// so the whole frame is one FFI call) & straight through the library (one FFI call each), and
+// how long a frame takes each way. Runs against the SDL-free stub, so it doesn't need a display:
+//   make bench-batching
+// or, after `make headless`:
+//   BEANS_BUILD_DIR=build/debug/headless dart run benchmark/draw_batching.dart [frames]
+//
+// The stub hashes every call it gets, so this fails if the two ways don't draw exactly the same thing.
+
+typedef _colour_native_sig = Void Function(Pointer<Void>, Int32, Int32, Int32, Int32);
+typedef _colour_sig = void Function(Pointer<Void>, int, int, int, int);
+typedef _stat_native_sig = Int64 Function();
+typedef _stat_sig = int Function();
+
+final _lib = DynamicLibrary.open(nativeLibraryPath(libRenderWindowPath));
+final _setColour = _lib.lookupFunction<_colour_native_sig, _colour_sig>('SetColour');
+// same signature as SetColour
+final _drawLine = _lib.lookupFunction<_colour_native_sig, _colour_sig>('DrawLine');
+final _fillRect = _lib.lookupFunction<_colour_native_sig, _colour_sig>('FillRect');
+final _callCount = _lib.lookupFunction<_stat_native_sig, _stat_sig>('StubCallCount');
+final _checksum = _lib.lookupFunction<_stat_native_sig, _stat_sig>('StubChecksum');
+final _reset = _lib.lookupFunction<Void Function(), void Function()>('StubReset');
+
+// 3 calls each, so 300 a frame
+const _shapesPerFrame = 100;
+
+void _batchedFrame(RenderWindow rw, int frame) {
+  for (var i = 0; i < _shapesPerFrame; i++) {
+    rw.cSetColour(i, 255 - i, frame % 256, 255);
+    rw.cFillRect(i * 10, i * 5, 40, 20);
+    rw.cDrawLine(0, i, 1919, i + frame % 7);
+  }
+  rw.Flush();
+}
+
+void _directFrame(RenderWindow rw, int frame) {
+  final ptr = rw.structPointer;
+  for (var i = 0; i < _shapesPerFrame; i++) {
+    _setColour(ptr, i, 255 - i, frame % 256, 255);
+    _fillRect(ptr, i * 10, i * 5, 40, 20);
+    _drawLine(ptr, 0, i, 1919, i + frame % 7);
+  }
+  rw.Flush();
+}
+
+// (us per frame, calls the stub saw, checksum)
+List<num> _run(String name, RenderWindow rw, void Function(RenderWindow, int) frame, int frames) {
+  _reset();
+  final stopwatch = Stopwatch()..start();
+  for (var i = 0; i < frames; i++) {
+    frame(rw, i);
+  }
+  stopwatch.stop();
+  final perFrame = stopwatch.elapsedMicroseconds / frames;
+  print('$name: ${perFrame.toStringAsFixed(1)}us/frame (${_callCount()} calls)');
+  return [perFrame, _callCount(), _checksum()];
+}
+
+void main(List<String> args) {
+  final frames = args.isNotEmpty ? int.parse(args[0]) : 2000;
+  final rw = RenderWindow('bench');
+
+  // once each to warm up, so neither one pays for the lookups & JIT
+  _run('warmup (direct)', rw, _directFrame, 10);
+  _run('warmup (batched)', rw, _batchedFrame, 10);
+
+  final direct = _run('direct', rw, _directFrame, frames);
+  final batched = _run('batched', rw, _batchedFrame, frames);
+  print('batched is ${(direct[0] / batched[0]).toStringAsFixed(2)}x as fast');
+
+  if (direct[1] != batched[1] || direct[2] != batched[2]) {
+    print('MISMATCH: the stub saw different calls when they were batched');
+    exitCode = 1;
+  }
+
+  rw.Destroy();
+}
@@ -0,0 +1,113 @@
+import 'dart:ffi';
+import 'dart:io';
+import '../bin/CodegenRuntime.dart';
+
+// How long it takes before every generated binding can be called - opening the libraries & looking
+// up every symbol the bindings use - with one library per .gen file, & with the one libbeans.so
+// that `python codegen/main.py --unified` builds instead. Every run is a fresh process, because
+// dlopen only really loads a library the first time.
+//
+// Needs both built into the same profile's build directory - they don't clash:
+//   python codegen/main.py && make libraries
+//   python codegen/main.py --unified && make libraries
+//   make bench-startup
+// or
+//   BEANS_BUILD_PROFILE=release dart run benchmark/library_loading.dart [runs]
+//
+// The symbols come from the linker maps in native/generated, so it's exactly what the bindings
+// would look up.
+
+const _mapDir = 'native/generated';
+const _unifiedLibrary = 'libbeans.so';
+
+// library path (inside the build directory) -> the symbols the bindings look up in it
+Map<String, List<String>> _perFileLibraries() {
+  final out = <String, List<String>>{};
+  for (final entity in Directory(_mapDir).listSync()) {
+    final name = entity.uri.pathSegments.last;
+    if (!name.endsWith('.map') || name == 'libbeans.map') continue;
+
+    final lines = File(entity.path).readAsLinesSync();
+    // the first line's /* generated for native/SDL/Something.gen */
+    final genFile = lines.first.split(' ')[3];
+    final dir = genFile.substring(0, genFile.lastIndexOf('/'));
+    final id = name.substring(0, name.length - '.map'.length);
+    out['$dir/lib$id.so'] = _symbols(lines);
+  }
+  return out;
+}
+
+List<String> _symbols(List<String> mapLines) {
+  final out = <String>[];
+  var global = false;
+  for (final line in mapLines.map((line) => line.trim())) {
+    if (line == 'global:') {
+      global = true;
+    } else if (line == 'local:') {
+      global = false;
+    } else if (global && line.endsWith(';')) {
+      out.add(line.substring(0, line.length - 1));
+    }
+  }
+  return out;
+}
+
+// microseconds to open libraries & look up all their symbols
+int _load(Map<String, List<String>> libraries) {
+  final stopwatch = Stopwatch()..start();
+  for (final entry in libraries.entries) {
+    final lib = DynamicLibrary.open(nativeLibraryPath(entry.key));
+    for (final symbol in entry.value) {
+      lib.lookup<Void>(symbol);
+    }
+  }
+  stopwatch.stop();
+  return stopwatch.elapsedMicroseconds;
+}
+
+Map<String, List<String>> _librariesFor(String mode) {
+  final perFile = _perFileLibraries();
+  if (mode == 'per-file') return perFile;
+  return {_unifiedLibrary: [for (final symbols in perFile.values) ...symbols]};
+}
+
+Future<List<int>> _runChildren(String mode, int runs) async {
+  final out = <int>[];
+  for (var i = 0; i < runs; i++) {
+    final result = await Process.run(Platform.resolvedExecutable, [Platform.script.toFilePath(), '--child', mode]);
+    if (result.exitCode != 0) {
+      throw Exception('The $mode run failed:\n${result.stderr}');
+    }
+    out.add(int.parse((result.stdout as String).trim()));
+  }
+  return out..sort();
+}
+
+bool _built(Map<String, List<String>> libraries) {
+  final missing = libraries.keys.where((library) => !File(nativeLibraryPath(library)).existsSync()).toList();
+  for (final library in missing) {
+    print('${nativeLibraryPath(library)} isn\'t built');
+  }
+  return missing.isEmpty;
+}
+
+Future<void> main(List<String> args) async {
+  if (args.isNotEmpty && args[0] == '--child') {
+    print(_load(_librariesFor(args[1])));
+    return;
+  }
+
+  final runs = args.isNotEmpty ? int.parse(args[0]) : 20;
+  if (!_built(_librariesFor('per-file')) || !_built(_librariesFor('unified'))) {
+    exitCode = 1;
+    return;
+  }
+
+  final medians = <String, int>{};
+  for (final mode in ['per-file', 'unified']) {
+    final times = await _runChildren(mode, runs);
+    medians[mode] = times[times.length ~/ 2];
+    print('$mode: median ${medians[mode]}us, best ${times.first}us, worst ${times.last}us over $runs runs');
+  }
+  print('unified is ${(medians['per-file']! / medians['unified']!).toStringAsFixed(2)}x as fast to load');
+}
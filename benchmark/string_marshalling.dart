@@ -0,0 +1,71 @@
+import 'dart:ffi';
+import 'dart:io';
+import 'package:ffi/ffi.dart';
+import '../bin/CodegenRuntime.dart';
+
+// Passes the same kind of strings the renderer does every frame (short ASCII labels, plus
+// the odd long or non-ASCII one) to a native function, the way the old generated bindings
+// did & the way they do now, and prints RSS as it goes. The old way leaks every string, so
+// RSS climbs for as long as it runs; with StringScratch it should stay flat.
+//
+// Uses strlen from the C library so it doesn't need SDL or a display:
+//   dart run benchmark/string_marshalling.dart [frames]
+
+typedef _strlen_native_sig = IntPtr Function(Pointer<Utf8>);
+typedef _strlen_sig = int Function(Pointer<Utf8>);
+
+final _strlen = DynamicLibrary.process().lookupFunction<_strlen_native_sig, _strlen_sig>('strlen');
+
+// roughly what a frame's worth of DrawText/GetTextWidth calls look like
+final _frame = <String>[
+  for (var i = 0; i < 40; i++) 'Window $i',
+  'File  Edit  View  Help',
+  'naïve café ünïcödé',
+  'x' * 2000,
+];
+
+int _leaking() {
+  var total = 0;
+  for (final str in _frame) {
+    total += _strlen(str.toNativeUtf8());
+  }
+  return total;
+}
+
+final _scratch = StringScratch();
+
+int _scoped() {
+  var total = 0;
+  for (final str in _frame) {
+    final scope = _scratch.mark();
+    try {
+      total += _strlen(_scratch.encode(str));
+    } finally {
+      _scratch.release(scope);
+    }
+  }
+  return total;
+}
+
+void _run(String name, int Function() frame, int frames) {
+  final stopwatch = Stopwatch()..start();
+  final startRss = ProcessInfo.currentRss;
+  final reportEvery = frames >= 5 ? frames ~/ 5 : 1;
+  var checksum = 0;
+  for (var i = 1; i <= frames; i++) {
+    checksum += frame();
+    if (i % reportEvery == 0) {
+      print('$name: frame $i, RSS ${(ProcessInfo.currentRss / 1e6).toStringAsFixed(1)}MB');
+    }
+  }
+  stopwatch.stop();
+  final growth = (ProcessInfo.currentRss - startRss) / 1e6;
+  final perFrame = stopwatch.elapsedMicroseconds / frames;
+  print('$name: ${perFrame.toStringAsFixed(1)}us/frame, RSS grew ${growth.toStringAsFixed(1)}MB (checksum $checksum)');
+}
+
+void main(List<String> args) {
+  final frames = args.isNotEmpty ? int.parse(args[0]) : 20000;
+  _run('scratch', _scoped, frames);
+  _run('toNativeUtf8', _leaking, frames);
+}
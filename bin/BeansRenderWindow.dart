@@ -1,4 +1,7 @@
-import 'dart_codegen.dart';
+import 'dart:typed_data';
+import 'codegen/libBeansFont.dart';
+import 'codegen/libImage.dart';
+import 'codegen/libRenderWindow.dart';
 import 'FontCache.dart';
 import 'Colour.dart';
 import 'V2.dart';
@@ -16,6 +19,12 @@ class BeansRenderWindow extends RenderWindow {
     SetColour(colour);
     cDrawPoint(pos.x, pos.y);
   }
+  /// One point per element of [xs] & [ys]. Pass lists from [NativeArrays] if it's going
+  /// to be the same big set of points every frame, so they don't get copied.
+  void DrawPoints(Int32List xs, Int32List ys, [Colour? colour]) {
+    SetColour(colour);
+    cDrawPoints(xs, ys);
+  }
   void DrawLine(V2 pos1, V2 pos2, [Colour? colour]) {
     SetColour(colour);
     cDrawLine(pos1.x, pos1.y, pos2.x, pos2.y);
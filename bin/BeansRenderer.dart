@@ -1,6 +1,7 @@
-import 'dart_codegen.dart';
+import 'dart:io';
 import 'BeansRenderWindow.dart';
 import 'CatchAll.dart';
+import 'EventQueue.dart';
 
 /// BeansRenderer is the main class used to interface with the C in [BeansRenderWindow]
 /// from Dart code. It takes care of the event loop & makes sure the window
@@ -8,31 +9,31 @@ import 'CatchAll.dart';
 /// the [BeansRenderWindow]`
 class BeansRenderer {
   final BeansRenderWindow rw;
-  final Event _event;
+  final EventQueue _events;
 
   bool _shouldQuit = false;
 
   bool handleErrors = true;
 
   final void Function(BeansRenderWindow) render;
-  final void Function(Event) event;
+  final void Function(QueuedEvent) event;
   final void Function(Object, StackTrace) onError;
 
   /// [rw] is the [BeansRenderWindow] that will be used for rendering.
   /// [render] is a callback that should draw graphics to the [BeansRenderWindow]. It should **not** call [BeansRenderWindow.Flush].
   /// [event] is a callback that should handle events that occur. [BeansRenderer] takes care of polling events every frame,
-  /// so the caller only needs to process the event that is passed to them.
+  /// so the caller only needs to process the event that is passed to them. The event is only valid during the callback.
   BeansRenderer({
     required this.rw,
     required this.render,
     required this.event,
     required this.onError
   }) :
-    _event = Event();
+    _events = EventQueue();
   
   /// Cleans up memory associated with the [BeansRenderer]`.
   void destroy() {
-    _event.Free();
+    _events.free();
   }
 
   /// Tells the [BeansRenderer]` that it should quit **after the next frame**.
@@ -47,26 +48,37 @@ class BeansRenderer {
     else {
       render(rw);
     }
+    // this also sends everything render drew over to native code - the draw calls are batched
     rw.Flush();
   }
 
   void _processAllEvents() {
-    while (_event.Poll() > 0) {
-      if (handleErrors) {
-        catchAll(() => event(_event), onError);
-      } else {
-        event(_event);
+    // one FFI call per batch of events, rather than a few per event - which matters when
+    // something like a drag is producing loads of them. a full batch means there might be more.
+    int count;
+    do {
+      count = _events.drain();
+      for (var i = 0; i < count; i++) {
+        final queued = _events[i];
+        if (handleErrors) {
+          catchAll(() => event(queued), onError);
+        } else {
+          event(queued);
+        }
       }
-    }
+    } while (count == _events.capacity);
   }
   
-  /// Starts the event loop. This will block until the window is closed.
+  /// Starts the event loop. This will block until the window is closed, or until it's drawn
+  /// `BEANS_FRAME_LIMIT` frames if that's set (for unattended runs, like `make pgo`'s).
   void run() {
     final start = DateTime.now();
+    final frameLimit = int.tryParse(Platform.environment['BEANS_FRAME_LIMIT'] ?? '');
 
     while (!_shouldQuit) {
       _processAllEvents();
       _paint();
+      if (frameLimit != null && rw.frameCount >= frameLimit) quit();
     }
 
     final end = DateTime.now();
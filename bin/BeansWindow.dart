@@ -1,4 +1,4 @@
-import 'dart_codegen.dart';
+import 'codegen/libEvent.dart';
 import 'BeansRenderWindow.dart';
 import 'Colour.dart';
 import 'V2.dart';
@@ -1,10 +1,12 @@
 import 'BeansWindow.dart';
-import 'dart_codegen.dart';
+import 'codegen/libEvent.dart';
+import 'codegen/libImage.dart';
+import 'codegen/libRenderWindow.dart';
 import 'BeansRenderer.dart';
+import 'EventQueue.dart';
 import 'dart:ffi';
 import 'ColourWindow.dart';
 import 'dart:math';
-import 'XYPointer.dart';
 import 'BeansRenderWindow.dart';
 import 'CatchAll.dart';
 import 'Colour.dart';
@@ -122,11 +124,11 @@ class DragInfo {
 
 /// BeansWindowManager is responsible for:
 /// - Rendering [BeansWindow]s
-/// - Turning the raw [Event]s from SDL into a more usable format
+/// - Turning the raw [QueuedEvent]s from SDL into a more usable format
 /// - Hit-testing windows and passing these events to them
 /// - Allowing the user to resize, relocate, add, or remove windows
 /// - Rendering window decorations and other UI elements
-class BeansWindowManager extends XYPointer {
+class BeansWindowManager {
   late final BeansRenderer _ren;
   final BeansRenderWindow _rw;
 
@@ -143,6 +145,11 @@ class BeansWindowManager extends XYPointer {
   DragInfo? _drag;
   var _cursor = Cursor.Arrow;
 
+  // where the mouse was as of the last mouse event
+  var _mouseX = 0;
+  var _mouseY = 0;
+  V2 get _mousePos => V2(_mouseX, _mouseY);
+
   final List<Collection> _windows = [];
   
   int get _windowCount => _windows.map((collection) => collection.windows.length).sum();
@@ -195,9 +202,8 @@ class BeansWindowManager extends XYPointer {
       onError: gpanic
     );
 
-    _rw.GetSize(xPtr, yPtr);
     _quitBtn = TextButton(
-      pos: V2(xPtr.value - 160, 20),
+      pos: V2(_rw.GetSize().width - 160, 20),
       text: 'Quit Beans',
       onClick: _ren.quit,
       buttonCol: Colours.red
@@ -318,15 +324,15 @@ class BeansWindowManager extends XYPointer {
   /// get the current total main axis size of the [BeansRenderWindow]
   int totalMainAxisSize(/*Collection collection*/) {
     // 2 ways of doing it
-    _rw.GetSize(xPtr, yPtr);
-    return isColumns ? yPtr.value : xPtr.value;
+    final size = _rw.GetSize();
+    return isColumns ? size.height : size.width;
     //return collection.windows.map((wd) => mainSize(wd)).sum().toInt();
   }
 
   /// get the total cross axis size of the [BeansRenderWindow]
   int totalCrossAxisSize() {
-    _rw.GetSize(xPtr, yPtr);
-    return isColumns ? xPtr.value : yPtr.value;
+    final size = _rw.GetSize();
+    return isColumns ? size.width : size.height;
   }
 
   /// set the main axis size of a window
@@ -648,13 +654,13 @@ class BeansWindowManager extends XYPointer {
   void addWindow(BeansWindow win) {
     //print('addWindow: ${win.title}');
 
-    _rw.GetSize(xPtr, yPtr);
+    final size = _rw.GetSize();
 
     if (
-      win.minSize.x > xPtr.value ||
-      win.minSize.y > (yPtr.value - _conf.windowTitleBar.height)
+      win.minSize.x > size.width ||
+      win.minSize.y > (size.height - _conf.windowTitleBar.height)
     ) {
-      error('Window ${win.title} had out-of-bounds minimum size: (${win.minSize.x}x${win.minSize.y}) in a (${xPtr.value}x${yPtr.value}) window, with titlebars of height ${_conf.windowTitleBar.height}.');
+      error('Window ${win.title} had out-of-bounds minimum size: (${win.minSize.x}x${win.minSize.y}) in a (${size.width}x${size.height}) window, with titlebars of height ${_conf.windowTitleBar.height}.');
       return;
     }
 
@@ -760,12 +766,9 @@ class BeansWindowManager extends XYPointer {
   }
 
   /// Destroys any memory that has been allocated
-  @override
   void destroy() {
     _ren.destroy();
 
-    _quitBtn.destroy();
-
     for (var image in _media.values) {
       image.Destroy();
     }
@@ -773,7 +776,6 @@ class BeansWindowManager extends XYPointer {
     for (var collection in _windows) {
       collection.destroy();
     }
-    super.destroy();
   }
 
   WindowData? get _focusedWindow {
@@ -917,7 +919,7 @@ class BeansWindowManager extends XYPointer {
   /// update the focused window based on [_x] and [_y]
   void _setFocusedWindow() {
     _forEachCollectionWithCrossPos((collection, crossPos) {
-      final wd = collection.hitTest(v2FromPointers(), crossPos, true);
+      final wd = collection.hitTest(_mousePos, crossPos, true);
       if (wd != null) {
         wd.isFocused = true;
         return true;
@@ -1056,7 +1058,7 @@ class BeansWindowManager extends XYPointer {
     return true;
   }
 
-  void _event(Event event) {
+  void _event(QueuedEvent event) {
     switch (event.type) {
       case SDLEventType.Quit: {
         _ren.quit();
@@ -1064,13 +1066,14 @@ class BeansWindowManager extends XYPointer {
       }
 
       case SDLEventType.KeyDown: {
-        _focusedWindow?.window.onKeyDown(event.GetKeyPressReleaseData());
+        _focusedWindow?.window.onKeyDown(event.key);
         break;
       }
 
       case SDLEventType.MouseMove: {
-        event.GetMouseMoveData(xPtr, yPtr);
-        final eventPos = v2FromPointers();
+        _mouseX = event.x;
+        _mouseY = event.y;
+        final eventPos = _mousePos;
 
         if (_drag != null) {
           // do drag !!!
@@ -1130,8 +1133,10 @@ class BeansWindowManager extends XYPointer {
       }
 
       case SDLEventType.MouseDown: {
-        final eventPos = v2FromPointers();
-        final button = event.GetMousePressReleaseData(xPtr, yPtr);
+        _mouseX = event.x;
+        _mouseY = event.y;
+        final eventPos = _mousePos;
+        final button = event.button;
 
         //* order is important here!
         // quit button takes highest importance - i just had a scenario where _setFocusedWindow was the culprit for
@@ -1157,8 +1162,10 @@ class BeansWindowManager extends XYPointer {
       }
 
       case SDLEventType.MouseUp: {
-        final button = event.GetMousePressReleaseData(xPtr, yPtr);
-        final eventPos = v2FromPointers();
+        _mouseX = event.x;
+        _mouseY = event.y;
+        final eventPos = _mousePos;
+        final button = event.button;
 
         if (_quitBtnMouseUp(eventPos, button)) return;
 
@@ -0,0 +1,300 @@
+import 'dart:convert';
+import 'dart:ffi';
+import 'dart:io';
+import 'dart:typed_data';
+import 'package:ffi/ffi.dart';
+
+/// Where the generated bindings load [library] from: the build directory for the profile in
+/// `BEANS_BUILD_PROFILE` (eg `build/release` - `make run` sets it to whatever it built), or
+/// `build/debug` if it's not set. `BEANS_BUILD_DIR` overrides both (eg `build/debug/headless`,
+/// to run against the SDL-free stubs).
+String nativeLibraryPath(String library) {
+  final env = Platform.environment;
+  final sep = Platform.pathSeparator;
+  final buildDir = env['BEANS_BUILD_DIR'] ?? 'build$sep${env['BEANS_BUILD_PROFILE'] ?? 'debug'}';
+  return '$buildDir$sep$library';
+}
+
+/// Native memory for marshalling strings (and typed arrays) into the generated bindings.
+/// Every binding holder in dart_codegen.dart has one of these, so calls like
+/// `GetTextWidth` that happen every frame don't malloc (or leak) anything.
+///
+/// Generated code brackets each native call with [mark] and [release], so everything
+/// encoded for a call is gone as soon as the call returns. Short strings go into a
+/// preallocated scratch block; anything that doesn't fit goes into an [Arena], which is
+/// freed when the outermost [release] happens.
+class StringScratch {
+  final int capacity;
+  final Pointer<Uint8> _block;
+  late final Uint8List _bytes = _block.asTypedList(capacity);
+  int _used = 0;
+  Arena? _overflow;
+  // copies the scratch copy of each array passed in since the last mark back into the
+  // original, in case the native side wrote to it
+  final _copyBack = <void Function()>[];
+
+  StringScratch([this.capacity = 1024]) : _block = malloc<Uint8>(capacity);
+
+  /// Start a scope. Pass the result to [release] once the native call is done.
+  // the low 32 bits are how much of the block's used, and the high 32 how many arrays are pinned
+  int mark() => _used | (_copyBack.length << 32);
+
+  /// Free everything encoded since [mark] returned [scope].
+  void release(int scope) {
+    final pinned = scope >> 32;
+    for (var i = _copyBack.length - 1; i >= pinned; i--) {
+      _copyBack[i]();
+    }
+    _copyBack.length = pinned;
+
+    _used = scope & 0xffffffff;
+    if (scope == 0 && _overflow != null) {
+      _overflow!.releaseAll();
+      _overflow = null;
+    }
+  }
+
+  // 8-byte aligned, so it's fine for any element type
+  Pointer<Uint8> _allocate(int bytes) {
+    final start = (_used + 7) & ~7;
+    if (start + bytes <= capacity) {
+      _used = start + bytes;
+      return _block.elementAt(start);
+    }
+    return (_overflow ??= Arena()).allocate<Uint8>(bytes > 0 ? bytes : 1);
+  }
+
+  /// A pointer to [list]'s elements until the current scope is released. Lists from
+  /// [NativeArrays] are passed as they are; anything else is copied in, and copied back
+  /// out again when the scope's released.
+  Pointer<Uint8> uint8s(Uint8List list) {
+    final native = NativeArrays.addressOf(list);
+    if (native != null) return native;
+    final copy = _allocate(list.lengthInBytes);
+    final view = copy.asTypedList(list.length)..setAll(0, list);
+    _copyBack.add(() => list.setAll(0, view));
+    return copy;
+  }
+
+  /// See [uint8s].
+  Pointer<Int32> int32s(Int32List list) {
+    final native = NativeArrays.addressOf(list);
+    if (native != null) return native.cast();
+    final copy = _allocate(list.lengthInBytes).cast<Int32>();
+    final view = copy.asTypedList(list.length)..setAll(0, list);
+    _copyBack.add(() => list.setAll(0, view));
+    return copy;
+  }
+
+  /// See [uint8s].
+  Pointer<Double> float64s(Float64List list) {
+    final native = NativeArrays.addressOf(list);
+    if (native != null) return native.cast();
+    final copy = _allocate(list.lengthInBytes).cast<Double>();
+    final view = copy.asTypedList(list.length)..setAll(0, list);
+    _copyBack.add(() => list.setAll(0, view));
+    return copy;
+  }
+
+  /// Encode [str] as a nul-terminated UTF-8 string that lives until the current scope is released.
+  Pointer<Utf8> encode(String str) {
+    final length = str.length;
+
+    // ASCII fast path - one byte per code unit, straight into the scratch block
+    if (_used + length + 1 <= capacity) {
+      final start = _used;
+      var i = 0;
+      for (; i < length; i++) {
+        final unit = str.codeUnitAt(i);
+        if (unit >= 0x80) break;
+        _bytes[start + i] = unit;
+      }
+      if (i == length) {
+        _bytes[start + length] = 0;
+        _used += length + 1;
+        return _block.elementAt(start).cast<Utf8>();
+      }
+    }
+
+    final encoded = utf8.encode(str);
+    final Pointer<Uint8> out;
+    if (_used + encoded.length + 1 <= capacity) {
+      out = _block.elementAt(_used);
+      _used += encoded.length + 1;
+    } else {
+      out = (_overflow ??= Arena()).allocate<Uint8>(encoded.length + 1);
+    }
+    out.asTypedList(encoded.length + 1)
+      ..setAll(0, encoded)
+      ..[encoded.length] = 0;
+    return out.cast<Utf8>();
+  }
+
+  /// Only for when nothing's ever going to use this again.
+  void free() {
+    release(0);
+    malloc.free(_block);
+  }
+}
+
+/// Typed arrays that live in native memory, so the generated bindings can hand them
+/// straight to native code without copying them. Any other [TypedData] works too, but
+/// gets copied into scratch memory for the call and back out again afterwards - so
+/// anything big that goes across every frame should come from here.
+///
+/// Nothing frees these automatically - call [free] once it's done with.
+class NativeArrays {
+  static final _addresses = Expando<Pointer<Uint8>>('native address');
+
+  static Uint8List uint8(int length) {
+    final pointer = malloc<Uint8>(length > 0 ? length : 1);
+    return _register(pointer, pointer.asTypedList(length));
+  }
+
+  static Int32List int32(int length) {
+    final pointer = malloc<Int32>(length > 0 ? length : 1);
+    return _register(pointer.cast(), pointer.asTypedList(length));
+  }
+
+  static Float64List float64(int length) {
+    final pointer = malloc<Double>(length > 0 ? length : 1);
+    return _register(pointer.cast(), pointer.asTypedList(length));
+  }
+
+  static T _register<T extends TypedData>(Pointer<Uint8> pointer, T list) {
+    _addresses[list] = pointer;
+    return list;
+  }
+
+  /// Where [list]'s elements are, if it came from here. Views of it (eg from
+  /// `sublistView`) don't count.
+  static Pointer<Uint8>? addressOf(TypedData list) => _addresses[list];
+
+  static void free(TypedData list) {
+    final pointer = _addresses[list];
+    if (pointer == null) {
+      throw ArgumentError.value(list, 'list', "Wasn't allocated by NativeArrays, or has already been freed");
+    }
+    _addresses[list] = null;
+    malloc.free(pointer);
+  }
+}
+
+/// Views of arrays returned by native functions - no copying, so they're only good for as
+/// long as the native side keeps the memory alive. A nullptr is an empty list.
+Uint8List nativeUint8List(Pointer<Uint8> pointer, int length) => pointer.address == 0 ? Uint8List(0) : pointer.asTypedList(length);
+Int32List nativeInt32List(Pointer<Int32> pointer, int length) => pointer.address == 0 ? Int32List(0) : pointer.asTypedList(length);
+Float64List nativeFloat64List(Pointer<Double> pointer, int length) => pointer.address == 0 ? Float64List(0) : pointer.asTypedList(length);
+
+/// A field of a generated struct - where the C compiler put it, and how to zero it in a
+/// struct at some address.
+class StructField {
+  final String name;
+  final int offset;
+  final void Function(Pointer<Uint8>) clear;
+
+  const StructField(this.name, this.offset, this.clear);
+}
+
+/// For the generated bindings, which check each class's struct against the C one when
+/// its library's loaded - if they don't match, every field read is quietly garbage.
+/// Dart can't say where a field is, so each one's found by zeroing it in memory that's
+/// otherwise all 0xff.
+void checkStructLayout(String name, int dartSize, int cSize, List<StructField> fields) {
+  if (dartSize != cSize) {
+    throw StateError('The Dart layout of $name is $dartSize bytes, but the C one is $cSize');
+  }
+  final memory = malloc<Uint8>(cSize);
+  final bytes = memory.asTypedList(cSize);
+  try {
+    for (final field in fields) {
+      bytes.fillRange(0, cSize, 0xff);
+      field.clear(memory);
+      final offset = bytes.indexOf(0);
+      if (offset != field.offset) {
+        throw StateError('$name.${field.name} is at byte $offset in the Dart layout, but ${field.offset} in the C one');
+      }
+    }
+  } finally {
+    malloc.free(memory);
+  }
+}
+
+/// Calls to `@Batchable()` methods, queued up in native memory so that a frame's worth
+/// of them crosses into native code in one go instead of one FFI call each.
+///
+/// The buffer is a run of 8-byte slots. Each command is a header slot - the opcode in
+/// the low 32 bits, and the size of the whole command in slots in the high 32 - followed
+/// by one slot per argument: ints (and bools and enums) as themselves, doubles as their
+/// bits, objects as their address, and strings as their length in bytes. The bytes of
+/// any strings come after that, each one nul-terminated and padded to a whole slot.
+/// The generated decoders in native/generated read it back the same way.
+///
+/// Anything a batched call points to (fonts, images...) has to still be alive when the
+/// buffer's flushed - the generated code [retain]s the ones with finalizers until then.
+class CommandBuffer {
+  /// In slots.
+  final int capacity;
+  final Pointer<Int64> _block;
+  late final Int64List ints = _block.asTypedList(capacity);
+  late final Float64List doubles = _block.cast<Double>().asTypedList(capacity);
+  late final Uint8List _bytes = _block.cast<Uint8>().asTypedList(capacity * 8);
+  final void Function(Pointer<Int64> commands, int length) _run;
+  int _used = 0;
+  // objects with finalizers that queued commands point to - they can't be garbage collected
+  // (& have their native memory freed) until the commands have run
+  final _retained = <Object>[];
+
+  CommandBuffer(this._run, [this.capacity = 8192]) : _block = malloc<Int64>(capacity);
+
+  static Uint8List encode(String str) => const Utf8Encoder().convert(str);
+
+  /// How many slots [encode]d bytes take up, including the nul.
+  static int stringSlots(Uint8List bytes) => (bytes.length + 8) >> 3;
+
+  /// Start a command [size] slots long (including the header), flushing first if it
+  /// won't fit. Returns the index of the command's first argument.
+  int begin(int opcode, int size) {
+    if (_used + size > capacity) {
+      flush();
+      if (size > capacity) {
+        throw ArgumentError('A command of $size slots will never fit in a CommandBuffer of $capacity.');
+      }
+    }
+    final at = _used;
+    ints[at] = opcode | (size << 32);
+    _used += size;
+    return at + 1;
+  }
+
+  /// Keep [object] alive until the next [flush].
+  void retain(Object object) => _retained.add(object);
+
+  /// Copy [bytes] in at slot [at], and return the slot after them.
+  int putString(int at, Uint8List bytes) {
+    final start = at * 8;
+    _bytes.setRange(start, start + bytes.length, bytes);
+    _bytes[start + bytes.length] = 0;
+    return at + stringSlots(bytes);
+  }
+
+  /// Run everything that's queued up.
+  void flush() {
+    if (_used == 0) return;
+    final length = _used;
+    // reset first, so that if a call throws, the same commands don't get run again next time
+    _used = 0;
+    try {
+      _run(_block, length);
+    } finally {
+      _retained.clear();
+    }
+  }
+
+  /// Only for when nothing's ever going to use this again - anything still queued is dropped.
+  void free() {
+    _used = 0;
+    _retained.clear();
+    malloc.free(_block);
+  }
+}
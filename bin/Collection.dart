@@ -3,7 +3,7 @@ import 'WindowData.dart';
 import 'TitleBarIcon.dart';
 import 'BeansWindowManager.dart';
 import 'Config.dart';
-import 'dart_codegen.dart';
+import 'codegen/libEvent.dart';
 import 'V2.dart';
 import 'BeansRenderWindow.dart';
 
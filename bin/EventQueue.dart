@@ -0,0 +1,65 @@
+import 'dart:typed_data';
+import 'codegen/libEvent.dart';
+import 'CodegenRuntime.dart';
+
+/// Fetches every event SDL has waiting in one FFI call, instead of a `Poll` plus a
+/// call or two per event to find out what it was. The records go into native memory
+/// that's allocated once, and are read straight out of it.
+class EventQueue {
+  /// How many ints each record takes up - EVENT_RECORD_INTS in native/SDL/Event.c has
+  /// to match.
+  static const recordInts = 4;
+
+  /// The most events one [drain] can fetch.
+  final int capacity;
+
+  final Event _event = Event();
+  final Int32List _records;
+  int _length = 0;
+
+  EventQueue([this.capacity = 256]) : _records = NativeArrays.int32(capacity * recordInts);
+
+  /// Fetch everything that's waiting (up to [capacity] - if it comes back full, there
+  /// might be more), replacing whatever was fetched last time. Returns how many.
+  int drain() {
+    _length = _event.Drain(_records);
+    return _length;
+  }
+
+  /// How many events the last [drain] fetched.
+  int get length => _length;
+
+  QueuedEvent operator [](int idx) {
+    RangeError.checkValidIndex(idx, this, 'idx', _length);
+    return QueuedEvent._(_records, idx * recordInts);
+  }
+
+  void free() {
+    _event.Free();
+    NativeArrays.free(_records);
+  }
+}
+
+/// One of the events from an [EventQueue]. It reads from the queue's memory, so it's only
+/// any good until the next [EventQueue.drain].
+class QueuedEvent {
+  final Int32List _records;
+  final int _at;
+
+  const QueuedEvent._(this._records, this._at);
+
+  SDLEventType get type => SDLEventTypeFromInt(_records[_at]);
+
+  /// For [SDLEventType.KeyDown] & [SDLEventType.KeyUp].
+  KeyCode get key => KeyCodeFromInt(_records[_at + 1]);
+
+  /// For [SDLEventType.MouseMove], [SDLEventType.MouseDown] & [SDLEventType.MouseUp].
+  int get x => _records[_at + 1];
+  int get y => _records[_at + 2];
+
+  /// For [SDLEventType.MouseDown] & [SDLEventType.MouseUp].
+  MouseButton get button => MouseButtonFromInt(_records[_at + 3]);
+
+  /// For [SDLEventType.WindowEvent].
+  WindowEventType get windowEvent => WindowEventTypeFromInt(_records[_at + 1]);
+}
@@ -0,0 +1,203 @@
+import 'dart:convert';
+import 'dart:ffi';
+import 'dart:io';
+import 'dart:typed_data';
+import 'package:ffi/ffi.dart';
+
+/// `int X_ProfileRead(int64_t* out, int capacity, int reset)`, which the generated C in
+/// native/generated has for every library with profiled bindings.
+typedef NativeProfileReadNative = Int32 Function(Pointer<Int64>, Int32, Int32);
+typedef NativeProfileRead = int Function(Pointer<Int64>, int, int);
+
+/// How long each binding took, on both sides of the FFI boundary. Times are in nanoseconds.
+class BindingProfile {
+  /// How it looks from Dart, eg `RenderWindow.Flush`.
+  final String name;
+
+  /// Around the whole generated wrapper - marshalling, the FFI call itself & everything
+  /// the native function does.
+  final int calls;
+  final int total;
+  final int max;
+
+  /// Around just the native function.
+  final int nativeCalls;
+  final int nativeTotal;
+  final int nativeMax;
+
+  const BindingProfile(this.name, this.calls, this.total, this.max, this.nativeCalls, this.nativeTotal, this.nativeMax);
+
+  /// What getting into native code & back costs, all told. Meaningless for `@Batchable()`
+  /// methods - the Dart side's only queueing them up, & the native side runs them later.
+  int get overhead => total - nativeTotal;
+}
+
+/// Timings for the generated bindings, if they were generated with
+/// `python codegen/main.py --profile-ffi` (or for just the functions & methods marked
+/// `@Profile()`). Otherwise nothing ever registers with this, & the bindings are exactly
+/// the same as they'd be without it - so it costs nothing when it's not wanted.
+///
+/// Each profiled binding is timed twice: here, around the whole generated wrapper, & by
+/// a wrapper in the generated C, around just the native function. Every call here also
+/// goes into a timeline of the last [traceCapacity] calls, for [chromeTrace].
+class FfiProfiler {
+  static const traceCapacity = 1 << 16;
+
+  static final _clock = Stopwatch()..start();
+
+  // by id
+  static final _names = <String>[];
+  static final _calls = <int>[];
+  static final _totalTicks = <int>[];
+  static final _maxTicks = <int>[];
+  static final _libraries = <_ProfiledLibrary>[];
+
+  // id, start tick & end tick of each call - a ring, once it's full
+  static final _trace = Int64List(traceCapacity * 3);
+  static int _traced = 0;
+
+  /// Whether anything's profiled - ie whether any profiled bindings have been called yet.
+  static bool get enabled => _names.isNotEmpty;
+
+  /// For the generated bindings - a library's holder registers all its profiled bindings
+  /// the first time one of them's called, in the same order as its native side does.
+  /// Returns the id of the first one, & the rest follow on from it.
+  static int register(List<String> names, NativeProfileRead readNative) {
+    final first = _names.length;
+    _names.addAll(names);
+    for (var i = 0; i < names.length; i++) {
+      _calls.add(0);
+      _totalTicks.add(0);
+      _maxTicks.add(0);
+    }
+    _libraries.add(_ProfiledLibrary(first, names.length, readNative));
+    return first;
+  }
+
+  /// For the generated bindings - pass the result to [stop] once the call's done.
+  static int start() => _clock.elapsedTicks;
+
+  /// For the generated bindings.
+  static void stop(int id, int start) {
+    final end = _clock.elapsedTicks;
+    final elapsed = end - start;
+    _calls[id]++;
+    _totalTicks[id] += elapsed;
+    if (elapsed > _maxTicks[id]) _maxTicks[id] = elapsed;
+
+    final at = (_traced % traceCapacity) * 3;
+    _trace[at] = id;
+    _trace[at + 1] = start;
+    _trace[at + 2] = end;
+    _traced++;
+  }
+
+  static int _nanoseconds(int ticks) => ticks * 1000000000 ~/ _clock.frequency;
+
+  /// Everything so far, slowest in total first. Bindings that haven't been called are left out.
+  static List<BindingProfile> results() {
+    final out = <BindingProfile>[];
+    for (final library in _libraries) {
+      final native = library.read(reset: false);
+      for (var i = 0; i < library.count; i++) {
+        final id = library.first + i;
+        if (_calls[id] == 0 && native[i * 3] == 0) continue;
+        out.add(BindingProfile(
+          _names[id],
+          _calls[id], _nanoseconds(_totalTicks[id]), _nanoseconds(_maxTicks[id]),
+          native[i * 3], native[i * 3 + 1], native[i * 3 + 2],
+        ));
+      }
+    }
+    return out..sort((a, b) => b.total.compareTo(a.total));
+  }
+
+  /// A table of [results], for printing.
+  static String report() {
+    String ms(int ns) => (ns / 1e6).toStringAsFixed(3);
+    String us(int ns) => (ns / 1e3).toStringAsFixed(1);
+
+    final out = StringBuffer();
+    out.writeln(
+      '${'binding'.padRight(40)}${'calls'.padLeft(10)}${'total ms'.padLeft(12)}${'mean us'.padLeft(10)}${'max us'.padLeft(10)}'
+      '${'native ms'.padLeft(12)}${'native max us'.padLeft(15)}${'overhead ms'.padLeft(13)}',
+    );
+    for (final result in results()) {
+      final mean = result.calls == 0 ? 0 : result.total ~/ result.calls;
+      out.writeln(
+        '${result.name.padRight(40)}${'${result.calls}'.padLeft(10)}${ms(result.total).padLeft(12)}${us(mean).padLeft(10)}${us(result.max).padLeft(10)}'
+        '${ms(result.nativeTotal).padLeft(12)}${us(result.nativeMax).padLeft(15)}${ms(result.overhead).padLeft(13)}',
+      );
+    }
+    return out.toString();
+  }
+
+  /// The calls in the timeline, in Chrome's trace event format - open it in
+  /// chrome://tracing or https://ui.perfetto.dev. Calls made from inside other calls
+  /// (like a batch being flushed) nest.
+  static String chromeTrace() {
+    final events = <Map<String, Object>>[];
+    final first = _traced > traceCapacity ? _traced - traceCapacity : 0;
+    for (var i = first; i < _traced; i++) {
+      final at = (i % traceCapacity) * 3;
+      final start = _nanoseconds(_trace[at + 1]);
+      events.add({
+        'name': _names[_trace[at]],
+        'cat': 'ffi',
+        'ph': 'X',
+        // microseconds
+        'ts': start / 1000,
+        'dur': (_nanoseconds(_trace[at + 2]) - start) / 1000,
+        'pid': pid,
+        'tid': 0,
+      });
+    }
+    return jsonEncode({'traceEvents': events, 'displayTimeUnit': 'ms'});
+  }
+
+  static void writeChromeTrace(String path) => File(path).writeAsStringSync(chromeTrace());
+
+  /// Start again from nothing - eg to leave startup out.
+  static void reset() {
+    for (var i = 0; i < _names.length; i++) {
+      _calls[i] = 0;
+      _totalTicks[i] = 0;
+      _maxTicks[i] = 0;
+    }
+    _traced = 0;
+    for (final library in _libraries) {
+      library.read(reset: true);
+    }
+  }
+
+  /// Print the [report], & write the [chromeTrace] to `BEANS_FFI_TRACE` if that's set.
+  /// Does nothing if nothing's profiled.
+  static void dump() {
+    if (!enabled) return;
+    print(report());
+    final tracePath = Platform.environment['BEANS_FFI_TRACE'];
+    if (tracePath != null) {
+      writeChromeTrace(tracePath);
+      print('FFI timeline written to $tracePath');
+    }
+  }
+}
+
+class _ProfiledLibrary {
+  final int first;
+  final int count;
+  final NativeProfileRead _read;
+
+  const _ProfiledLibrary(this.first, this.count, this._read);
+
+  /// Calls, total ns & max ns for each binding.
+  Int64List read({required bool reset}) {
+    final out = malloc<Int64>(count * 3);
+    try {
+      _read(out, count * 3, reset ? 1 : 0);
+      return Int64List.fromList(out.asTypedList(count * 3));
+    } finally {
+      malloc.free(out);
+    }
+  }
+}
@@ -1,4 +1,4 @@
-import 'dart_codegen.dart';
+import 'codegen/libBeansFont.dart';
 
 /// FontCache represents a whole font family, and provides the operator `[]` to get a specific font size from that family.
 /// Use the static method [family] to get an instance, and call [destroyAll] at program end.
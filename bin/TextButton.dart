@@ -1,11 +1,11 @@
 import 'BeansRenderWindow.dart';
 import 'V2.dart';
 import 'Colour.dart';
-import 'dart_codegen.dart';
+import 'codegen/libBeansFont.dart';
+import 'codegen/libEvent.dart';
 import 'FontCache.dart';
-import 'XYPointer.dart';
 
-class TextButton extends XYPointer {
+class TextButton {
   final V2 pos;
   final String text;
   final BeansFont font;
@@ -17,8 +17,8 @@ class TextButton extends XYPointer {
   bool _isPressed = false;
 
   V2 get size {
-    font.GetTextSize(text, xPtr, yPtr);
-    return v2FromPointers() + V2.square(padding * 2);
+    final textSize = font.GetTextSize(text);
+    return V2(textSize.width, textSize.height) + V2.square(padding * 2);
   }
 
   TextButton({required this.pos, required this.text, required this.onClick, this.padding = 5, Colour? buttonCol, Colour? textCol, String? fontFamily, int? fontPt, int? fontPx}) :
@@ -1,7 +1,7 @@
 import 'BeansRenderWindow.dart';
 import 'Config.dart';
 import 'V2.dart';
-import 'dart_codegen.dart';
+import 'codegen/libEvent.dart';
 
 abstract class TitleBarIcon {
   final conf = Config.instance;
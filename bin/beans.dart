@@ -1,9 +1,10 @@
-import 'dart_codegen.dart';
+import 'codegen/libRenderWindow.dart';
 import 'BeansWindowManager.dart';
 import 'dart:io';
 import 'FontCache.dart';
 import 'BeansRenderWindow.dart';
 import 'CatchAll.dart';
+import 'FfiProfiler.dart';
 
 /// Beans is responsible for initialization, error handling & cleanup at
 /// the highest level. It creates the [BeansRenderWindow] and the [BeansWindowManager].
@@ -52,4 +53,7 @@ void main() {
   final beans = Beans();
   beans.start();
   beans.destroy();
+
+  // only if the bindings were generated with profiling in
+  FfiProfiler.dump();
 }
\ No newline at end of file
@@ -0,0 +1,2 @@
+// unsharded - everything's in here
+export '../dart_codegen.dart';
@@ -5,256 +5,11 @@ import 'package:ffi/ffi.dart';
 // for @mustCallSuper
 import 'package:meta/meta.dart';
 
-// ----------FILE: NATIVE/SDL/RENDERWINDOW.GEN----------
-
-// ----------ENUMS----------
-
-enum SDLInitCode {
-    Success,
-    InitVideo_Fail,
-    TTF_Init_Fail,
-    CreateWindow_Fail,
-    CreateRenderer_Fail,
-}
-
-SDLInitCode SDLInitCodeFromInt(int val) => SDLInitCode.values[val];
-int SDLInitCodeToInt(SDLInitCode val) => SDLInitCode.values.indexOf(val);
-
-String SDLInitCodeToString(SDLInitCode val) {
-    switch (val) {
-        case SDLInitCode.Success: { return 'Success'; }
-        case SDLInitCode.InitVideo_Fail: { return 'SDL_InitVideo() failed'; }
-        case SDLInitCode.TTF_Init_Fail: { return 'TTF_Init() failed'; }
-        case SDLInitCode.CreateWindow_Fail: { return 'SDL_CreateWindow() failed'; }
-        case SDLInitCode.CreateRenderer_Fail: { return 'SDL_CreateRenderer() failed'; }
-    }
-}
-
-enum Cursor {
-    Arrow,
-    Hand,
-    SizeAll,
-    SizeVertical,
-    SizeHorizontal,
-}
-
-Cursor CursorFromInt(int val) => Cursor.values[val];
-int CursorToInt(Cursor val) => Cursor.values.indexOf(val);
-
-String CursorToString(Cursor val) {
-    switch (val) {
-        case Cursor.Arrow: { return 'Arrow'; }
-        case Cursor.Hand: { return 'Hand'; }
-        case Cursor.SizeAll: { return 'SizeAll'; }
-        case Cursor.SizeVertical: { return 'SizeVertical'; }
-        case Cursor.SizeHorizontal: { return 'SizeHorizontal'; }
-    }
-}
-
-// ----------FUNC SIG TYPEDEFS FOR CLASSES----------
-
-// ----------RENDERWINDOW----------
-
-// void* InitRenderWindow(char* title)
-typedef _libRenderWindow_class_RenderWindow_method_InitRenderWindow_native_sig = Pointer<Void> Function(Pointer<Utf8>);
-typedef _libRenderWindow_class_RenderWindow_method_InitRenderWindow_sig = Pointer<Void> Function(Pointer<Utf8>);
-
-// void DestroyRenderWindow(void* struct_ptr)
-typedef _libRenderWindow_class_RenderWindow_method_DestroyRenderWindow_native_sig = Void Function(Pointer<Void>);
-typedef _libRenderWindow_class_RenderWindow_method_DestroyRenderWindow_sig = void Function(Pointer<Void>);
-
-// SDLInitCode RWGetErrorCode(void* struct_ptr)
-typedef _libRenderWindow_class_RenderWindow_method_RWGetErrorCode_native_sig = Int32 Function(Pointer<Void>);
-typedef _libRenderWindow_class_RenderWindow_method_RWGetErrorCode_sig = int Function(Pointer<Void>);
-
-// int RWGetFrameCount(void* struct_ptr)
-typedef _libRenderWindow_class_RenderWindow_method_RWGetFrameCount_native_sig = Int32 Function(Pointer<Void>);
-typedef _libRenderWindow_class_RenderWindow_method_RWGetFrameCount_sig = int Function(Pointer<Void>);
-
-// void RWGetSize(void* struct_ptr, int* width, int* height)
-typedef _libRenderWindow_class_RenderWindow_method_RWGetSize_native_sig = Void Function(Pointer<Void>, Pointer<Int32>, Pointer<Int32>);
-typedef _libRenderWindow_class_RenderWindow_method_RWGetSize_sig = void Function(Pointer<Void>, Pointer<Int32>, Pointer<Int32>);
-
-// void Flush(void* struct_ptr)
-typedef _libRenderWindow_class_RenderWindow_method_Flush_native_sig = Void Function(Pointer<Void>);
-typedef _libRenderWindow_class_RenderWindow_method_Flush_sig = void Function(Pointer<Void>);
-
-// void SetCursor(void* struct_ptr, Cursor cursor)
-typedef _libRenderWindow_class_RenderWindow_method_SetCursor_native_sig = Void Function(Pointer<Void>, Int32);
-typedef _libRenderWindow_class_RenderWindow_method_SetCursor_sig = void Function(Pointer<Void>, int);
-
-// void SetColour(void* struct_ptr, int r, int g, int b, int a)
-typedef _libRenderWindow_class_RenderWindow_method_SetColour_native_sig = Void Function(Pointer<Void>, Int32, Int32, Int32, Int32);
-typedef _libRenderWindow_class_RenderWindow_method_SetColour_sig = void Function(Pointer<Void>, int, int, int, int);
-
-// void DrawPoint(void* struct_ptr, int x, int y)
-typedef _libRenderWindow_class_RenderWindow_method_DrawPoint_native_sig = Void Function(Pointer<Void>, Int32, Int32);
-typedef _libRenderWindow_class_RenderWindow_method_DrawPoint_sig = void Function(Pointer<Void>, int, int);
-
-// void DrawLine(void* struct_ptr, int x1, int y1, int x2, int y2)
-typedef _libRenderWindow_class_RenderWindow_method_DrawLine_native_sig = Void Function(Pointer<Void>, Int32, Int32, Int32, Int32);
-typedef _libRenderWindow_class_RenderWindow_method_DrawLine_sig = void Function(Pointer<Void>, int, int, int, int);
-
-// void DrawRect(void* struct_ptr, int x, int y, int w, int h)
-typedef _libRenderWindow_class_RenderWindow_method_DrawRect_native_sig = Void Function(Pointer<Void>, Int32, Int32, Int32, Int32);
-typedef _libRenderWindow_class_RenderWindow_method_DrawRect_sig = void Function(Pointer<Void>, int, int, int, int);
-
-// void FillRect(void* struct_ptr, int x, int y, int w, int h)
-typedef _libRenderWindow_class_RenderWindow_method_FillRect_native_sig = Void Function(Pointer<Void>, Int32, Int32, Int32, Int32);
-typedef _libRenderWindow_class_RenderWindow_method_FillRect_sig = void Function(Pointer<Void>, int, int, int, int);
-
-// void DrawText(void* struct_ptr, BeansFont* font, char* text, int x, int y, int r, int g, int b, int a)
-typedef _libRenderWindow_class_RenderWindow_method_DrawText_native_sig = Void Function(Pointer<Void>, Pointer<Void>, Pointer<Utf8>, Int32, Int32, Int32, Int32, Int32, Int32);
-typedef _libRenderWindow_class_RenderWindow_method_DrawText_sig = void Function(Pointer<Void>, Pointer<Void>, Pointer<Utf8>, int, int, int, int, int, int);
-
-// void DrawImage(void* struct_ptr, Image* image, int x, int y, double scale)
-typedef _libRenderWindow_class_RenderWindow_method_DrawImage_native_sig = Void Function(Pointer<Void>, Pointer<Void>, Int32, Int32, Double);
-typedef _libRenderWindow_class_RenderWindow_method_DrawImage_sig = void Function(Pointer<Void>, Pointer<Void>, int, int, double);
-
-// ----------CLASS IMPLEMENTATIONS----------
-
-class RenderWindow {
-    Pointer<Void> structPointer = nullptr;
-
-    void _validatePointer(String methodName) {
-        if (structPointer.address == 0) {
-            throw Exception('RenderWindow.$methodName was called, but structPointer is a nullptr.');
-        }
-    }
-
-    static _libRenderWindow_class_RenderWindow_method_InitRenderWindow_sig? _InitRenderWindow;
-    static _libRenderWindow_class_RenderWindow_method_DestroyRenderWindow_sig? _DestroyRenderWindow;
-    static _libRenderWindow_class_RenderWindow_method_RWGetErrorCode_sig? _RWGetErrorCode;
-    static _libRenderWindow_class_RenderWindow_method_RWGetFrameCount_sig? _RWGetFrameCount;
-    static _libRenderWindow_class_RenderWindow_method_RWGetSize_sig? _RWGetSize;
-    static _libRenderWindow_class_RenderWindow_method_Flush_sig? _Flush;
-    static _libRenderWindow_class_RenderWindow_method_SetCursor_sig? _SetCursor;
-    static _libRenderWindow_class_RenderWindow_method_SetColour_sig? _SetColour;
-    static _libRenderWindow_class_RenderWindow_method_DrawPoint_sig? _DrawPoint;
-    static _libRenderWindow_class_RenderWindow_method_DrawLine_sig? _DrawLine;
-    static _libRenderWindow_class_RenderWindow_method_DrawRect_sig? _DrawRect;
-    static _libRenderWindow_class_RenderWindow_method_FillRect_sig? _FillRect;
-    static _libRenderWindow_class_RenderWindow_method_DrawText_sig? _DrawText;
-    static _libRenderWindow_class_RenderWindow_method_DrawImage_sig? _DrawImage;
-
-    void _initRefs() {
-        if (
-            _InitRenderWindow == null ||
-            _DestroyRenderWindow == null ||
-            _RWGetErrorCode == null ||
-            _RWGetFrameCount == null ||
-            _RWGetSize == null ||
-            _Flush == null ||
-            _SetCursor == null ||
-            _SetColour == null ||
-            _DrawPoint == null ||
-            _DrawLine == null ||
-            _DrawRect == null ||
-            _FillRect == null ||
-            _DrawText == null ||
-            _DrawImage == null
-        ) {
-            final lib = DynamicLibrary.open('build/native/SDL/libRenderWindow.so');
-
-            _InitRenderWindow = lib.lookupFunction<_libRenderWindow_class_RenderWindow_method_InitRenderWindow_native_sig, _libRenderWindow_class_RenderWindow_method_InitRenderWindow_sig>('InitRenderWindow');
-            _DestroyRenderWindow = lib.lookupFunction<_libRenderWindow_class_RenderWindow_method_DestroyRenderWindow_native_sig, _libRenderWindow_class_RenderWindow_method_DestroyRenderWindow_sig>('DestroyRenderWindow');
-            _RWGetErrorCode = lib.lookupFunction<_libRenderWindow_class_RenderWindow_method_RWGetErrorCode_native_sig, _libRenderWindow_class_RenderWindow_method_RWGetErrorCode_sig>('RWGetErrorCode');
-            _RWGetFrameCount = lib.lookupFunction<_libRenderWindow_class_RenderWindow_method_RWGetFrameCount_native_sig, _libRenderWindow_class_RenderWindow_method_RWGetFrameCount_sig>('RWGetFrameCount');
-            _RWGetSize = lib.lookupFunction<_libRenderWindow_class_RenderWindow_method_RWGetSize_native_sig, _libRenderWindow_class_RenderWindow_method_RWGetSize_sig>('RWGetSize');
-            _Flush = lib.lookupFunction<_libRenderWindow_class_RenderWindow_method_Flush_native_sig, _libRenderWindow_class_RenderWindow_method_Flush_sig>('Flush');
-            _SetCursor = lib.lookupFunction<_libRenderWindow_class_RenderWindow_method_SetCursor_native_sig, _libRenderWindow_class_RenderWindow_method_SetCursor_sig>('SetCursor');
-            _SetColour = lib.lookupFunction<_libRenderWindow_class_RenderWindow_method_SetColour_native_sig, _libRenderWindow_class_RenderWindow_method_SetColour_sig>('SetColour');
-            _DrawPoint = lib.lookupFunction<_libRenderWindow_class_RenderWindow_method_DrawPoint_native_sig, _libRenderWindow_class_RenderWindow_method_DrawPoint_sig>('DrawPoint');
-            _DrawLine = lib.lookupFunction<_libRenderWindow_class_RenderWindow_method_DrawLine_native_sig, _libRenderWindow_class_RenderWindow_method_DrawLine_sig>('DrawLine');
-            _DrawRect = lib.lookupFunction<_libRenderWindow_class_RenderWindow_method_DrawRect_native_sig, _libRenderWindow_class_RenderWindow_method_DrawRect_sig>('DrawRect');
-            _FillRect = lib.lookupFunction<_libRenderWindow_class_RenderWindow_method_FillRect_native_sig, _libRenderWindow_class_RenderWindow_method_FillRect_sig>('FillRect');
-            _DrawText = lib.lookupFunction<_libRenderWindow_class_RenderWindow_method_DrawText_native_sig, _libRenderWindow_class_RenderWindow_method_DrawText_sig>('DrawText');
-            _DrawImage = lib.lookupFunction<_libRenderWindow_class_RenderWindow_method_DrawImage_native_sig, _libRenderWindow_class_RenderWindow_method_DrawImage_sig>('DrawImage');
-        }
-    }
-
-    RenderWindow(String title) {
-        _initRefs();
-        structPointer = _InitRenderWindow!(title.toNativeUtf8());
-    }
-
-    RenderWindow.fromPointer(Pointer<Void> ptr) {
-        _initRefs();
-        structPointer = ptr;
-    }
-
-    @mustCallSuper
-    void Destroy() {
-        _validatePointer('Destroy');
-        final out = _DestroyRenderWindow!(structPointer);
+// for typed arrays
+import 'dart:typed_data';
 
-        // this method invalidates the pointer, probably by freeing memory
-        structPointer = nullptr;
-
-        return out;
-    }
-
-    SDLInitCode get errorCode {
-        _validatePointer('errorCode');
-        return SDLInitCodeFromInt(_RWGetErrorCode!(structPointer));
-    }
-
-    int get frameCount {
-        _validatePointer('frameCount');
-        return _RWGetFrameCount!(structPointer);
-    }
-
-    void GetSize(Pointer<Int32> width, Pointer<Int32> height) {
-        _validatePointer('GetSize');
-        return _RWGetSize!(structPointer, width, height);
-    }
-
-    void Flush() {
-        _validatePointer('Flush');
-        return _Flush!(structPointer);
-    }
-
-    void SetCursor(Cursor cursor) {
-        _validatePointer('SetCursor');
-        return _SetCursor!(structPointer, CursorToInt(cursor));
-    }
-
-    void cSetColour(int r, int g, int b, int a) {
-        _validatePointer('cSetColour');
-        return _SetColour!(structPointer, r, g, b, a);
-    }
-
-    void cDrawPoint(int x, int y) {
-        _validatePointer('cDrawPoint');
-        return _DrawPoint!(structPointer, x, y);
-    }
-
-    void cDrawLine(int x1, int y1, int x2, int y2) {
-        _validatePointer('cDrawLine');
-        return _DrawLine!(structPointer, x1, y1, x2, y2);
-    }
-
-    void cDrawRect(int x, int y, int w, int h) {
-        _validatePointer('cDrawRect');
-        return _DrawRect!(structPointer, x, y, w, h);
-    }
-
-    void cFillRect(int x, int y, int w, int h) {
-        _validatePointer('cFillRect');
-        return _FillRect!(structPointer, x, y, w, h);
-    }
-
-    void cDrawText(BeansFont font, String text, int x, int y, int r, int g, int b, int a) {
-        _validatePointer('cDrawText');
-        return _DrawText!(structPointer, font.structPointer, text.toNativeUtf8(), x, y, r, g, b, a);
-    }
-
-    void cDrawImage(Image image, int x, int y, double scale) {
-        _validatePointer('cDrawImage');
-        return _DrawImage!(structPointer, image.structPointer, x, y, scale);
-    }
-
-}
+// support code for the generated bindings
+import 'CodegenRuntime.dart';
 
 // ----------FILE: NATIVE/SDL/BEANSFONT.GEN----------
 
@@ -282,209 +37,193 @@ typedef _libBeansFont_class_BeansFont_method_GetTextWidth_sig = int Function(Poi
 typedef _libBeansFont_class_BeansFont_method_GetTextHeight_native_sig = Int32 Function(Pointer<Void>, Pointer<Utf8>);
 typedef _libBeansFont_class_BeansFont_method_GetTextHeight_sig = int Function(Pointer<Void>, Pointer<Utf8>);
 
-// char* BFGetName(void* struct_ptr)
-typedef _libBeansFont_class_BeansFont_method_BFGetName_native_sig = Pointer<Utf8> Function(Pointer<Void>);
-typedef _libBeansFont_class_BeansFont_method_BFGetName_sig = Pointer<Utf8> Function(Pointer<Void>);
-
-// int BFGetSize(void* struct_ptr)
-typedef _libBeansFont_class_BeansFont_method_BFGetSize_native_sig = Int32 Function(Pointer<Void>);
-typedef _libBeansFont_class_BeansFont_method_BFGetSize_sig = int Function(Pointer<Void>);
+// int BeansFont_DestroyDeferred()
+typedef _libBeansFont_class_BeansFont_destroy_deferred_native_sig = Int32 Function();
+typedef _libBeansFont_class_BeansFont_destroy_deferred_sig = int Function();
 
 // ----------CLASS IMPLEMENTATIONS----------
 
-class BeansFont {
+// BeansFont's memory, which the generated C header declares as well
+class _BeansFontStruct extends Struct {
+    external Pointer<Utf8> name;
+
+    @Int32()
+    external int size;
+
+    external Pointer<Void> font;
+}
+
+class BeansFont implements Finalizable {
     Pointer<Void> structPointer = nullptr;
 
+    // DestroyFont can't run on whatever thread the GC's on, so this just queues the pointer up
+    // for destroyDeferred
+    static final _finalizer = NativeFinalizer(_libBeansFont.$BeansFont_DeferDestroy);
+
+    void _attachFinalizer() {
+        if (structPointer.address != 0) _finalizer.attach(this, structPointer, detach: this);
+    }
+
+    /// Calls Destroy on every BeansFont that's been garbage collected since last time,
+    /// & returns how many. This happens whenever a new BeansFont is made anyway.
+    static int destroyDeferred() => _libBeansFont.BeansFont_DestroyDeferred();
+
+    // written to by the native side of @Out() params
+    static final Pointer<Int32> _outInt32_0 = malloc<Int32>();
+    static final Pointer<Int32> _outInt32_1 = malloc<Int32>();
+
     void _validatePointer(String methodName) {
         if (structPointer.address == 0) {
             throw Exception('BeansFont.$methodName was called, but structPointer is a nullptr.');
         }
     }
 
-    static _libBeansFont_class_BeansFont_method_InitFont_sig? _InitFont;
-    static _libBeansFont_class_BeansFont_method_DestroyFont_sig? _DestroyFont;
-    static _libBeansFont_class_BeansFont_method_GetTextSize_sig? _GetTextSize;
-    static _libBeansFont_class_BeansFont_method_GetTextWidth_sig? _GetTextWidth;
-    static _libBeansFont_class_BeansFont_method_GetTextHeight_sig? _GetTextHeight;
-    static _libBeansFont_class_BeansFont_method_BFGetName_sig? _BFGetName;
-    static _libBeansFont_class_BeansFont_method_BFGetSize_sig? _BFGetSize;
-
-    void _initRefs() {
-        if (
-            _InitFont == null ||
-            _DestroyFont == null ||
-            _GetTextSize == null ||
-            _GetTextWidth == null ||
-            _GetTextHeight == null ||
-            _BFGetName == null ||
-            _BFGetSize == null
-        ) {
-            final lib = DynamicLibrary.open('build/native/SDL/libBeansFont.so');
-
-            _InitFont = lib.lookupFunction<_libBeansFont_class_BeansFont_method_InitFont_native_sig, _libBeansFont_class_BeansFont_method_InitFont_sig>('InitFont');
-            _DestroyFont = lib.lookupFunction<_libBeansFont_class_BeansFont_method_DestroyFont_native_sig, _libBeansFont_class_BeansFont_method_DestroyFont_sig>('DestroyFont');
-            _GetTextSize = lib.lookupFunction<_libBeansFont_class_BeansFont_method_GetTextSize_native_sig, _libBeansFont_class_BeansFont_method_GetTextSize_sig>('GetTextSize');
-            _GetTextWidth = lib.lookupFunction<_libBeansFont_class_BeansFont_method_GetTextWidth_native_sig, _libBeansFont_class_BeansFont_method_GetTextWidth_sig>('GetTextWidth');
-            _GetTextHeight = lib.lookupFunction<_libBeansFont_class_BeansFont_method_GetTextHeight_native_sig, _libBeansFont_class_BeansFont_method_GetTextHeight_sig>('GetTextHeight');
-            _BFGetName = lib.lookupFunction<_libBeansFont_class_BeansFont_method_BFGetName_native_sig, _libBeansFont_class_BeansFont_method_BFGetName_sig>('BFGetName');
-            _BFGetSize = lib.lookupFunction<_libBeansFont_class_BeansFont_method_BFGetSize_native_sig, _libBeansFont_class_BeansFont_method_BFGetSize_sig>('BFGetSize');
+    BeansFont(String name, int size) {
+        destroyDeferred();
+        final $scratch = _libBeansFont.strings;
+        final $scope = $scratch.mark();
+        try {
+            structPointer = _libBeansFont.InitFont($scratch.encode(name), size);
+        } finally {
+            $scratch.release($scope);
         }
+        _attachFinalizer();
     }
 
-    BeansFont(String name, int size) {
-        _initRefs();
-        structPointer = _InitFont!(name.toNativeUtf8(), size);
+    /// Only [owned] ones are freed when they're garbage collected - otherwise whoever handed out
+    /// ptr is still responsible for it.
+    BeansFont.fromPointer(Pointer<Void> ptr, {bool owned = false}) {
+        structPointer = ptr;
+        if (owned) _attachFinalizer();
     }
 
-    BeansFont.fromPointer(Pointer<Void> ptr) {
-        _initRefs();
-        structPointer = ptr;
+    _BeansFontStruct get _struct => _libBeansFont.structBeansFont(structPointer);
+
+    String get name {
+        _validatePointer('name');
+        return (_struct.name).toDartString();
+    }
+
+    int get size {
+        _validatePointer('size');
+        return _struct.size;
+    }
+
+    Pointer<Void> get font {
+        _validatePointer('font');
+        return _struct.font;
     }
 
     @mustCallSuper
     void Destroy() {
         _validatePointer('Destroy');
-        final out = _DestroyFont!(structPointer);
+        final out = _libBeansFont.DestroyFont(structPointer);
 
         // this method invalidates the pointer, probably by freeing memory
+        _finalizer.detach(this);
         structPointer = nullptr;
 
         return out;
     }
 
-    void GetTextSize(String text, Pointer<Int32> width, Pointer<Int32> height) {
+    BeansFontGetTextSizeResult GetTextSize(String text) {
         _validatePointer('GetTextSize');
-        return _GetTextSize!(structPointer, text.toNativeUtf8(), width, height);
+        final $scratch = _libBeansFont.strings;
+        final $scope = $scratch.mark();
+        try {
+            _libBeansFont.GetTextSize(structPointer, $scratch.encode(text), _outInt32_0, _outInt32_1);
+            return BeansFontGetTextSizeResult(_outInt32_0.value, _outInt32_1.value);
+        } finally {
+            $scratch.release($scope);
+        }
     }
 
     int GetTextWidth(String text) {
         _validatePointer('GetTextWidth');
-        return _GetTextWidth!(structPointer, text.toNativeUtf8());
+        final $scratch = _libBeansFont.strings;
+        final $scope = $scratch.mark();
+        try {
+            return _libBeansFont.GetTextWidth(structPointer, $scratch.encode(text));
+        } finally {
+            $scratch.release($scope);
+        }
     }
 
     int GetTextHeight(String text) {
         _validatePointer('GetTextHeight');
-        return _GetTextHeight!(structPointer, text.toNativeUtf8());
+        final $scratch = _libBeansFont.strings;
+        final $scope = $scratch.mark();
+        try {
+            return _libBeansFont.GetTextHeight(structPointer, $scratch.encode(text));
+        } finally {
+            $scratch.release($scope);
+        }
     }
 
-    String get name {
-        _validatePointer('name');
-        return (_BFGetName!(structPointer)).toDartString();
-    }
+}
 
-    int get size {
-        _validatePointer('size');
-        return _BFGetSize!(structPointer);
-    }
+class BeansFontGetTextSizeResult {
+    final int width;
+    final int height;
 
+    const BeansFontGetTextSizeResult(this.width, this.height);
 }
 
-// ----------FILE: NATIVE/SDL/IMAGE.GEN----------
-
-// ----------FUNC SIG TYPEDEFS FOR CLASSES----------
+// ----------BINDINGS FOR LIBBEANSFONT----------
 
-// ----------IMAGE----------
+const libBeansFontPath = 'native/SDL/libBeansFont.so';
 
-// void* InitImage(RenderWindow* rw, char* fname)
-typedef _libImage_class_Image_method_InitImage_native_sig = Pointer<Void> Function(Pointer<Void>, Pointer<Utf8>);
-typedef _libImage_class_Image_method_InitImage_sig = Pointer<Void> Function(Pointer<Void>, Pointer<Utf8>);
+class _libBeansFont_bindings {
+    final _lib = DynamicLibrary.open(nativeLibraryPath(libBeansFontPath));
+    final strings = StringScratch();
 
-// void DestroyImage(void* struct_ptr)
-typedef _libImage_class_Image_method_DestroyImage_native_sig = Void Function(Pointer<Void>);
-typedef _libImage_class_Image_method_DestroyImage_sig = void Function(Pointer<Void>);
+    _libBeansFont_bindings() {
+        checkStructLayout('BeansFont', sizeOf<_BeansFontStruct>(), 24, [
+            StructField('name', 0, (memory) => memory.cast<_BeansFontStruct>().ref.name = nullptr),
+            StructField('size', 8, (memory) => memory.cast<_BeansFontStruct>().ref.size = 0),
+            StructField('font', 16, (memory) => memory.cast<_BeansFontStruct>().ref.font = nullptr),
+        ]);
+    }
 
-// int ImageGetWidth(void* struct_ptr)
-typedef _libImage_class_Image_method_ImageGetWidth_native_sig = Int32 Function(Pointer<Void>);
-typedef _libImage_class_Image_method_ImageGetWidth_sig = int Function(Pointer<Void>);
+    _BeansFontStruct structBeansFont(Pointer<Void> pointer) => pointer.cast<_BeansFontStruct>().ref;
 
-// int ImageGetHeight(void* struct_ptr)
-typedef _libImage_class_Image_method_ImageGetHeight_native_sig = Int32 Function(Pointer<Void>);
-typedef _libImage_class_Image_method_ImageGetHeight_sig = int Function(Pointer<Void>);
+    late final _libBeansFont_class_BeansFont_method_InitFont_sig InitFont = _lib.lookupFunction<_libBeansFont_class_BeansFont_method_InitFont_native_sig, _libBeansFont_class_BeansFont_method_InitFont_sig>('InitFont');
+    late final _libBeansFont_class_BeansFont_method_DestroyFont_sig DestroyFont = _lib.lookupFunction<_libBeansFont_class_BeansFont_method_DestroyFont_native_sig, _libBeansFont_class_BeansFont_method_DestroyFont_sig>('DestroyFont');
+    late final _libBeansFont_class_BeansFont_method_GetTextSize_sig GetTextSize = _lib.lookupFunction<_libBeansFont_class_BeansFont_method_GetTextSize_native_sig, _libBeansFont_class_BeansFont_method_GetTextSize_sig>('GetTextSize');
+    late final _libBeansFont_class_BeansFont_method_GetTextWidth_sig GetTextWidth = _lib.lookupFunction<_libBeansFont_class_BeansFont_method_GetTextWidth_native_sig, _libBeansFont_class_BeansFont_method_GetTextWidth_sig>('GetTextWidth');
+    late final _libBeansFont_class_BeansFont_method_GetTextHeight_sig GetTextHeight = _lib.lookupFunction<_libBeansFont_class_BeansFont_method_GetTextHeight_native_sig, _libBeansFont_class_BeansFont_method_GetTextHeight_sig>('GetTextHeight');
+    late final _libBeansFont_class_BeansFont_destroy_deferred_sig BeansFont_DestroyDeferred = _lib.lookupFunction<_libBeansFont_class_BeansFont_destroy_deferred_native_sig, _libBeansFont_class_BeansFont_destroy_deferred_sig>('BeansFont_DestroyDeferred');
+    late final $BeansFont_DeferDestroy = _lib.lookup<NativeFinalizerFunction>('BeansFont_DeferDestroy');
+}
 
-// ----------CLASS IMPLEMENTATIONS----------
+final _libBeansFont = _libBeansFont_bindings();
 
-class Image {
-    Pointer<Void> structPointer = nullptr;
+// ----------FILE: NATIVE/SDL/EVENT.GEN----------
 
-    void _validatePointer(String methodName) {
-        if (structPointer.address == 0) {
-            throw Exception('Image.$methodName was called, but structPointer is a nullptr.');
-        }
-    }
+// ----------ENUMS----------
 
-    static _libImage_class_Image_method_InitImage_sig? _InitImage;
-    static _libImage_class_Image_method_DestroyImage_sig? _DestroyImage;
-    static _libImage_class_Image_method_ImageGetWidth_sig? _ImageGetWidth;
-    static _libImage_class_Image_method_ImageGetHeight_sig? _ImageGetHeight;
-
-    void _initRefs() {
-        if (
-            _InitImage == null ||
-            _DestroyImage == null ||
-            _ImageGetWidth == null ||
-            _ImageGetHeight == null
-        ) {
-            final lib = DynamicLibrary.open('build/native/SDL/libImage.so');
-
-            _InitImage = lib.lookupFunction<_libImage_class_Image_method_InitImage_native_sig, _libImage_class_Image_method_InitImage_sig>('InitImage');
-            _DestroyImage = lib.lookupFunction<_libImage_class_Image_method_DestroyImage_native_sig, _libImage_class_Image_method_DestroyImage_sig>('DestroyImage');
-            _ImageGetWidth = lib.lookupFunction<_libImage_class_Image_method_ImageGetWidth_native_sig, _libImage_class_Image_method_ImageGetWidth_sig>('ImageGetWidth');
-            _ImageGetHeight = lib.lookupFunction<_libImage_class_Image_method_ImageGetHeight_native_sig, _libImage_class_Image_method_ImageGetHeight_sig>('ImageGetHeight');
-        }
-    }
+enum SDLEventType {
+    Quit,
+    LowMemory,
+    KeyDown,
+    KeyUp,
+    MouseMove,
+    MouseDown,
+    MouseUp,
+    MouseScroll,
+    WindowEvent,
+    Unknown,
+}
 
-    Image(RenderWindow rw, String fname) {
-        _initRefs();
-        structPointer = _InitImage!(rw.structPointer, fname.toNativeUtf8());
-    }
+const _SDLEventTypeToIntTable = <int>[256, 258, 768, 769, 1024, 1025, 1026, 1027, 512, 0];
+const _SDLEventTypeFromIntTable = <int, SDLEventType>{256: SDLEventType.Quit, 258: SDLEventType.LowMemory, 768: SDLEventType.KeyDown, 769: SDLEventType.KeyUp, 1024: SDLEventType.MouseMove, 1025: SDLEventType.MouseDown, 1026: SDLEventType.MouseUp, 1027: SDLEventType.MouseScroll, 512: SDLEventType.WindowEvent, 0: SDLEventType.Unknown};
 
-    Image.fromPointer(Pointer<Void> ptr) {
-        _initRefs();
-        structPointer = ptr;
-    }
-
-    @mustCallSuper
-    void Destroy() {
-        _validatePointer('Destroy');
-        final out = _DestroyImage!(structPointer);
-
-        // this method invalidates the pointer, probably by freeing memory
-        structPointer = nullptr;
-
-        return out;
-    }
-
-    int get width {
-        _validatePointer('width');
-        return _ImageGetWidth!(structPointer);
-    }
-
-    int get height {
-        _validatePointer('height');
-        return _ImageGetHeight!(structPointer);
-    }
-
-}
-
-// ----------FILE: NATIVE/SDL/EVENT.GEN----------
-
-// ----------ENUMS----------
-
-enum SDLEventType {
-    Quit,
-    LowMemory,
-    KeyDown,
-    KeyUp,
-    MouseMove,
-    MouseDown,
-    MouseUp,
-    MouseScroll,
-    WindowEvent,
-    Unknown,
-}
-
-SDLEventType SDLEventTypeFromInt(int val) => SDLEventType.values[val];
-int SDLEventTypeToInt(SDLEventType val) => SDLEventType.values.indexOf(val);
+SDLEventType SDLEventTypeFromInt(int val) {
+    final out = _SDLEventTypeFromIntTable[val];
+    if (out == null) throw ArgumentError.value(val, 'val', 'Not a value of SDLEventType');
+    return out;
+}
+int SDLEventTypeToInt(SDLEventType val) => _SDLEventTypeToIntTable[val.index];
 
 String SDLEventTypeToString(SDLEventType val) {
     switch (val) {
@@ -511,8 +250,15 @@ enum WindowEventType {
     Unknown,
 }
 
-WindowEventType WindowEventTypeFromInt(int val) => WindowEventType.values[val];
-int WindowEventTypeToInt(WindowEventType val) => WindowEventType.values.indexOf(val);
+const _WindowEventTypeToIntTable = <int>[7, 9, 12, 13, 6, 4, 0];
+const _WindowEventTypeFromIntTable = <WindowEventType?>[WindowEventType.Unknown, null, null, null, WindowEventType.Moved, null, WindowEventType.SizeChanged, WindowEventType.Minimized, null, WindowEventType.Restored, null, null, WindowEventType.FocusGained, WindowEventType.FocusLost];
+
+WindowEventType WindowEventTypeFromInt(int val) {
+    final out = val >= 0 && val <= 13 ? _WindowEventTypeFromIntTable[val] : null;
+    if (out == null) throw ArgumentError.value(val, 'val', 'Not a value of WindowEventType');
+    return out;
+}
+int WindowEventTypeToInt(WindowEventType val) => _WindowEventTypeToIntTable[val.index];
 
 String WindowEventTypeToString(WindowEventType val) {
     switch (val) {
@@ -533,8 +279,15 @@ enum MouseButton {
     Unknown,
 }
 
-MouseButton MouseButtonFromInt(int val) => MouseButton.values[val];
-int MouseButtonToInt(MouseButton val) => MouseButton.values.indexOf(val);
+const _MouseButtonToIntTable = <int>[1, 2, 3, 0];
+const _MouseButtonFromIntTable = <MouseButton?>[MouseButton.Unknown, MouseButton.Left, MouseButton.Middle, MouseButton.Right];
+
+MouseButton MouseButtonFromInt(int val) {
+    final out = val >= 0 && val <= 3 ? _MouseButtonFromIntTable[val] : null;
+    if (out == null) throw ArgumentError.value(val, 'val', 'Not a value of MouseButton');
+    return out;
+}
+int MouseButtonToInt(MouseButton val) => _MouseButtonToIntTable[val.index];
 
 String MouseButtonToString(MouseButton val) {
     switch (val) {
@@ -671,7 +424,7 @@ enum KeyCode {
 }
 
 KeyCode KeyCodeFromInt(int val) => KeyCode.values[val];
-int KeyCodeToInt(KeyCode val) => KeyCode.values.indexOf(val);
+int KeyCodeToInt(KeyCode val) => val.index;
 
 String KeyCodeToString(KeyCode val) {
     switch (val) {
@@ -836,66 +589,51 @@ typedef _libEvent_class_Event_method_GetKeyPressReleaseData_sig = int Function(P
 typedef _libEvent_class_Event_method_GetWindowEventData_native_sig = Int32 Function(Pointer<Void>);
 typedef _libEvent_class_Event_method_GetWindowEventData_sig = int Function(Pointer<Void>);
 
+// int Drain(void* struct_ptr, int[length] records, int length)
+typedef _libEvent_class_Event_method_Drain_native_sig = Int32 Function(Pointer<Void>, Pointer<Int32>, Int32);
+typedef _libEvent_class_Event_method_Drain_sig = int Function(Pointer<Void>, Pointer<Int32>, int);
+
 // ----------CLASS IMPLEMENTATIONS----------
 
-class Event {
+class Event implements Finalizable {
     Pointer<Void> structPointer = nullptr;
 
+    // calls FreeEvent once this is garbage collected, unless it's already been called
+    static final _finalizer = NativeFinalizer(_libEvent.$FreeEvent);
+
+    void _attachFinalizer() {
+        if (structPointer.address != 0) _finalizer.attach(this, structPointer, detach: this);
+    }
+
+    // written to by the native side of @Out() params
+    static final Pointer<Int32> _outInt32_0 = malloc<Int32>();
+    static final Pointer<Int32> _outInt32_1 = malloc<Int32>();
+
     void _validatePointer(String methodName) {
         if (structPointer.address == 0) {
             throw Exception('Event.$methodName was called, but structPointer is a nullptr.');
         }
     }
 
-    static _libEvent_class_Event_method_CreateEvent_sig? _CreateEvent;
-    static _libEvent_class_Event_method_FreeEvent_sig? _FreeEvent;
-    static _libEvent_class_Event_method_GetEventType_sig? _GetEventType;
-    static _libEvent_class_Event_method_Poll_sig? _Poll;
-    static _libEvent_class_Event_method_GetMouseMoveData_sig? _GetMouseMoveData;
-    static _libEvent_class_Event_method_GetMousePressReleaseData_sig? _GetMousePressReleaseData;
-    static _libEvent_class_Event_method_GetKeyPressReleaseData_sig? _GetKeyPressReleaseData;
-    static _libEvent_class_Event_method_GetWindowEventData_sig? _GetWindowEventData;
-
-    void _initRefs() {
-        if (
-            _CreateEvent == null ||
-            _FreeEvent == null ||
-            _GetEventType == null ||
-            _Poll == null ||
-            _GetMouseMoveData == null ||
-            _GetMousePressReleaseData == null ||
-            _GetKeyPressReleaseData == null ||
-            _GetWindowEventData == null
-        ) {
-            final lib = DynamicLibrary.open('build/native/SDL/libEvent.so');
-
-            _CreateEvent = lib.lookupFunction<_libEvent_class_Event_method_CreateEvent_native_sig, _libEvent_class_Event_method_CreateEvent_sig>('CreateEvent');
-            _FreeEvent = lib.lookupFunction<_libEvent_class_Event_method_FreeEvent_native_sig, _libEvent_class_Event_method_FreeEvent_sig>('FreeEvent');
-            _GetEventType = lib.lookupFunction<_libEvent_class_Event_method_GetEventType_native_sig, _libEvent_class_Event_method_GetEventType_sig>('GetEventType');
-            _Poll = lib.lookupFunction<_libEvent_class_Event_method_Poll_native_sig, _libEvent_class_Event_method_Poll_sig>('Poll');
-            _GetMouseMoveData = lib.lookupFunction<_libEvent_class_Event_method_GetMouseMoveData_native_sig, _libEvent_class_Event_method_GetMouseMoveData_sig>('GetMouseMoveData');
-            _GetMousePressReleaseData = lib.lookupFunction<_libEvent_class_Event_method_GetMousePressReleaseData_native_sig, _libEvent_class_Event_method_GetMousePressReleaseData_sig>('GetMousePressReleaseData');
-            _GetKeyPressReleaseData = lib.lookupFunction<_libEvent_class_Event_method_GetKeyPressReleaseData_native_sig, _libEvent_class_Event_method_GetKeyPressReleaseData_sig>('GetKeyPressReleaseData');
-            _GetWindowEventData = lib.lookupFunction<_libEvent_class_Event_method_GetWindowEventData_native_sig, _libEvent_class_Event_method_GetWindowEventData_sig>('GetWindowEventData');
-        }
-    }
-
     Event() {
-        _initRefs();
-        structPointer = _CreateEvent!();
+        structPointer = _libEvent.CreateEvent();
+        _attachFinalizer();
     }
 
-    Event.fromPointer(Pointer<Void> ptr) {
-        _initRefs();
+    /// Only [owned] ones are freed when they're garbage collected - otherwise whoever handed out
+    /// ptr is still responsible for it.
+    Event.fromPointer(Pointer<Void> ptr, {bool owned = false}) {
         structPointer = ptr;
+        if (owned) _attachFinalizer();
     }
 
     @mustCallSuper
     void Free() {
         _validatePointer('Free');
-        final out = _FreeEvent!(structPointer);
+        final out = _libEvent.FreeEvent(structPointer);
 
         // this method invalidates the pointer, probably by freeing memory
+        _finalizer.detach(this);
         structPointer = nullptr;
 
         return out;
@@ -903,33 +641,531 @@ class Event {
 
     SDLEventType get type {
         _validatePointer('type');
-        return SDLEventTypeFromInt(_GetEventType!(structPointer));
+        return SDLEventTypeFromInt(_libEvent.GetEventType(structPointer));
     }
 
     int Poll() {
         _validatePointer('Poll');
-        return _Poll!(structPointer);
+        return _libEvent.Poll(structPointer);
     }
 
-    void GetMouseMoveData(Pointer<Int32> x, Pointer<Int32> y) {
+    EventGetMouseMoveDataResult GetMouseMoveData() {
         _validatePointer('GetMouseMoveData');
-        return _GetMouseMoveData!(structPointer, x, y);
+        _libEvent.GetMouseMoveData(structPointer, _outInt32_0, _outInt32_1);
+        return EventGetMouseMoveDataResult(_outInt32_0.value, _outInt32_1.value);
     }
 
-    MouseButton GetMousePressReleaseData(Pointer<Int32> x, Pointer<Int32> y) {
+    EventGetMousePressReleaseDataResult GetMousePressReleaseData() {
         _validatePointer('GetMousePressReleaseData');
-        return MouseButtonFromInt(_GetMousePressReleaseData!(structPointer, x, y));
+        final $value = MouseButtonFromInt(_libEvent.GetMousePressReleaseData(structPointer, _outInt32_0, _outInt32_1));
+        return EventGetMousePressReleaseDataResult($value, _outInt32_0.value, _outInt32_1.value);
     }
 
     KeyCode GetKeyPressReleaseData() {
         _validatePointer('GetKeyPressReleaseData');
-        return KeyCodeFromInt(_GetKeyPressReleaseData!(structPointer));
+        return KeyCodeFromInt(_libEvent.GetKeyPressReleaseData(structPointer));
     }
 
     WindowEventType GetWindowEventData() {
         _validatePointer('GetWindowEventData');
-        return WindowEventTypeFromInt(_GetWindowEventData!(structPointer));
+        return WindowEventTypeFromInt(_libEvent.GetWindowEventData(structPointer));
+    }
+
+    int Drain(Int32List records) {
+        _validatePointer('Drain');
+        final $scratch = _libEvent.strings;
+        final $scope = $scratch.mark();
+        try {
+            return _libEvent.Drain(structPointer, $scratch.int32s(records), records.length);
+        } finally {
+            $scratch.release($scope);
+        }
+    }
+
+}
+
+class EventGetMouseMoveDataResult {
+    final int x;
+    final int y;
+
+    const EventGetMouseMoveDataResult(this.x, this.y);
+}
+
+class EventGetMousePressReleaseDataResult {
+    final MouseButton value;
+    final int x;
+    final int y;
+
+    const EventGetMousePressReleaseDataResult(this.value, this.x, this.y);
+}
+
+// ----------BINDINGS FOR LIBEVENT----------
+
+const libEventPath = 'native/SDL/libEvent.so';
+
+class _libEvent_bindings {
+    final _lib = DynamicLibrary.open(nativeLibraryPath(libEventPath));
+    final strings = StringScratch();
+
+    late final _libEvent_class_Event_method_CreateEvent_sig CreateEvent = _lib.lookupFunction<_libEvent_class_Event_method_CreateEvent_native_sig, _libEvent_class_Event_method_CreateEvent_sig>('CreateEvent');
+    late final _libEvent_class_Event_method_FreeEvent_sig FreeEvent = _lib.lookupFunction<_libEvent_class_Event_method_FreeEvent_native_sig, _libEvent_class_Event_method_FreeEvent_sig>('FreeEvent');
+    late final _libEvent_class_Event_method_GetEventType_sig GetEventType = _lib.lookupFunction<_libEvent_class_Event_method_GetEventType_native_sig, _libEvent_class_Event_method_GetEventType_sig>('GetEventType');
+    late final _libEvent_class_Event_method_Poll_sig Poll = _lib.lookupFunction<_libEvent_class_Event_method_Poll_native_sig, _libEvent_class_Event_method_Poll_sig>('Poll');
+    late final _libEvent_class_Event_method_GetMouseMoveData_sig GetMouseMoveData = _lib.lookupFunction<_libEvent_class_Event_method_GetMouseMoveData_native_sig, _libEvent_class_Event_method_GetMouseMoveData_sig>('GetMouseMoveData');
+    late final _libEvent_class_Event_method_GetMousePressReleaseData_sig GetMousePressReleaseData = _lib.lookupFunction<_libEvent_class_Event_method_GetMousePressReleaseData_native_sig, _libEvent_class_Event_method_GetMousePressReleaseData_sig>('GetMousePressReleaseData');
+    late final _libEvent_class_Event_method_GetKeyPressReleaseData_sig GetKeyPressReleaseData = _lib.lookupFunction<_libEvent_class_Event_method_GetKeyPressReleaseData_native_sig, _libEvent_class_Event_method_GetKeyPressReleaseData_sig>('GetKeyPressReleaseData');
+    late final _libEvent_class_Event_method_GetWindowEventData_sig GetWindowEventData = _lib.lookupFunction<_libEvent_class_Event_method_GetWindowEventData_native_sig, _libEvent_class_Event_method_GetWindowEventData_sig>('GetWindowEventData');
+    late final _libEvent_class_Event_method_Drain_sig Drain = _lib.lookupFunction<_libEvent_class_Event_method_Drain_native_sig, _libEvent_class_Event_method_Drain_sig>('Drain');
+    late final $FreeEvent = _lib.lookup<NativeFinalizerFunction>('FreeEvent');
+}
+
+final _libEvent = _libEvent_bindings();
+
+// ----------FILE: NATIVE/SDL/IMAGE.GEN----------
+
+// ----------FUNC SIG TYPEDEFS FOR CLASSES----------
+
+// ----------IMAGE----------
+
+// void* InitImage(RenderWindow* rw, char* fname)
+typedef _libImage_class_Image_method_InitImage_native_sig = Pointer<Void> Function(Pointer<Void>, Pointer<Utf8>);
+typedef _libImage_class_Image_method_InitImage_sig = Pointer<Void> Function(Pointer<Void>, Pointer<Utf8>);
+
+// void DestroyImage(void* struct_ptr)
+typedef _libImage_class_Image_method_DestroyImage_native_sig = Void Function(Pointer<Void>);
+typedef _libImage_class_Image_method_DestroyImage_sig = void Function(Pointer<Void>);
+
+// int Image_DestroyDeferred()
+typedef _libImage_class_Image_destroy_deferred_native_sig = Int32 Function();
+typedef _libImage_class_Image_destroy_deferred_sig = int Function();
+
+// ----------CLASS IMPLEMENTATIONS----------
+
+// Image's memory, which the generated C header declares as well
+class _ImageStruct extends Struct {
+    external Pointer<Void> imageTexture;
+
+    @Int32()
+    external int width;
+
+    @Int32()
+    external int height;
+}
+
+class Image implements Finalizable {
+    Pointer<Void> structPointer = nullptr;
+
+    // DestroyImage can't run on whatever thread the GC's on, so this just queues the pointer up
+    // for destroyDeferred
+    static final _finalizer = NativeFinalizer(_libImage.$Image_DeferDestroy);
+
+    void _attachFinalizer() {
+        if (structPointer.address != 0) _finalizer.attach(this, structPointer, detach: this);
+    }
+
+    /// Calls Destroy on every Image that's been garbage collected since last time,
+    /// & returns how many. This happens whenever a new Image is made anyway.
+    static int destroyDeferred() => _libImage.Image_DestroyDeferred();
+
+    void _validatePointer(String methodName) {
+        if (structPointer.address == 0) {
+            throw Exception('Image.$methodName was called, but structPointer is a nullptr.');
+        }
+    }
+
+    Image(RenderWindow rw, String fname) {
+        destroyDeferred();
+        final $scratch = _libImage.strings;
+        final $scope = $scratch.mark();
+        try {
+            structPointer = _libImage.InitImage(rw.structPointer, $scratch.encode(fname));
+        } finally {
+            $scratch.release($scope);
+        }
+        _attachFinalizer();
+    }
+
+    /// Only [owned] ones are freed when they're garbage collected - otherwise whoever handed out
+    /// ptr is still responsible for it.
+    Image.fromPointer(Pointer<Void> ptr, {bool owned = false}) {
+        structPointer = ptr;
+        if (owned) _attachFinalizer();
+    }
+
+    _ImageStruct get _struct => _libImage.structImage(structPointer);
+
+    Pointer<Void> get imageTexture {
+        _validatePointer('imageTexture');
+        return _struct.imageTexture;
+    }
+
+    int get width {
+        _validatePointer('width');
+        return _struct.width;
+    }
+
+    int get height {
+        _validatePointer('height');
+        return _struct.height;
+    }
+
+    @mustCallSuper
+    void Destroy() {
+        _validatePointer('Destroy');
+        final out = _libImage.DestroyImage(structPointer);
+
+        // this method invalidates the pointer, probably by freeing memory
+        _finalizer.detach(this);
+        structPointer = nullptr;
+
+        return out;
+    }
+
+}
+
+// ----------BINDINGS FOR LIBIMAGE----------
+
+const libImagePath = 'native/SDL/libImage.so';
+
+class _libImage_bindings {
+    final _lib = DynamicLibrary.open(nativeLibraryPath(libImagePath));
+    final strings = StringScratch();
+
+    _libImage_bindings() {
+        checkStructLayout('Image', sizeOf<_ImageStruct>(), 16, [
+            StructField('imageTexture', 0, (memory) => memory.cast<_ImageStruct>().ref.imageTexture = nullptr),
+            StructField('width', 8, (memory) => memory.cast<_ImageStruct>().ref.width = 0),
+            StructField('height', 12, (memory) => memory.cast<_ImageStruct>().ref.height = 0),
+        ]);
+    }
+
+    _ImageStruct structImage(Pointer<Void> pointer) => pointer.cast<_ImageStruct>().ref;
+
+    late final _libImage_class_Image_method_InitImage_sig InitImage = _lib.lookupFunction<_libImage_class_Image_method_InitImage_native_sig, _libImage_class_Image_method_InitImage_sig>('InitImage');
+    late final _libImage_class_Image_method_DestroyImage_sig DestroyImage = _lib.lookupFunction<_libImage_class_Image_method_DestroyImage_native_sig, _libImage_class_Image_method_DestroyImage_sig>('DestroyImage');
+    late final _libImage_class_Image_destroy_deferred_sig Image_DestroyDeferred = _lib.lookupFunction<_libImage_class_Image_destroy_deferred_native_sig, _libImage_class_Image_destroy_deferred_sig>('Image_DestroyDeferred');
+    late final $Image_DeferDestroy = _lib.lookup<NativeFinalizerFunction>('Image_DeferDestroy');
+}
+
+final _libImage = _libImage_bindings();
+
+// ----------FILE: NATIVE/SDL/RENDERWINDOW.GEN----------
+
+// ----------ENUMS----------
+
+enum SDLInitCode {
+    Success,
+    InitVideo_Fail,
+    TTF_Init_Fail,
+    CreateWindow_Fail,
+    CreateRenderer_Fail,
+}
+
+SDLInitCode SDLInitCodeFromInt(int val) => SDLInitCode.values[val];
+int SDLInitCodeToInt(SDLInitCode val) => val.index;
+
+String SDLInitCodeToString(SDLInitCode val) {
+    switch (val) {
+        case SDLInitCode.Success: { return 'Success'; }
+        case SDLInitCode.InitVideo_Fail: { return 'SDL_InitVideo() failed'; }
+        case SDLInitCode.TTF_Init_Fail: { return 'TTF_Init() failed'; }
+        case SDLInitCode.CreateWindow_Fail: { return 'SDL_CreateWindow() failed'; }
+        case SDLInitCode.CreateRenderer_Fail: { return 'SDL_CreateRenderer() failed'; }
+    }
+}
+
+enum Cursor {
+    Arrow,
+    Hand,
+    SizeAll,
+    SizeVertical,
+    SizeHorizontal,
+}
+
+Cursor CursorFromInt(int val) => Cursor.values[val];
+int CursorToInt(Cursor val) => val.index;
+
+String CursorToString(Cursor val) {
+    switch (val) {
+        case Cursor.Arrow: { return 'Arrow'; }
+        case Cursor.Hand: { return 'Hand'; }
+        case Cursor.SizeAll: { return 'SizeAll'; }
+        case Cursor.SizeVertical: { return 'SizeVertical'; }
+        case Cursor.SizeHorizontal: { return 'SizeHorizontal'; }
+    }
+}
+
+// ----------FUNC SIG TYPEDEFS FOR CLASSES----------
+
+// ----------RENDERWINDOW----------
+
+// void* InitRenderWindow(char* title)
+typedef _libRenderWindow_class_RenderWindow_method_InitRenderWindow_native_sig = Pointer<Void> Function(Pointer<Utf8>);
+typedef _libRenderWindow_class_RenderWindow_method_InitRenderWindow_sig = Pointer<Void> Function(Pointer<Utf8>);
+
+// void DestroyRenderWindow(void* struct_ptr)
+typedef _libRenderWindow_class_RenderWindow_method_DestroyRenderWindow_native_sig = Void Function(Pointer<Void>);
+typedef _libRenderWindow_class_RenderWindow_method_DestroyRenderWindow_sig = void Function(Pointer<Void>);
+
+// SDLInitCode RWGetErrorCode(void* struct_ptr)
+typedef _libRenderWindow_class_RenderWindow_method_RWGetErrorCode_native_sig = Int32 Function(Pointer<Void>);
+typedef _libRenderWindow_class_RenderWindow_method_RWGetErrorCode_sig = int Function(Pointer<Void>);
+
+// int RWGetFrameCount(void* struct_ptr)
+typedef _libRenderWindow_class_RenderWindow_method_RWGetFrameCount_native_sig = Int32 Function(Pointer<Void>);
+typedef _libRenderWindow_class_RenderWindow_method_RWGetFrameCount_sig = int Function(Pointer<Void>);
+
+// void RWGetSize(void* struct_ptr, int* width, int* height)
+typedef _libRenderWindow_class_RenderWindow_method_RWGetSize_native_sig = Void Function(Pointer<Void>, Pointer<Int32>, Pointer<Int32>);
+typedef _libRenderWindow_class_RenderWindow_method_RWGetSize_sig = void Function(Pointer<Void>, Pointer<Int32>, Pointer<Int32>);
+
+// void Flush(void* struct_ptr)
+typedef _libRenderWindow_class_RenderWindow_method_Flush_native_sig = Void Function(Pointer<Void>);
+typedef _libRenderWindow_class_RenderWindow_method_Flush_sig = void Function(Pointer<Void>);
+
+// void SetCursor(void* struct_ptr, Cursor cursor)
+typedef _libRenderWindow_class_RenderWindow_method_SetCursor_native_sig = Void Function(Pointer<Void>, Int32);
+typedef _libRenderWindow_class_RenderWindow_method_SetCursor_sig = void Function(Pointer<Void>, int);
+
+// void SetColour(void* struct_ptr, int r, int g, int b, int a)
+typedef _libRenderWindow_class_RenderWindow_method_SetColour_native_sig = Void Function(Pointer<Void>, Int32, Int32, Int32, Int32);
+typedef _libRenderWindow_class_RenderWindow_method_SetColour_sig = void Function(Pointer<Void>, int, int, int, int);
+
+// void DrawPoint(void* struct_ptr, int x, int y)
+typedef _libRenderWindow_class_RenderWindow_method_DrawPoint_native_sig = Void Function(Pointer<Void>, Int32, Int32);
+typedef _libRenderWindow_class_RenderWindow_method_DrawPoint_sig = void Function(Pointer<Void>, int, int);
+
+// void DrawLine(void* struct_ptr, int x1, int y1, int x2, int y2)
+typedef _libRenderWindow_class_RenderWindow_method_DrawLine_native_sig = Void Function(Pointer<Void>, Int32, Int32, Int32, Int32);
+typedef _libRenderWindow_class_RenderWindow_method_DrawLine_sig = void Function(Pointer<Void>, int, int, int, int);
+
+// void DrawPoints(void* struct_ptr, int[count] xs, int[count] ys, int count)
+typedef _libRenderWindow_class_RenderWindow_method_DrawPoints_native_sig = Void Function(Pointer<Void>, Pointer<Int32>, Pointer<Int32>, Int32);
+typedef _libRenderWindow_class_RenderWindow_method_DrawPoints_sig = void Function(Pointer<Void>, Pointer<Int32>, Pointer<Int32>, int);
+
+// void DrawRect(void* struct_ptr, int x, int y, int w, int h)
+typedef _libRenderWindow_class_RenderWindow_method_DrawRect_native_sig = Void Function(Pointer<Void>, Int32, Int32, Int32, Int32);
+typedef _libRenderWindow_class_RenderWindow_method_DrawRect_sig = void Function(Pointer<Void>, int, int, int, int);
+
+// void FillRect(void* struct_ptr, int x, int y, int w, int h)
+typedef _libRenderWindow_class_RenderWindow_method_FillRect_native_sig = Void Function(Pointer<Void>, Int32, Int32, Int32, Int32);
+typedef _libRenderWindow_class_RenderWindow_method_FillRect_sig = void Function(Pointer<Void>, int, int, int, int);
+
+// void DrawText(void* struct_ptr, BeansFont* font, char* text, int x, int y, int r, int g, int b, int a)
+typedef _libRenderWindow_class_RenderWindow_method_DrawText_native_sig = Void Function(Pointer<Void>, Pointer<Void>, Pointer<Utf8>, Int32, Int32, Int32, Int32, Int32, Int32);
+typedef _libRenderWindow_class_RenderWindow_method_DrawText_sig = void Function(Pointer<Void>, Pointer<Void>, Pointer<Utf8>, int, int, int, int, int, int);
+
+// void DrawImage(void* struct_ptr, Image* image, int x, int y, double scale)
+typedef _libRenderWindow_class_RenderWindow_method_DrawImage_native_sig = Void Function(Pointer<Void>, Pointer<Void>, Int32, Int32, Double);
+typedef _libRenderWindow_class_RenderWindow_method_DrawImage_sig = void Function(Pointer<Void>, Pointer<Void>, int, int, double);
+
+// void RenderWindow_RunBatch(void* struct_ptr, int64_t* commands, int length)
+typedef _libRenderWindow_class_RenderWindow_batch_native_sig = Void Function(Pointer<Void>, Pointer<Int64>, Int32);
+typedef _libRenderWindow_class_RenderWindow_batch_sig = void Function(Pointer<Void>, Pointer<Int64>, int);
+
+// ----------CLASS IMPLEMENTATIONS----------
+
+class RenderWindow {
+    Pointer<Void> structPointer = nullptr;
+
+    // written to by the native side of @Out() params
+    static final Pointer<Int32> _outInt32_0 = malloc<Int32>();
+    static final Pointer<Int32> _outInt32_1 = malloc<Int32>();
+
+    // @Batchable() methods queue up in here, & only actually run when it's flushed - which happens
+    // when it fills up, or before any other method on this runs
+    late final _batch = CommandBuffer((commands, length) => _libRenderWindow.RenderWindow_RunBatch(structPointer, commands, length));
+
+    void _validatePointer(String methodName) {
+        if (structPointer.address == 0) {
+            throw Exception('RenderWindow.$methodName was called, but structPointer is a nullptr.');
+        }
+    }
+
+    RenderWindow(String title) {
+        final $scratch = _libRenderWindow.strings;
+        final $scope = $scratch.mark();
+        try {
+            structPointer = _libRenderWindow.InitRenderWindow($scratch.encode(title));
+        } finally {
+            $scratch.release($scope);
+        }
+    }
+
+    RenderWindow.fromPointer(Pointer<Void> ptr) {
+        structPointer = ptr;
+    }
+
+    // only needed if something other than this object has to see what's been batched so far
+    void flushBatch() => _batch.flush();
+
+    @mustCallSuper
+    void Destroy() {
+        _validatePointer('Destroy');
+        _batch.flush();
+        final out = _libRenderWindow.DestroyRenderWindow(structPointer);
+
+        // this method invalidates the pointer, probably by freeing memory
+        _batch.free();
+        structPointer = nullptr;
+
+        return out;
+    }
+
+    SDLInitCode get errorCode {
+        _validatePointer('errorCode');
+        _batch.flush();
+        return SDLInitCodeFromInt(_libRenderWindow.RWGetErrorCode(structPointer));
+    }
+
+    int get frameCount {
+        _validatePointer('frameCount');
+        _batch.flush();
+        return _libRenderWindow.RWGetFrameCount(structPointer);
+    }
+
+    RenderWindowGetSizeResult GetSize() {
+        _validatePointer('GetSize');
+        _batch.flush();
+        _libRenderWindow.RWGetSize(structPointer, _outInt32_0, _outInt32_1);
+        return RenderWindowGetSizeResult(_outInt32_0.value, _outInt32_1.value);
+    }
+
+    void Flush() {
+        _validatePointer('Flush');
+        _batch.flush();
+        return _libRenderWindow.Flush(structPointer);
     }
 
+    void SetCursor(Cursor cursor) {
+        _validatePointer('SetCursor');
+        _batch.flush();
+        return _libRenderWindow.SetCursor(structPointer, CursorToInt(cursor));
+    }
+
+    void cSetColour(int r, int g, int b, int a) {
+        _validatePointer('cSetColour');
+        final $batch = _batch;
+        final $at = $batch.begin(0, 5);
+        $batch.ints[$at] = r;
+        $batch.ints[$at + 1] = g;
+        $batch.ints[$at + 2] = b;
+        $batch.ints[$at + 3] = a;
+    }
+
+    void cDrawPoint(int x, int y) {
+        _validatePointer('cDrawPoint');
+        final $batch = _batch;
+        final $at = $batch.begin(1, 3);
+        $batch.ints[$at] = x;
+        $batch.ints[$at + 1] = y;
+    }
+
+    void cDrawLine(int x1, int y1, int x2, int y2) {
+        _validatePointer('cDrawLine');
+        final $batch = _batch;
+        final $at = $batch.begin(2, 5);
+        $batch.ints[$at] = x1;
+        $batch.ints[$at + 1] = y1;
+        $batch.ints[$at + 2] = x2;
+        $batch.ints[$at + 3] = y2;
+    }
+
+    void cDrawPoints(Int32List xs, Int32List ys) {
+        _validatePointer('cDrawPoints');
+        if (ys.length != xs.length) throw ArgumentError.value(ys, 'ys', 'Must be the same length as xs');
+        _batch.flush();
+        final $scratch = _libRenderWindow.strings;
+        final $scope = $scratch.mark();
+        try {
+            return _libRenderWindow.DrawPoints(structPointer, $scratch.int32s(xs), $scratch.int32s(ys), xs.length);
+        } finally {
+            $scratch.release($scope);
+        }
+    }
+
+    void cDrawRect(int x, int y, int w, int h) {
+        _validatePointer('cDrawRect');
+        final $batch = _batch;
+        final $at = $batch.begin(3, 5);
+        $batch.ints[$at] = x;
+        $batch.ints[$at + 1] = y;
+        $batch.ints[$at + 2] = w;
+        $batch.ints[$at + 3] = h;
+    }
+
+    void cFillRect(int x, int y, int w, int h) {
+        _validatePointer('cFillRect');
+        final $batch = _batch;
+        final $at = $batch.begin(4, 5);
+        $batch.ints[$at] = x;
+        $batch.ints[$at + 1] = y;
+        $batch.ints[$at + 2] = w;
+        $batch.ints[$at + 3] = h;
+    }
+
+    void cDrawText(BeansFont font, String text, int x, int y, int r, int g, int b, int a) {
+        _validatePointer('cDrawText');
+        final $textBytes = CommandBuffer.encode(text);
+        final $batch = _batch;
+        final $at = $batch.begin(5, 9 + CommandBuffer.stringSlots($textBytes));
+        $batch.retain(font);
+        $batch.ints[$at] = font.structPointer.address;
+        $batch.ints[$at + 1] = $textBytes.length;
+        $batch.ints[$at + 2] = x;
+        $batch.ints[$at + 3] = y;
+        $batch.ints[$at + 4] = r;
+        $batch.ints[$at + 5] = g;
+        $batch.ints[$at + 6] = b;
+        $batch.ints[$at + 7] = a;
+        $batch.putString($at + 8, $textBytes);
+    }
+
+    void cDrawImage(Image image, int x, int y, double scale) {
+        _validatePointer('cDrawImage');
+        final $batch = _batch;
+        final $at = $batch.begin(6, 5);
+        $batch.retain(image);
+        $batch.ints[$at] = image.structPointer.address;
+        $batch.ints[$at + 1] = x;
+        $batch.ints[$at + 2] = y;
+        $batch.doubles[$at + 3] = scale;
+    }
+
+}
+
+class RenderWindowGetSizeResult {
+    final int width;
+    final int height;
+
+    const RenderWindowGetSizeResult(this.width, this.height);
 }
 
+// ----------BINDINGS FOR LIBRENDERWINDOW----------
+
+const libRenderWindowPath = 'native/SDL/libRenderWindow.so';
+
+class _libRenderWindow_bindings {
+    final _lib = DynamicLibrary.open(nativeLibraryPath(libRenderWindowPath));
+    final strings = StringScratch();
+
+    late final _libRenderWindow_class_RenderWindow_method_InitRenderWindow_sig InitRenderWindow = _lib.lookupFunction<_libRenderWindow_class_RenderWindow_method_InitRenderWindow_native_sig, _libRenderWindow_class_RenderWindow_method_InitRenderWindow_sig>('InitRenderWindow');
+    late final _libRenderWindow_class_RenderWindow_method_DestroyRenderWindow_sig DestroyRenderWindow = _lib.lookupFunction<_libRenderWindow_class_RenderWindow_method_DestroyRenderWindow_native_sig, _libRenderWindow_class_RenderWindow_method_DestroyRenderWindow_sig>('DestroyRenderWindow');
+    late final _libRenderWindow_class_RenderWindow_method_RWGetErrorCode_sig RWGetErrorCode = _lib.lookupFunction<_libRenderWindow_class_RenderWindow_method_RWGetErrorCode_native_sig, _libRenderWindow_class_RenderWindow_method_RWGetErrorCode_sig>('RWGetErrorCode');
+    late final _libRenderWindow_class_RenderWindow_method_RWGetFrameCount_sig RWGetFrameCount = _lib.lookupFunction<_libRenderWindow_class_RenderWindow_method_RWGetFrameCount_native_sig, _libRenderWindow_class_RenderWindow_method_RWGetFrameCount_sig>('RWGetFrameCount');
+    late final _libRenderWindow_class_RenderWindow_method_RWGetSize_sig RWGetSize = _lib.lookupFunction<_libRenderWindow_class_RenderWindow_method_RWGetSize_native_sig, _libRenderWindow_class_RenderWindow_method_RWGetSize_sig>('RWGetSize');
+    late final _libRenderWindow_class_RenderWindow_method_Flush_sig Flush = _lib.lookupFunction<_libRenderWindow_class_RenderWindow_method_Flush_native_sig, _libRenderWindow_class_RenderWindow_method_Flush_sig>('Flush');
+    late final _libRenderWindow_class_RenderWindow_method_SetCursor_sig SetCursor = _lib.lookupFunction<_libRenderWindow_class_RenderWindow_method_SetCursor_native_sig, _libRenderWindow_class_RenderWindow_method_SetCursor_sig>('SetCursor');
+    late final _libRenderWindow_class_RenderWindow_method_SetColour_sig SetColour = _lib.lookupFunction<_libRenderWindow_class_RenderWindow_method_SetColour_native_sig, _libRenderWindow_class_RenderWindow_method_SetColour_sig>('SetColour');
+    late final _libRenderWindow_class_RenderWindow_method_DrawPoint_sig DrawPoint = _lib.lookupFunction<_libRenderWindow_class_RenderWindow_method_DrawPoint_native_sig, _libRenderWindow_class_RenderWindow_method_DrawPoint_sig>('DrawPoint');
+    late final _libRenderWindow_class_RenderWindow_method_DrawLine_sig DrawLine = _lib.lookupFunction<_libRenderWindow_class_RenderWindow_method_DrawLine_native_sig, _libRenderWindow_class_RenderWindow_method_DrawLine_sig>('DrawLine');
+    late final _libRenderWindow_class_RenderWindow_method_DrawPoints_sig DrawPoints = _lib.lookupFunction<_libRenderWindow_class_RenderWindow_method_DrawPoints_native_sig, _libRenderWindow_class_RenderWindow_method_DrawPoints_sig>('DrawPoints');
+    late final _libRenderWindow_class_RenderWindow_method_DrawRect_sig DrawRect = _lib.lookupFunction<_libRenderWindow_class_RenderWindow_method_DrawRect_native_sig, _libRenderWindow_class_RenderWindow_method_DrawRect_sig>('DrawRect');
+    late final _libRenderWindow_class_RenderWindow_method_FillRect_sig FillRect = _lib.lookupFunction<_libRenderWindow_class_RenderWindow_method_FillRect_native_sig, _libRenderWindow_class_RenderWindow_method_FillRect_sig>('FillRect');
+    late final _libRenderWindow_class_RenderWindow_method_DrawText_sig DrawText = _lib.lookupFunction<_libRenderWindow_class_RenderWindow_method_DrawText_native_sig, _libRenderWindow_class_RenderWindow_method_DrawText_sig>('DrawText');
+    late final _libRenderWindow_class_RenderWindow_method_DrawImage_sig DrawImage = _lib.lookupFunction<_libRenderWindow_class_RenderWindow_method_DrawImage_native_sig, _libRenderWindow_class_RenderWindow_method_DrawImage_sig>('DrawImage');
+    late final _libRenderWindow_class_RenderWindow_batch_sig RenderWindow_RunBatch = _lib.lookupFunction<_libRenderWindow_class_RenderWindow_batch_native_sig, _libRenderWindow_class_RenderWindow_batch_sig>('RenderWindow_RunBatch');
+}
+
+final _libRenderWindow = _libRenderWindow_bindings();
+
@@ -1,17 +1,61 @@
 from dataclasses import dataclass
-@dataclass
+from typing import Iterator, Optional
+
+@dataclass(frozen = True, slots = True)
 class CodegenAnnotation:
     name: str
-    args: list[str]
+    args: tuple[str, ...]
 
     def __str__(self) -> str:
         return f"@{self.name}({', '.join(self.args)})"
 
-def has_annotation(annotations: list[CodegenAnnotation], name: str) -> bool:
-    for annotation in annotations:
-        if annotation.name == name: return True
-    
-    return False
+# The annotations on one node, in the order they were written, plus a map for finding
+# them by name. If there's more than one with the same name (eg a file with a few
+# @LinkWithLib()s), the map has the first one - iterate to get all of them.
+class Annotations:
+    __slots__ = ("ordered", "by_name")
+
+    def __init__(self, ordered: tuple[CodegenAnnotation, ...]):
+        self.ordered = ordered
+        self.by_name: dict[str, CodegenAnnotation] = {}
+        for annotation in ordered:
+            self.by_name.setdefault(annotation.name, annotation)
+
+    # most things don't have any annotations, so they all share one empty set
+    @staticmethod
+    def of(annotations: list[CodegenAnnotation] | tuple[CodegenAnnotation, ...]) -> "Annotations":
+        if len(annotations) == 0: return NO_ANNOTATIONS
+        return Annotations(tuple(annotations))
+
+    def __iter__(self) -> Iterator[CodegenAnnotation]:
+        return iter(self.ordered)
+
+    def __len__(self) -> int:
+        return len(self.ordered)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.by_name
+
+    def get(self, name: str) -> Optional[CodegenAnnotation]:
+        return self.by_name.get(name)
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Annotations) and self.ordered == other.ordered
+
+    def __hash__(self) -> int:
+        return hash(self.ordered)
+
+    def __repr__(self) -> str:
+        return f"Annotations({list(self.ordered)})"
+
+    # so that unpickling keeps NO_ANNOTATIONS shared
+    def __reduce__(self):
+        return (Annotations.of, (self.ordered,))
+
+NO_ANNOTATIONS = Annotations(())
+
+def has_annotation(annotations: Annotations, name: str) -> bool:
+    return name in annotations
 
-def get_annotation(annotations: list[CodegenAnnotation], name: str) -> CodegenAnnotation:
-    return list(filter(lambda a: a.name == name, annotations))[0]
\ No newline at end of file
+def get_annotation(annotations: Annotations, name: str) -> CodegenAnnotation:
+    return annotations.by_name[name]
@@ -0,0 +1,101 @@
+import os
+import os.path as path
+import random
+from dataclasses import dataclass
+
+# Synthetic .gen files for benchmarking the codegen. Everything generated here is valid
+# input, and only uses types declared in the same file, so any subset of it is too.
+
+PARAM_TYPES = ["int", "double", "char*", "int*", "bool"]
+
+@dataclass
+class CorpusShape:
+    files: int = 200
+    enums: int = 2
+    # values per enum
+    enum_values: int = 8
+    classes: int = 2
+    # per class, not counting the initializer & destructor
+    methods: int = 8
+    # top-level functions per file
+    functions: int = 2
+    params: int = 3
+    # fraction of methods & functions which get an annotation (@Show, or @Getter for methods with no params)
+    annotation_density: float = 0.25
+    seed: int = 0
+
+def param_list(params: int, offset: int) -> str:
+    return ", ".join(
+        f"{PARAM_TYPES[(offset + param_idx) % len(PARAM_TYPES)]} p{param_idx}"
+        for param_idx in range(params)
+    )
+
+def annotation(rng: random.Random, shape: CorpusShape, name: str, params: int, indent: str, is_method: bool) -> str:
+    if rng.random() >= shape.annotation_density:
+        return ""
+    if params == 0 and is_method:
+        return f"{indent}@Getter(get{name})\n"
+    return f"{indent}@Show(show{name})\n"
+
+def gen_file_contents(file_idx: int, shape: CorpusShape) -> str:
+    enums, classes, methods, params = shape.enums, shape.classes, shape.methods, shape.params
+    rng = random.Random(shape.seed * 1_000_003 + file_idx)
+    prefix = f"F{file_idx}"
+    out = "@LinkWithLib(m)\n\n"
+
+    for enum_idx in range(enums):
+        out += f"enum {prefix}Enum{enum_idx} {{\n"
+        for value_idx in range(shape.enum_values):
+            out += f"    Value{value_idx} // value {value_idx}\n"
+        out += "}\n\n"
+
+    for function_idx in range(shape.functions):
+        name = f"{prefix}Function{function_idx}"
+        out += annotation(rng, shape, name, params, "", False)
+        out += f"int {name}({param_list(params, function_idx)})\n\n"
+
+    for class_idx in range(classes):
+        class_name = f"{prefix}Class{class_idx}"
+        out += f"class {class_name} {{\n"
+        out +=  "    @Initializer()\n"
+        out += f"    void* Init{class_name}(int size)\n\n"
+        out +=  "    @Invalidates()\n"
+        out +=  "    @Show(Destroy)\n"
+        out += f"    void Destroy{class_name}()\n\n"
+
+        for method_idx in range(methods):
+            name = f"{class_name}Method{method_idx}"
+            if enums > 0 and method_idx % 3 == 0:
+                return_type = f"{prefix}Enum{method_idx % enums}"
+            else:
+                return_type = "int"
+            out += annotation(rng, shape, name, params, "    ", True)
+            out += f"    {return_type} {name}({param_list(params, method_idx)})\n"
+        out += "}\n\n"
+
+    return out
+
+# writes shape.files .gen files into root/native, returns their paths
+def write_shaped_corpus(root: str, shape: CorpusShape) -> list[str]:
+    native_dir = path.join(root, "native", "bench")
+    os.makedirs(native_dir, exist_ok = True)
+
+    out: list[str] = []
+    for file_idx in range(shape.files):
+        fname = path.join(native_dir, f"Bench{file_idx}.gen")
+        with open(fname, "wt") as fh:
+            fh.write(gen_file_contents(file_idx, shape))
+        out.append(fname)
+
+    return out
+
+def write_corpus(root: str, files_count: int, enums: int = 2, classes: int = 2, methods: int = 8, params: int = 3) -> list[str]:
+    return write_shaped_corpus(root, CorpusShape(
+        files = files_count,
+        enums = enums,
+        classes = classes,
+        methods = methods,
+        functions = 0,
+        params = params,
+        annotation_density = 0
+    ))
@@ -0,0 +1,71 @@
+import os
+import os.path as path
+import sys
+import tempfile
+import time
+import argparse
+import contextlib
+import shutil
+import io
+
+# run as a script from anywhere - the codegen modules import each other by bare name
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+import main as codegen_main
+from bench.corpus import *
+
+# Serial vs --jobs N on a synthetic corpus. Every run starts with a cold parse cache, and
+# the outputs of each run are checked to be byte-identical to the serial run.
+
+# every generated file, ie everything but the corpus itself & the parse cache
+def snapshot(root: str) -> dict[str, bytes]:
+    out: dict[str, bytes] = {}
+    for directory, _, files in os.walk(root):
+        if path.relpath(directory, root).split(path.sep)[0] == "build": continue
+        for file in files:
+            if path.splitext(file)[-1] == ".gen": continue
+            fname = path.join(directory, file)
+            with open(fname, "rb") as fh:
+                out[path.relpath(fname, root)] = fh.read()
+    return out
+
+def timed_run(root: str, argv: list[str]) -> tuple[float, dict[str, bytes]]:
+    shutil.rmtree(path.join(root, "build"), ignore_errors = True)
+    for generated in ("bin", path.join("native", "codegen")):
+        shutil.rmtree(path.join(root, generated), ignore_errors = True)
+
+    start = time.perf_counter()
+    # the parser prints warnings - not what we're here to measure
+    with contextlib.redirect_stdout(io.StringIO()):
+        codegen_main.main(argv)
+    elapsed = time.perf_counter() - start
+
+    return elapsed, snapshot(root)
+
+def main():
+    parser = argparse.ArgumentParser(description = "Compare serial & parallel codegen on a synthetic corpus")
+    parser.add_argument("--files", type = int, default = 1000)
+    parser.add_argument("--jobs", type = int, nargs = "+", default = [2, 4, os.cpu_count() or 1])
+    parser.add_argument("--sharded", action = "store_true")
+    args = parser.parse_args()
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as root:
+        write_corpus(root, args.files)
+        os.chdir(root)
+        try:
+            extra = ["--sharded"] if args.sharded else []
+            serial_time, serial_out = timed_run(root, extra)
+            print(f"{args.files} files, {os.cpu_count()} cpus")
+            print(f"serial:   {serial_time:8.3f}s")
+
+            for jobs in sorted(set(args.jobs)):
+                parallel_time, parallel_out = timed_run(root, extra + ["--jobs", str(jobs)])
+                identical = "identical" if parallel_out == serial_out else "DIFFERENT OUTPUT"
+                print(f"-j {jobs:<5} {parallel_time:8.3f}s  {serial_time / parallel_time:5.2f}x  {identical}")
+                if parallel_out != serial_out:
+                    sys.exit(1)
+        finally:
+            os.chdir(cwd)
+
+if __name__ == '__main__': main()
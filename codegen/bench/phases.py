@@ -0,0 +1,187 @@
+import os.path as path
+import sys
+import tempfile
+import time
+import argparse
+import contextlib
+import dataclasses
+import io
+import json
+import pickle
+import tracemalloc
+from typing import Any, Callable
+
+# run as a script from anywhere - the codegen modules import each other by bare name
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+from parse import *
+from codegen_types import *
+import dart
+import c
+import makefile
+from typelookup import *
+from lower import *
+from deps import *
+from emitter import *
+from bench.corpus import *
+
+# Times Parser.parse, dart.codegen, c.codegen & makefile.codegen separately on a synthetic
+# corpus, and compares against a stored baseline. Pure Python, so it doesn't need SDL
+# (or a display, or a C compiler).
+
+DEFAULT_BASELINE_PATH = path.join(path.dirname(path.abspath(__file__)), "baseline.json")
+
+# a phase is given the .gen paths & a fresh copy of the parsed files, and returns whatever it
+# produced - the backends return their Emitter, so the output size can be reported
+Phase = Callable[[list[str], list[ParsedGenFile]], Any]
+
+def parse_phase(fnames: list[str], _) -> list[ParsedGenFile]:
+    return [Parser(fname).parse() for fname in fnames]
+
+# the output goes nowhere, so the disk isn't part of the measurement
+def backend_phase(codegen: Callable[[Emitter, list[ParsedGenFile]], None]) -> Phase:
+    def phase(_, files: list[ParsedGenFile]) -> Emitter:
+        out = Emitter(DiscardSink())
+        codegen(out, files)
+        return out
+    return phase
+
+PHASES: dict[str, Phase] = {
+    "parse":    parse_phase,
+    # main() only builds the symbol table & lowers everything once for all the backends, but
+    # each of these gets charged for it, so they can be run on their own. "lower" is just that
+    # part on its own.
+    "lower":    lambda _, files: lower_all(TypeLookup(files)),
+    "dart":     backend_phase(lambda out, files: dart.codegen(out, lower_all(TypeLookup(files)))),
+    "c":        backend_phase(lambda out, files: c.codegen(out, lower_all(TypeLookup(files)))),
+    "makefile": backend_phase(lambda out, files: makefile.codegen(out, files)),
+}
+
+def count_declarations(files: list[ParsedGenFile]) -> int:
+    return sum(file.declaration_count() for file in files)
+
+# (best wall time over repeat runs, peak traced allocation of one run, size of the output if it's a backend)
+def measure(phase: Phase, fnames: list[str], parsed: bytes, repeat: int) -> tuple[float, int, int]:
+    best = float("inf")
+    for _ in range(repeat):
+        # every run gets its own copy, so that none of them are working on objects a previous run has warmed up
+        files = pickle.loads(parsed)
+        start = time.perf_counter()
+        result = phase(fnames, files)
+        best = min(best, time.perf_counter() - start)
+
+    # tracemalloc slows everything down a lot, so memory gets its own run
+    files = pickle.loads(parsed)
+    tracemalloc.start()
+    phase(fnames, files)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    emitted = result.written if isinstance(result, Emitter) else 0
+    return best, peak, emitted
+
+def run(shape: CorpusShape, repeat: int) -> dict[str, dict[str, float]]:
+    out: dict[str, dict[str, float]] = {}
+    with tempfile.TemporaryDirectory() as root:
+        fnames = write_shaped_corpus(root, shape)
+
+        # the parser prints warnings - not what we're here to measure
+        with contextlib.redirect_stdout(io.StringIO()):
+            parsed_files = parse_phase(fnames, None)
+            parsed = pickle.dumps(parsed_files)
+            declarations = count_declarations(parsed_files)
+
+            for name, phase in PHASES.items():
+                seconds, peak, emitted = measure(phase, fnames, parsed, repeat)
+                out[name] = {
+                    "seconds": seconds,
+                    "declarations_per_second": declarations / seconds if seconds > 0 else float("inf"),
+                    "peak_bytes": peak,
+                    "emitted_bytes": emitted,
+                }
+
+    return out
+
+# phases that only take a millisecond or two are mostly timer noise, so a slowdown also
+# has to be bigger than this in absolute terms to count
+MIN_REGRESSION_SECONDS = 0.005
+# same for memory - a phase which streams its output only allocates a few KB, so any
+# change at all would be a big ratio
+MIN_REGRESSION_BYTES = 256 * 1024
+
+def compare(results: dict[str, dict[str, float]], baseline: dict[str, dict[str, float]], time_tolerance: float, memory_tolerance: float) -> list[str]:
+    regressions: list[str] = []
+    for name, result in results.items():
+        if name not in baseline: continue
+        base = baseline[name]
+        if result["seconds"] > max(base["seconds"] * time_tolerance, base["seconds"] + MIN_REGRESSION_SECONDS):
+            regressions.append(f"{name}: {result['seconds']:.3f}s vs baseline {base['seconds']:.3f}s (tolerance {time_tolerance}x)")
+        if result["peak_bytes"] > max(base["peak_bytes"] * memory_tolerance, base["peak_bytes"] + MIN_REGRESSION_BYTES):
+            regressions.append(f"{name}: peak {result['peak_bytes'] / 1e6:.1f}MB vs baseline {base['peak_bytes'] / 1e6:.1f}MB (tolerance {memory_tolerance}x)")
+    return regressions
+
+def print_results(results: dict[str, dict[str, float]], baseline: dict[str, dict[str, float]]):
+    print(f"{'phase':<10}{'seconds':>10}{'decls/s':>14}{'peak MB':>10}{'out MB':>9}{'vs base':>10}")
+    for name, result in results.items():
+        vs_baseline = ""
+        if name in baseline:
+            vs_baseline = f"{result['seconds'] / baseline[name]['seconds']:.2f}x"
+        print(
+            f"{name:<10}{result['seconds']:>10.3f}{result['declarations_per_second']:>14,.0f}" +
+            f"{result['peak_bytes'] / 1e6:>10.1f}{result['emitted_bytes'] / 1e6:>9.1f}{vs_baseline:>10}"
+        )
+
+def parse_args() -> argparse.Namespace:
+    defaults = CorpusShape()
+    parser = argparse.ArgumentParser(description = "Benchmark each codegen phase on a synthetic .gen corpus")
+    for field in dataclasses.fields(CorpusShape):
+        parser.add_argument(f"--{field.name.replace('_', '-')}", type = field.type, default = getattr(defaults, field.name))
+    parser.add_argument("--repeat", type = int, default = 5, help = "time each phase this many times & keep the best")
+    parser.add_argument("--baseline", default = DEFAULT_BASELINE_PATH)
+    parser.add_argument("--update-baseline", action = "store_true", help = "store these results as the new baseline")
+    parser.add_argument("--time-tolerance", type = float, default = 1.5, help = "fail if any phase is this many times slower than the baseline")
+    parser.add_argument("--memory-tolerance", type = float, default = 1.25, help = "fail if any phase's peak memory is this many times the baseline")
+    parser.add_argument("--json", help = "also write the results to this file")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    shape = CorpusShape(**{field.name: getattr(args, field.name) for field in dataclasses.fields(CorpusShape)})
+
+    results = run(shape, args.repeat)
+
+    baseline: dict[str, Any] = {}
+    if path.exists(args.baseline):
+        with open(args.baseline, "rt") as fh:
+            baseline = json.load(fh)
+
+    # timings on a different corpus mean nothing
+    comparable = baseline.get("shape") == dataclasses.asdict(shape)
+    baseline_phases = baseline.get("phases", {}) if comparable else {}
+
+    print(f"corpus: {dataclasses.asdict(shape)}")
+    print_results(results, baseline_phases)
+
+    if args.json is not None:
+        with open(args.json, "wt") as fh:
+            json.dump({"shape": dataclasses.asdict(shape), "phases": results}, fh, indent = 4)
+
+    if args.update_baseline:
+        with open(args.baseline, "wt") as fh:
+            json.dump({"shape": dataclasses.asdict(shape), "phases": results}, fh, indent = 4)
+            fh.write("\n")
+        print(f"baseline written to {args.baseline}")
+        return
+
+    if not comparable:
+        print("no baseline for this corpus shape - run with --update-baseline to store one")
+        return
+
+    regressions = compare(results, baseline_phases, args.time_tolerance, args.memory_tolerance)
+    if len(regressions) > 0:
+        print("REGRESSION:")
+        for regression in regressions:
+            print(f"    {regression}")
+        sys.exit(1)
+
+if __name__ == '__main__': main()
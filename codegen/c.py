@@ -1,32 +1,357 @@
 from codegen_types import *
-from banner import *
+from emitter import *
+from deps import *
+from paths import *
+from lower import *
 
-def generate_enum(enum: CodegenEnum) -> str:
-    out = f"typedef enum {{\n"
+def generate_enum(out: Emitter, enum: CodegenEnum):
+    with out.block("typedef enum {", f"}} {enum.name};"):
+        for val in enum.values:
+            out.line(f"{enum.name}_{val.name} = {val.value},")
+    out.line()
 
-    for i, val in enumerate(enum.values):
-        out += f"    {enum.name}_{val.name} = {i},\n"
-    
-    out += f"}} {enum.name};\n\n"
+# Classes with fields get their struct from here rather than from a hand-written header. The
+# generated Dart reads & writes the fields straight out of memory, so the asserts make sure the
+# compiler put them where codegen/layout.py said it would.
+def generate_struct(out: Emitter, class_: LoweredClass):
+    name = class_.class_.name
+    with out.block("typedef struct {", f"}} {name};"):
+        for field in class_.fields:
+            out.line(f"{field.c_type} {field.name};")
+    out.line(f'_Static_assert(sizeof({name}) == {class_.struct_size}, "the generated Dart thinks {name} is {class_.struct_size} bytes");')
+    for field in class_.fields:
+        out.line(f'_Static_assert(offsetof({name}, {field.name}) == {field.offset}, "the generated Dart thinks {name}.{field.name} is at {field.offset}");')
+    out.line()
 
-    return out
+def has_structs(lowered: LoweredFile) -> bool:
+    return any(len(class_.fields) > 0 for class_ in lowered.classes)
 
-def codegen(files: list[ParsedGenFile]) -> str:
-    out = \
-"""#ifndef C_CODEGEN_H
-#define C_CODEGEN_H
+def structs(out: Emitter, lowered: LoweredFile):
+    if not has_structs(lowered): return
 
-// old-style booleans for Dart compatibility
+    out.banner(f"{lowered.file.name} structs")
+    for class_ in lowered.classes:
+        if len(class_.fields) > 0:
+            generate_struct(out, class_)
+
+BOOL_DEFINITIONS = \
+"""// old-style booleans for Dart compatibility
 typedef int BOOL;
 #define TRUE 1
 #define FALSE 0
-
 """
-    for file in files:
-        out += banner(file.name)
-        for enum in file.enums:
-            out += generate_enum(enum)
+
+def codegen(out: Emitter, files: list[LoweredFile]):
+    out.write(
+"""#ifndef C_CODEGEN_H
+#define C_CODEGEN_H
+
+""")
+    if any(has_structs(lowered) for lowered in files):
+        out.write("// for offsetof & uint8_t\n#include <stddef.h>\n#include <stdint.h>\n\n")
+    out.write(BOOL_DEFINITIONS + "\n")
+    for lowered in files:
+        out.banner(lowered.file.name)
+        for enum in lowered.file.enums:
+            generate_enum(out, enum)
+
+    # after all the enums, because a field can be any file's enum
+    for lowered in files:
+        structs(out, lowered)
     
-    out += "#endif // C_CODEGEN_H"
+    out.write("#endif // C_CODEGEN_H")
+
+def include_guard(header_path: str) -> str:
+    return header_path.upper().replace("/", "_").replace(".", "_")
+
+# sharded mode: definitions shared by every shard
+def codegen_shared_header(out: Emitter):
+    guard = include_guard(C_SHARED_HEADER_PATH)
+    out.write(f"#ifndef {guard}\n#define {guard}\n\n{BOOL_DEFINITIONS}\n#endif // {guard}")
+
+# sharded mode: just the enums & structs for one file, plus includes for any other shards it uses
+def codegen_shard(out: Emitter, lowered: LoweredFile, deps: FileDeps):
+    file = lowered.file
+    guard = include_guard(file.c_shard_path())
+    out.line(f"#ifndef {guard}")
+    out.line(f"#define {guard}")
+    out.line()
+
+    if has_structs(lowered):
+        out.line("// for offsetof & uint8_t")
+        out.line("#include <stddef.h>")
+        out.line("#include <stdint.h>")
+    out.line(f'#include "{C_SHARED_HEADER_PATH}"')
+    for dependency in deps.direct(file, enums_only = True):
+        out.line(f'#include "{dependency.c_shard_path()}"')
+    out.line()
+
+    out.banner(file.name)
+    for enum in file.enums:
+        generate_enum(out, enum)
+    structs(out, lowered)
+
+    out.write(f"#endif // {guard}")
+
+# sharded mode: C_OUTPUT_PATH includes every shard, for anything that wants everything at once.
+# The hand-written C only includes its own file's shard, so gcc's depfiles only tie each object
+# to that & the shards it includes - changing one .gen file only rebuilds the libraries that use it.
+def codegen_umbrella(out: Emitter, files: list[ParsedGenFile]):
+    out.line("#ifndef C_CODEGEN_H")
+    out.line("#define C_CODEGEN_H")
+    out.line()
+    for file in files:
+        out.line(f'#include "{file.c_shard_path()}"')
+
+    out.line()
+    out.write("#endif // C_CODEGEN_H")
+
+# unsharded mode: each file's shard path just includes C_OUTPUT_PATH, so the hand-written C's
+# includes work either way. They're committed along with C_OUTPUT_PATH, so a fresh checkout
+# builds before codegen's been run.
+def codegen_forwarder(out: Emitter):
+    out.line("// unsharded - everything's in here")
+    out.write(f'#include "{C_OUTPUT_PATH}"')
+
+
+# The C type each kind of batch slot gets decoded as
+BATCH_C_TYPES: dict[str, str] = {
+    SLOT_INT: "int",
+    SLOT_DOUBLE: "double",
+    SLOT_POINTER: "void*",
+    SLOT_STRING: "char*"
+}
+
+def batch_arg(slot: str, idx: int) -> str:
+    if slot == SLOT_DOUBLE:  return f"slot_double(args[{idx}])"
+    if slot == SLOT_POINTER: return f"(void*)(intptr_t)args[{idx}]"
+    return f"(int)args[{idx}]"
+
+# profiled is the file's profiled symbols - those get called through their timing wrapper
+def generate_batch_case(out: Emitter, command: BatchCommand, profiled: tuple[str, ...]):
+    params = command.method.params
+    with out.block(f"case {command.opcode}: {{"):
+        # the string bytes are packed one after the other, after the fixed slots
+        args: list[str] = []
+        previous: Optional[tuple[str, int]] = None
+        for idx, slot in enumerate(command.slots):
+            if slot != SLOT_STRING:
+                args.append(batch_arg(slot, idx))
+                continue
+
+            name = f"string{idx}"
+            if previous is None:
+                out.line(f"char* {name} = (char*)(args + {len(params)});")
+            else:
+                previous_name, previous_idx = previous
+                out.line(f"char* {name} = {previous_name} + ((args[{previous_idx}] + 8) & ~7);")
+            previous = (name, idx)
+            args.append(name)
+
+        name = command.method.func.name
+        if name in profiled:
+            name = profiled_symbol(name)
+        out.line(f"{name}({', '.join(['struct_ptr'] + args)});")
+        out.line("break;")
+
+# The decoder for every @Batchable() method in a file, one function per class - see CommandBuffer
+# in bin/CodegenRuntime.dart for the other end.
+def batch_decoders(out: Emitter, lowered: LoweredFile):
+    if not any(len(class_.batch) > 0 for class_ in lowered.classes): return
+
+    out.banner("batched calls")
+    for class_ in lowered.classes:
+        for command in class_.batch:
+            params = ["void* struct_ptr"] + [
+                f"{BATCH_C_TYPES[slot]} {param.name}"
+                for param, slot in zip(command.method.params, command.slots)
+            ]
+            out.line(f"void {command.method.func.name}({', '.join(params)});")
+    out.line()
+
+    with out.block("static double slot_double(int64_t slot) {"):
+        out.line("double out;")
+        out.line("memcpy(&out, &slot, sizeof(out));")
+        out.line("return out;")
+    out.line()
+
+    for class_ in lowered.classes:
+        if len(class_.batch) == 0: continue
+
+        # each command is a header slot (opcode in the low 32 bits, size in slots in the high 32), then its args
+        with out.block(f"void {class_.batch_symbol()}(void* struct_ptr, int64_t* commands, int length) {{"):
+            out.line("int at = 0;")
+            with out.block("while (at < length) {"):
+                out.line("int64_t header = commands[at];")
+                out.line("int64_t* args = commands + at + 1;")
+                with out.block("switch ((int)(header & 0xFFFFFFFF)) {"):
+                    for command in class_.batch:
+                        generate_batch_case(out, command, lowered.profiled)
+                out.line("at += (int)(header >> 32);")
+        out.line()
+
+# @DeferFinalizer() classes' NativeFinalizers call X_DeferDestroy, which can happen on any thread,
+# so all it does is push the pointer onto a lock-free stack. X_DestroyDeferred takes the whole
+# stack in one go & calls the real destructor on each one, on whichever thread the Dart's on.
+def deferred_finalizers(out: Emitter, lowered: LoweredFile):
+    deferred = [class_ for class_ in lowered.classes if class_.finalization == FINALIZE_DEFERRED]
+    if len(deferred) == 0: return
+
+    out.banner("deferred finalizers")
+    with out.block("typedef struct DeferredNode {", "} DeferredNode;"):
+        out.line("void* ptr;")
+        out.line("struct DeferredNode* next;")
+    out.line()
+
+    for class_ in deferred:
+        name = class_.class_.name
+        stack = f"{name}_deferred"
+        out.line(f"void {class_.destructor.func.name}(void* struct_ptr);")
+        out.line(f"static _Atomic(DeferredNode*) {stack} = NULL;")
+        out.line()
+        with out.block(f"void {class_.defer_symbol()}(void* struct_ptr) {{"):
+            out.line("DeferredNode* node = malloc(sizeof(DeferredNode));")
+            out.line("node->ptr = struct_ptr;")
+            out.line(f"node->next = atomic_load(&{stack});")
+            out.line(f"while (!atomic_compare_exchange_weak(&{stack}, &node->next, node));")
+        out.line()
+        with out.block(f"int {class_.destroy_deferred_symbol()}(void) {{"):
+            out.line(f"DeferredNode* node = atomic_exchange(&{stack}, NULL);")
+            out.line("int count = 0;")
+            with out.block("while (node != NULL) {"):
+                out.line("DeferredNode* next = node->next;")
+                out.line(f"{class_.destructor.func.name}(node->ptr);")
+                out.line("free(node);")
+                out.line("node = next;")
+                out.line("count++;")
+            out.line("return count;")
+        out.line()
+
+# the C spelling of a native typedef type, eg Pointer<Utf8> -> char*. Classes all come out as void*,
+# & enums & bools as int - exactly what crosses the boundary, & the same as the batch decoders
+# declare them.
+FFI_C_TYPES: dict[str, str] = {
+    "Void": "void",
+    "Utf8": "char",
+    "Uint8": "uint8_t",
+    "Int32": "int",
+    "Int64": "int64_t",
+    "Double": "double"
+}
+
+def ffi_c_type(native_type: str) -> str:
+    if native_type.startswith("Pointer<"):
+        return ffi_c_type(native_type[len("Pointer<"):-1]) + "*"
+    return FFI_C_TYPES[native_type]
+
+# symbol -> (return type, params) for everything the Dart side might call
+def c_signatures(lowered: LoweredFile) -> dict[str, tuple[str, list[tuple[str, str]]]]:
+    funcs = list(lowered.functions)
+    for class_ in lowered.classes:
+        funcs += class_.all_methods
+
+    out: dict[str, tuple[str, list[tuple[str, str]]]] = {}
+    for func in funcs:
+        out[func.func.name] = (ffi_c_type(func.returns.native_type), [(ffi_c_type(param.plan.native_type), param.name) for param in func.native_params()])
+    for class_ in lowered.classes:
+        out[class_.batch_symbol()] = ("void", [("void*", "struct_ptr"), ("int64_t*", "commands"), ("int", "length")])
+        out[class_.destroy_deferred_symbol()] = ("int", [])
+    return out
+
+# Every profiled binding gets an X_Profiled wrapper, which the Dart side calls instead, that times
+# just the native function - the Dart side times the whole call, so the difference is what getting
+# there & back costs. The timings are only ever touched from whichever thread the Dart's on, so
+# they're plain ints. See bin/FfiProfiler.dart for the other end.
+def profiling(out: Emitter, lowered: LoweredFile):
+    if len(lowered.profiled) == 0: return
+    signatures = c_signatures(lowered)
+
+    out.banner("profiling")
+    with out.block("typedef struct {", "} ProfileEntry;"):
+        out.line("int64_t calls;")
+        out.line("int64_t total_ns;")
+        out.line("int64_t max_ns;")
+    out.line()
+    out.line(f"static ProfileEntry profile[{len(lowered.profiled)}];")
+    out.line()
+    with out.block("static int64_t profile_now(void) {"):
+        out.line("struct timespec now;")
+        out.line("clock_gettime(CLOCK_MONOTONIC, &now);")
+        out.line("return (int64_t)now.tv_sec * 1000000000 + now.tv_nsec;")
+    out.line()
+    with out.block("static void profile_record(int idx, int64_t start) {"):
+        out.line("int64_t elapsed = profile_now() - start;")
+        out.line("ProfileEntry* entry = &profile[idx];")
+        out.line("entry->calls++;")
+        out.line("entry->total_ns += elapsed;")
+        out.line("if (elapsed > entry->max_ns) entry->max_ns = elapsed;")
+    out.line()
+
+    for idx, symbol in enumerate(lowered.profiled):
+        returns, params = signatures[symbol]
+        param_list = ", ".join(f"{type_} {name}" for type_, name in params) or "void"
+        call = f"{symbol}({', '.join(name for _, name in params)})"
+        out.line(f"{returns} {symbol}({param_list});")
+        with out.block(f"{returns} {profiled_symbol(symbol)}({param_list}) {{"):
+            out.line("int64_t profile_start = profile_now();")
+            if returns == "void":
+                out.line(f"{call};")
+                out.line(f"profile_record({idx}, profile_start);")
+            else:
+                out.line(f"{returns} profile_out = {call};")
+                out.line(f"profile_record({idx}, profile_start);")
+                out.line("return profile_out;")
+        out.line()
+
+    out.line("// copies the calls, total ns & max ns of each binding (in the order above) into out, & returns how many")
+    out.line("// bindings there are - capacity is how many int64s out has room for")
+    with out.block(f"int {lowered.profile_read_symbol()}(int64_t* out, int capacity, int reset) {{"):
+        out.line(f"int count = {len(lowered.profiled)};")
+        with out.block("for (int i = 0; i < count && (i + 1) * 3 <= capacity; i++) {"):
+            out.line("out[i * 3] = profile[i].calls;")
+            out.line("out[i * 3 + 1] = profile[i].total_ns;")
+            out.line("out[i * 3 + 2] = profile[i].max_ns;")
+        out.line("if (reset) memset(profile, 0, sizeof(profile));")
+        out.line("return count;")
+    out.line()
+
+# A linker version script for a library. It's linked into the library, so that only what the Dart side needs is exported. Everything else
+# becomes local, which lets LTO inline or drop it, & means the dynamic linker has fewer symbols
+# to deal with when the library's opened.
+def export_map(out: Emitter, generated_for: str, symbols: list[str]):
+    out.line(f"/* generated for {generated_for} */")
+    with out.block("{", "};"):
+        out.line("global:")
+        for symbol in symbols:
+            out.line(f"    {symbol};")
+        out.line("local:")
+        out.line("    *;")
+
+def codegen_export_map(out: Emitter, lowered: LoweredFile):
+    export_map(out, lowered.file.name, lowered.exported_symbols())
+
+# unified mode: everything any of the files export
+def codegen_unified_export_map(out: Emitter, files: list[LoweredFile]):
+    symbols: list[str] = []
+    for file in files:
+        symbols += file.exported_symbols()
+    export_map(out, ", ".join(file.file.name for file in files), symbols)
+
+# The C that's generated for a file to be built into its library, if it needs any. It's its own
+# translation unit, linked in alongside the hand-written C, so it declares the real functions
+# itself with every class as a void*. That's all the Dart side ever passes them as anyway.
+def codegen_source(out: Emitter, lowered: LoweredFile):
+    out.line(f"// generated for {lowered.file.name}")
+    out.line()
+    out.line("#include <stdatomic.h>")
+    out.line("#include <stdint.h>")
+    out.line("#include <stdlib.h>")
+    out.line("#include <string.h>")
+    if len(lowered.profiled) > 0:
+        out.line("#include <time.h>")
+    out.line()
 
-    return out
\ No newline at end of file
+    # first, because the batch decoders call the wrappers
+    profiling(out, lowered)
+    batch_decoders(out, lowered)
+    deferred_finalizers(out, lowered)
@@ -0,0 +1,163 @@
+import hashlib
+import os
+import os.path as path
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from codegen_types import *
+from parse import *
+from paths import *
+from metrics import *
+
+# Hash of the codegen sources themselves. If the parser or the model changes, every
+# cached ParsedGenFile is potentially wrong, so the whole cache gets thrown away.
+def codegen_version() -> str:
+    hasher = hashlib.sha256()
+    codegen_dir = path.dirname(path.abspath(__file__))
+    for fname in sorted(os.listdir(codegen_dir)):
+        if path.splitext(fname)[-1] == ".py":
+            hasher.update(fname.encode())
+            with open(path.join(codegen_dir, fname), "rb") as fh:
+                hasher.update(fh.read())
+
+    return hasher.hexdigest()
+
+# the parsed file & any warnings the parser printed on the way
+Parsed = tuple[ParsedGenFile, tuple[str, ...]]
+
+# module-level so it can be sent to worker processes
+def parse_file(fname: str) -> Parsed:
+    parser = Parser(fname)
+    out = parser.parse()
+    return out, tuple(parser.warnings)
+
+# parse_file, but timing parsing & validating the annotations separately - for --profile
+def parse_file_measured(fname: str, trace_memory: bool = True) -> tuple[Parsed, Measurement, Measurement]:
+    profiler = Profiler(trace_memory)
+    parser = Parser(fname)
+    parse, validate = Measurement(), Measurement()
+    with profiler.measure(parse):
+        out = parser.parse_declarations()
+    with profiler.measure(validate):
+        parser.validate(out)
+    return (out, tuple(parser.warnings)), parse, validate
+
+def content_hash(fname: str) -> str:
+    with open(fname, "rb") as fh:
+        return hashlib.sha256(fh.read()).hexdigest()
+
+# Persistent cache of ParsedGenFiles, keyed on the .gen file's path and stores the
+# hash of its contents alongside, so only files which have changed get re-parsed.
+class ParseCache:
+    def __init__(self, cache_path: str = PARSE_CACHE_PATH):
+        self.cache_path = cache_path
+        self.version = codegen_version()
+
+        # gen file path -> (content hash, parsed file, warnings)
+        self.entries: dict[str, tuple[str, ParsedGenFile, tuple[str, ...]]] = {}
+        # paths which were looked up this run - anything else has been deleted, so gets pruned on save
+        self.used: set[str] = set()
+        self.dirty = False
+
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.cache_path, "rb") as fh:
+                version, entries = pickle.load(fh)
+        except FileNotFoundError:
+            return
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError, ValueError, TypeError):
+            # corrupt or from an incompatible codegen - just start again
+            self.dirty = True
+            return
+
+        if version != self.version:
+            self.dirty = True
+            return
+
+        self.entries = entries
+
+    # A hit prints the warnings from when it was parsed again, so they don't disappear until
+    # the file's changed.
+    def get(self, fname: str, digest: str) -> Optional[ParsedGenFile]:
+        self.used.add(fname)
+        if fname not in self.entries:
+            return None
+
+        cached_digest, parsed, warnings = self.entries[fname]
+        if cached_digest != digest:
+            return None
+
+        for warning in warnings:
+            print(warning)
+        return parsed
+
+    def put(self, fname: str, digest: str, parsed: Parsed):
+        self.used.add(fname)
+        self.entries[fname] = (digest, *parsed)
+        self.dirty = True
+
+    # for files that have been deleted, when the same cache is used for more than one run (--watch)
+    def forget(self, fname: str):
+        self.used.discard(fname)
+
+    def parse(self, fname: str) -> ParsedGenFile:
+        digest = content_hash(fname)
+        parsed = self.get(fname, digest)
+        if parsed is None:
+            result = parse_file(fname)
+            self.put(fname, digest, result)
+            parsed = result[0]
+
+        return parsed
+
+    # Same as calling parse() on each file, but anything that isn't cached is parsed by
+    # a pool of `jobs` worker processes. Output order always matches fnames. With metrics,
+    # each file that gets parsed is timed wherever it's parsed.
+    def parse_all(self, fnames: list[str], jobs: int = 1, metrics: Optional[RunMetrics] = None) -> list[ParsedGenFile]:
+        digests = [content_hash(fname) for fname in fnames]
+        out = [self.get(fname, digest) for fname, digest in zip(fnames, digests)]
+
+        stale = [i for i, parsed in enumerate(out) if parsed is None]
+        if metrics is not None:
+            for fname, parsed in zip(fnames, out):
+                metrics.file(fname).cached = parsed is not None
+        parse = parse_file if metrics is None else parse_file_measured
+        if jobs > 1 and len(stale) > 1:
+            with ProcessPoolExecutor(min(jobs, len(stale))) as pool:
+                # chunk so we're not paying for a round trip per file on big trees
+                chunksize = max(1, len(stale) // (jobs * 4))
+                results = list(pool.map(parse, [fnames[i] for i in stale], chunksize = chunksize))
+        else:
+            results = [parse(fnames[i]) for i in stale]
+
+        for i, result in zip(stale, results):
+            parsed = result
+            if metrics is not None:
+                parsed, parse_time, validate_time = result
+                file = metrics.file(fnames[i])
+                file.parse.add(parse_time)
+                file.validate.add(validate_time)
+            self.put(fnames[i], digests[i], parsed)
+            out[i] = parsed[0]
+
+        return out
+
+    def save(self):
+        for fname in list(self.entries):
+            if fname not in self.used:
+                del self.entries[fname]
+                self.dirty = True
+
+        if not self.dirty: return
+
+        os.makedirs(path.dirname(self.cache_path), exist_ok = True)
+        # write to a temp file and swap it in, so an interrupted run can't leave half a pickle behind
+        tmp_path = self.cache_path + ".tmp"
+        with open(tmp_path, "wb") as fh:
+            pickle.dump((self.version, self.entries), fh)
+        os.replace(tmp_path, self.cache_path)
+
+        self.dirty = False
@@ -1,15 +1,17 @@
 from paths import *
+from emitter import *
 
-def codegen() -> str:
+def codegen(out: Emitter):
     # Files and directories that we don't want cloc to count.
-    out = "\n".join([
+    out.write("\n".join([
         ".dart_tool",
         ".vscode",
         "build",
         DART_OUTPUT_PATH,
         C_OUTPUT_PATH,
+        DART_SHARD_DIR,
+        C_SHARD_DIR,
+        C_SOURCE_DIR,
         "Makefile",
         CLOC_EXCLUDE_LIST_PATH
-    ])
-
-    return out
\ No newline at end of file
+    ]))
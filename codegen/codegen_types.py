@@ -1,26 +1,59 @@
 from dataclasses import dataclass
 from typing import Optional
 import os.path as path
+import sys
 from annotations import *
+from paths import *
 
-@dataclass
+# The whole model is frozen & slotted - it's built once by the parser and then only ever
+# read, and a big project has an awful lot of these.
+
+_interned_types: dict[tuple[str, bool, Optional[str]], "CodegenType"] = {}
+
+@dataclass(frozen = True, slots = True)
 class CodegenType:
     typename: str
     is_pointer: bool
+    # for arrays like int[count], which are pointers in C: either the name of the int param
+    # that says how long it is, or a fixed length like "4"
+    array_length: Optional[str] = None
+
+    # there's only a handful of distinct types in any project, so everything shares one
+    # instance of each instead of having thousands of copies of int & void*
+    @staticmethod
+    def of(typename: str, is_pointer: bool, array_length: Optional[str] = None) -> "CodegenType":
+        key = (typename, is_pointer, array_length)
+        out = _interned_types.get(key)
+        if out is None:
+            out = _interned_types[key] = CodegenType(sys.intern(typename), is_pointer, array_length)
+        return out
+
+    # so unpickling (eg from the parse cache) goes through the intern table as well
+    def __reduce__(self):
+        return (CodegenType.of, (self.typename, self.is_pointer, self.array_length))
+
+    def is_array(self) -> bool:
+        return self.array_length is not None
 
     def c_type(self) -> str:
         out = self.typename
 
-        if self.is_pointer: out += "*"
+        if self.is_array(): out += f"[{self.array_length}]"
+        elif self.is_pointer: out += "*"
 
         return out
 
-@dataclass
+@dataclass(frozen = True, slots = True)
+class CodegenParam:
+    name: str
+    type_: CodegenType
+
+@dataclass(frozen = True, slots = True)
 class CodegenFunction:
     name: str
     return_type: CodegenType
-    params: dict[str, CodegenType]
-    annotations: list[CodegenAnnotation]
+    params: tuple[CodegenParam, ...]
+    annotations: Annotations
 
     def signature_string(self) -> str:
         out = ""
@@ -29,11 +62,10 @@ class CodegenFunction:
         out += " "
         out += self.name
         out += "("
-        for i, param_name in enumerate(self.params):
-            param_type = self.params[param_name]
-            out += param_type.c_type()
+        for i, param in enumerate(self.params):
+            out += param.type_.c_type()
             out += " "
-            out += param_name
+            out += param.name
             if i != len(self.params) - 1:
                 out += ", "
         
@@ -42,43 +74,58 @@ class CodegenFunction:
         return out
     
     def display_name(self) -> str:
-        if has_annotation(self.annotations, "Getter"):
-            return get_annotation(self.annotations,"Getter").args[0]
-        if has_annotation(self.annotations, "Show"):
-            return get_annotation(self.annotations, "Show").args[0]
+        getter = self.annotations.get("Getter")
+        if getter is not None:
+            return getter.args[0]
+        show = self.annotations.get("Show")
+        if show is not None:
+            return show.args[0]
         else:
             return self.name
 
 
-@dataclass
+@dataclass(frozen = True, slots = True)
 class CodegenDataStructureField:
     name: str
     type_: CodegenType
-    annotations: list[CodegenAnnotation]
+    annotations: Annotations
 
-@dataclass
+@dataclass(frozen = True, slots = True)
 class CodegenEnumValue:
     name: str
     stringify_as: str
+    # what it is in C, & what crosses the FFI boundary
+    value: int
+
+# members of the generated Dart class for a @Flags() enum
+FLAGS_RESERVED_NAMES = ("value", "values", "has", "hashCode", "toString", "runtimeType", "noSuchMethod")
 
-@dataclass
+@dataclass(frozen = True, slots = True)
 class CodegenEnum:
     name: str
-    values: list[CodegenEnumValue]
-    annotations: list[CodegenAnnotation]
+    values: tuple[CodegenEnumValue, ...]
+    annotations: Annotations
 
-@dataclass
+    def is_flags(self) -> bool:
+        return "Flags" in self.annotations
+
+    # whether every value is just its index, like a Dart enum's
+    def is_sequential(self) -> bool:
+        return all(value.value == idx for idx, value in enumerate(self.values))
+
+# how a class's native memory gets freed if its Dart object is garbage collected first
+FINALIZE_DIRECT = "direct"      # the destructor is the NativeFinalizer
+FINALIZE_DEFERRED = "deferred"  # the NativeFinalizer queues it up, & the destructor runs later on the Dart thread
+
+@dataclass(frozen = True, slots = True)
 class CodegenClass:
     name: str
-    fields: list[CodegenDataStructureField]
-    methods: list[CodegenFunction]
-    annotations: list[CodegenAnnotation]
+    fields: tuple[CodegenDataStructureField, ...]
+    methods: tuple[CodegenFunction, ...]
+    annotations: Annotations
 
     def has_initializer_annotation(self, method: CodegenFunction) -> bool:
-        for annotation in method.annotations:
-            if annotation.name == "Initializer":
-                return True
-        return False
+        return "Initializer" in method.annotations
 
     def validate(self) -> Optional[str]:
         initializer: Optional[CodegenFunction] = None
@@ -95,6 +142,11 @@ class CodegenClass:
             initializer.return_type.is_pointer):
             return f"The initializer for the class {self.name} must have a return type of void* ."
 
+        if "NoFinalizer" in self.annotations and "DeferFinalizer" in self.annotations:
+            return f"The class {self.name} can't be both @NoFinalizer() and @DeferFinalizer()."
+        if "DeferFinalizer" in self.annotations and self.destructor() is None:
+            return f"The class {self.name} is @DeferFinalizer(), but it doesn't have an @Invalidates() method that returns void & takes no params to finalize it with."
+
     
     def initializer(self) -> CodegenFunction:
         for method in self.methods:
@@ -103,38 +155,69 @@ class CodegenClass:
         
         raise ValueError("CodegenClass.initializer() was called but no initializer method was found.")
 
+    # the first @Invalidates() method that could be called with nothing but the pointer, if there is one
+    def destructor(self) -> Optional[CodegenFunction]:
+        for method in self.methods:
+            if (
+                "Invalidates" in method.annotations and
+                "Out" not in method.annotations and
+                len(method.params) == 1 and
+                method.return_type.typename == "void" and
+                not method.return_type.is_pointer
+            ):
+                return method
+        return None
+
+    # FINALIZE_DIRECT, FINALIZE_DEFERRED, or None if its memory's only ever freed by hand
+    def finalization(self) -> Optional[str]:
+        if "NoFinalizer" in self.annotations or self.destructor() is None: return None
+        if "DeferFinalizer" in self.annotations: return FINALIZE_DEFERRED
+        return FINALIZE_DIRECT
+
 # each set of annotations is a dict of annotation name to argc
 SUPPORTED_ANNOTATIONS: dict[str, dict[str, int]] = {
     "class": {
-
+        "NoFinalizer": 0,
+        "DeferFinalizer": 0,
+        "IdentityCache": 0
     },
     "function": {
-        "Show": 1
+        "Show": 1,
+        "Out": 0,
+        "ReturnsOwned": 0,
+        "Profile": 0
     },
     "method": {
         "Initializer": 0,
         "Getter": 1,
         "Show": 1,
-        "Invalidates": 0
+        "Invalidates": 0,
+        "Out": 0,
+        "Batchable": 0,
+        "ReturnsOwned": 0,
+        "Profile": 0
+    },
+    "field": {
+        "ReadOnly": 0
     },
     "enum": {
-
+        "Flags": 0
     },
     "file": {
         "LinkWithLib": 1
     }
 }
 
-@dataclass
+@dataclass(frozen = True, slots = True)
 class ParsedGenFile:
     # eg native/some_subdir/something.gen
     name: str
 
-    functions: list[CodegenFunction]
-    enums: list[CodegenEnum]
-    classes: list[CodegenClass]
+    functions: tuple[CodegenFunction, ...]
+    enums: tuple[CodegenEnum, ...]
+    classes: tuple[CodegenClass, ...]
 
-    annotations: list[CodegenAnnotation]
+    annotations: Annotations
 
     def validate_annotation(self, annotation: CodegenAnnotation, typename: str) -> Optional[str]:
         if annotation.name not in SUPPORTED_ANNOTATIONS[typename]:
@@ -146,7 +229,7 @@ class ParsedGenFile:
             return f"Annotation {annotation} expected {expected_arg_len} arguments, but got {arg_len}."
         
 
-    def validate_annotation_list(self, annotations: list[CodegenAnnotation], typename: str) -> str:
+    def validate_annotation_list(self, annotations: Annotations, typename: str) -> str:
         out = ""
 
         for annotation in annotations:
@@ -168,12 +251,30 @@ class ParsedGenFile:
             out += self.validate_annotation_list(class_.annotations, "class")
             for method in class_.methods:
                 out += self.validate_annotation_list(method.annotations, "method")
+            for field in class_.fields:
+                out += self.validate_annotation_list(field.annotations, "field")
 
         if out.endswith('\n'):
             out = out[:-1]
 
         return out
 
+    # every function, enum (& each of its values) & class (& each of its methods & fields)
+    def declaration_count(self) -> int:
+        out = len(self.functions)
+        for enum in self.enums:
+            out += 1 + len(enum.values)
+        for class_ in self.classes:
+            out += 1 + len(class_.methods) + len(class_.fields)
+        return out
+
+    # of every function & method, including struct_ptr
+    def param_count(self) -> int:
+        out = sum(len(func.params) for func in self.functions)
+        for class_ in self.classes:
+            out += sum(len(method.params) for method in class_.methods)
+        return out
+
     # returns "something"
     def id(self) -> str:
         return path.splitext(path.basename(self.name))[0]
@@ -186,3 +287,39 @@ class ParsedGenFile:
     
     def libname(self) -> str:
         return f"lib{self.id()}"
+
+    # whether any of its bindings get timed - all of them with --profile-ffi (profile_all), or just the @Profile() ones
+    def is_profiled(self, profile_all: bool = False) -> bool:
+        funcs = list(self.functions)
+        for class_ in self.classes:
+            funcs += class_.methods
+        return any(profile_all or "Profile" in func.annotations for func in funcs)
+
+    # whether it needs a generated C source built into its library - for @Batchable() methods, @DeferFinalizer() classes,
+    # or profiled bindings
+    def has_generated_c(self, profile_all: bool = False) -> bool:
+        if self.is_profiled(profile_all): return True
+        return any(
+            class_.finalization() == FINALIZE_DEFERRED or
+            any("Batchable" in method.annotations for method in class_.methods)
+            for class_ in self.classes
+        )
+
+    # eg native/generated/something.c, if has_generated_c()
+    def c_source_path(self) -> str:
+        return f"{C_SOURCE_DIR}/{self.id()}.c"
+
+    # eg native/generated/something.map - a linker version script exporting everything the generated
+    # Dart looks up, & hiding everything else
+    def export_map_path(self) -> str:
+        return f"{C_SOURCE_DIR}/{self.id()}.map"
+
+    # forwarders to DART_OUTPUT_PATH & C_OUTPUT_PATH, unless it's sharded
+
+    # eg bin/codegen/libsomething.dart
+    def dart_shard_path(self) -> str:
+        return f"{DART_SHARD_DIR}/{self.libname()}.dart"
+
+    # eg native/codegen/something.h
+    def c_shard_path(self) -> str:
+        return f"{C_SHARD_DIR}/{self.id()}.h"
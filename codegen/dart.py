@@ -1,47 +1,13 @@
 from codegen_types import *
-from typelookup import *
-from banner import *
+from lower import *
+from emitter import *
 import os.path as path
 from shared_library_extension import *
-from typing import Callable
+from typing import Callable, Iterable, Iterator
+from contextlib import contextmanager
 from annotations import *
-
-NATIVE: dict[str, str] = {
-    "void": "Void",
-    "char": "Utf8",
-    "int": "Int32",
-    "double": "Double",
-    "bool": "Int32"
-}
-
-DART: dict[str, str] = {
-    "void": "void",
-    "char": "Utf8",
-    "int": "int",
-    "double": "double",
-    "bool": "int"
-}
-
-# omg globals! what the hell jaddison! you're a terrible programmer and i hope you eat shit!
-lookup: TypeLookup
-
-def get_typename(type_: CodegenType, typename_dict: dict[str, str]) -> str:
-    assert type_.typename in typename_dict or lookup.exists(type_.typename), f"Cannot find type {type_.typename}"
-    if type_.typename in typename_dict:
-        codegen_typename = type_.typename
-    elif lookup.is_enum(type_.typename):
-        codegen_typename = "int"
-    elif lookup.is_class(type_.typename):
-        if not type_.is_pointer:
-            raise ValueError("Cannot pass class by value - please pass a pointer instead.")
-        return "Pointer<Void>"
-    else:
-        raise ValueError(f"Data structures like {type_.typename} aren't currently supported.")
-    
-    if type_.is_pointer:
-        return f"Pointer<{NATIVE[codegen_typename]}>"
-    else:
-        return typename_dict[codegen_typename]
+from deps import *
+from paths import *
 
 def func_sig_name(file: ParsedGenFile, func_name: str, native: bool) -> str:
     out = f"_{file.libname()}_func_{func_name}"
@@ -59,312 +25,761 @@ def method_sig_name(file: ParsedGenFile, class_: CodegenClass, method: CodegenFu
 
     return out
 
-def func_typedefs(funcs: list[CodegenFunction], getName: Callable[[CodegenFunction, bool], str]) -> str:
-    out: str = ""
-
+def func_typedefs(out: Emitter, funcs: list[LoweredFunction], getName: Callable[[CodegenFunction, bool], str]):
     for func in funcs:
-        out += f"// {func.signature_string()}\n"
-        out += f"typedef {getName(func, True)} = {get_typename(func.return_type, NATIVE)} Function("
-        for i, param_type in enumerate(func.params.values()):
-            out += get_typename(param_type, NATIVE)
-            if i != len(func.params) - 1:
-                out += ", "
-        out += ");\n"
-
-        out += f"typedef {getName(func, False)} = "
-
-        return_typename = get_typename(func.return_type, DART)
-        out += return_typename
-
-        out += " Function("
-        for i, param_type in enumerate(func.params.values()):
-            out += get_typename(param_type, DART)
-            if i!= len(func.params) - 1:
-                out += ", "
-        out += ");\n\n"
+        native_params = func.native_params()
+        native_param_types = ", ".join(param.plan.native_type for param in native_params)
+        dart_param_types = ", ".join(param.plan.ffi_type for param in native_params)
 
-    return out
+        out.line(f"// {func.func.signature_string()}")
+        out.line(f"typedef {getName(func.func, True)} = {func.returns.native_type} Function({native_param_types});")
+        out.line(f"typedef {getName(func.func, False)} = {func.returns.ffi_type} Function({dart_param_types});")
+        out.line()
 
-def func_class_private_refs(funcs: list[CodegenFunction], getName: Callable[[CodegenFunction], str]) -> str:
-    out = ""
+def param_list(func: LoweredFunction) -> str:
+    return ", ".join(f"{param.plan.api_type} {param.name}" for param in func.api_params())
 
-    for func in funcs:
-        out += f"    static {getName(func)}? _{func.name};\n"
-    out += "\n"
 
+# the path to the library inside the build directory, escaped for a Dart string - nativeLibraryPath()
+# in the runtime decides which build directory
+def library_path(file: ParsedGenFile, unified: bool = False) -> str:
+    if unified:
+        return f"{UNIFIED_LIBRARY_NAME}{shared_library_extension()}"
+    # in the Dart string, if we're on Windows, we want to put "native\\whatever", or the slash will get interpreted
+    # by Dart as an escape character
+    libpath = file.libpath_no_ext().replace("\\", "\\\\")
+    return f"{libpath}{shared_library_extension()}"
+
+# the top-level holder for everything in file's library
+def bindings_name(file: ParsedGenFile) -> str:
+    return f"_{file.libname()}"
+
+# One holder per library, shared by all the functions & classes in it. Top-level finals are
+# lazy in Dart, so the library's opened the first time anything in it gets used - and each
+# function only gets looked up the first time it's actually called. In unified mode every holder
+# opens the same library, but it's only actually loaded once - after that, dlopen just hands back
+# the same handle.
+def bindings(out: Emitter, lowered: LoweredFile, unified: bool = False):
+    file = lowered.file
+
+    # (symbol, native sig, dart sig)
+    symbols: list[tuple[str, str, str]] = []
+    # the functions that NativeFinalizers call, which are only ever needed as addresses
+    finalizers: list[str] = []
+    for func in lowered.functions:
+        symbols.append((func.func.name, func_sig_name(file, func.func.name, True), func_sig_name(file, func.func.name, False)))
+    for class_ in lowered.classes:
+        for method in class_.all_methods:
+            symbols.append((method.func.name, method_sig_name(file, class_.class_, method.func, True), method_sig_name(file, class_.class_, method.func, False)))
+        if len(class_.batch) > 0:
+            symbols.append((class_.batch_symbol(), batch_sig_name(file, class_.class_, True), batch_sig_name(file, class_.class_, False)))
+        if class_.finalization is not None:
+            finalizers.append(finalizer_symbol(class_))
+        if class_.finalization == FINALIZE_DEFERRED:
+            symbols.append((class_.destroy_deferred_symbol(), destroy_deferred_sig_name(file, class_.class_, True), destroy_deferred_sig_name(file, class_.class_, False)))
+    if len(symbols) == 0: return
+
+    name = bindings_name(file)
+    profiled = set(lowered.profiled)
+    out.banner(f"bindings for {file.libname()}")
+    # public, so that anything else that wants to call into the same library (like the benchmarks)
+    # can open it without caring whether it's unified or not
+    out.line(f"const {file.libname()}Path = '{library_path(file, unified)}';")
+    out.line()
+    with out.block(f"class {name}_bindings {{"):
+        out.line(f"final _lib = DynamicLibrary.open(nativeLibraryPath({file.libname()}Path));")
+        if needs_scratch(lowered):
+            out.line("final strings = StringScratch();")
+        out.line()
+        structs = [class_ for class_ in lowered.classes if len(class_.fields) > 0]
+        if len(structs) > 0:
+            # once, before anything can read a struct through the wrong layout - they're only ever read through here
+            with out.block(f"{name}_bindings() {{"):
+                for class_ in structs:
+                    layout_check(out, class_)
+            out.line()
+            for class_ in structs:
+                out.line(f"{struct_name(class_)} {struct_accessor(class_)}(Pointer<Void> pointer) => pointer.cast<{struct_name(class_)}>().ref;")
+            out.line()
+        for symbol, native_sig, sig in symbols:
+            # profiled ones go through the native side's timing wrapper, but look exactly the same from here
+            lookup = profiled_symbol(symbol) if symbol in profiled else symbol
+            out.line(f"late final {sig} {symbol} = _lib.lookupFunction<{native_sig}, {sig}>('{lookup}');")
+        for symbol in finalizers:
+            out.line(f"late final {finalizer_address(symbol)} = _lib.lookup<NativeFinalizerFunction>('{symbol}');")
+        if len(profiled) > 0:
+            names = profile_names(lowered)
+            quoted = [f"'{names.get(symbol, symbol)}'" for symbol in lowered.profiled]
+            out.line()
+            out.line("// the FfiProfiler id of the first profiled binding - the rest follow on in the same order as the native side's")
+            out.line(f"late final {PROFILE_BASE} = FfiProfiler.register(")
+            with out.indent():
+                out.line(f"const [{', '.join(quoted)}],")
+                out.line(f"_lib.lookupFunction<NativeProfileReadNative, NativeProfileRead>('{lowered.profile_read_symbol()}')")
+            out.line(");")
+    out.line()
+    out.line(f"final {name} = {name}_bindings();")
+    out.line()
+
+def all_lowered_functions(lowered: LoweredFile) -> list[LoweredFunction]:
+    out = list(lowered.functions)
+    for class_ in lowered.classes:
+        out += class_.all_methods
     return out
 
-def param_list(func: CodegenFunction) -> str:
-    out: str = ""
-
-    for i, param_name in enumerate(func.params):
-        param_type = func.params[param_name]
-        dart_type = get_typename(param_type, DART)
-
-
-        if dart_type == "Pointer<Utf8>":
-            dart_type = "String"
-        elif param_type.typename == "bool":
-            dart_type = "bool"
-        elif lookup.is_enum(param_type.typename):
-            dart_type = param_type.typename
-        elif lookup.is_class(param_type.typename):
-            dart_type = param_type.typename
-        
-        out += f"{dart_type} {param_name}"
-        if i != len(func.params) - 1:
-            out += ", "
-
-    out += ") {\n"
-
+# batched methods copy their strings into the CommandBuffer instead
+def needs_scratch(lowered: LoweredFile) -> bool:
+    batched = {id(command.method) for class_ in lowered.classes for command in class_.batch}
+    return any(func.needs_scope() and id(func) not in batched for func in all_lowered_functions(lowered))
+
+# anything with bindings needs nativeLibraryPath
+def needs_runtime(lowered: LoweredFile) -> bool:
+    return len(lowered.functions) > 0 or len(lowered.classes) > 0
+
+def uses_arrays(lowered: LoweredFile) -> bool:
+    return any(
+        func.returns.type_.is_array() or len(func.arrays) > 0
+        for func in all_lowered_functions(lowered)
+    )
+
+# locals in the generated wrappers. C identifiers can't have a $ in, so these can't clash with a param.
+SCRATCH = "$scratch"
+SCOPE = "$scope"
+VALUE = "$value"
+PROFILE_START = "$profileStart"
+# the binding holder's field for its first FfiProfiler id
+PROFILE_BASE = "$profile"
+
+# what each binding's called in FfiProfiler's reports - how it looks from Dart, eg RenderWindow.Flush.
+# The batch runners & the like just go by their symbol.
+def profile_names(lowered: LoweredFile) -> dict[str, str]:
+    out = {func.func.name: f"{lowered.file.libname()}.{func.func.display_name()}" for func in lowered.functions}
+    for class_ in lowered.classes:
+        for method in class_.all_methods:
+            out[method.func.name] = f"{class_.class_.name}.{method.func.display_name()}"
     return out
 
-
-def func_class_get_library(file: ParsedGenFile) -> str:
-    out = ""
-
-    out += f"            final lib = DynamicLibrary.open('build{path.sep}"
-    # in the Dart string, if we're on Windows, we want to put "build\\whatever", or the slash will get interpreted
-    # by Dart as an escape character
-    if path.sep == "\\":
-        out += "\\"
-    out += file.libpath_no_ext().replace("\\", "\\\\")
-    
-    out += f"{shared_library_extension()}');\n\n"
-
+def profile_id(lowered: LoweredFile, symbol: str) -> str:
+    idx = lowered.profiled.index(symbol)
+    base = f"{bindings_name(lowered.file)}.{PROFILE_BASE}"
+    return base if idx == 0 else f"{base} + {idx}"
+
+# Everything written inside this is timed, if symbol's profiled - unprofiled bindings don't get anything
+# extra at all. The native side times the call again, from inside.
+@contextmanager
+def profile_scope(out: Emitter, lowered: LoweredFile, symbol: str) -> Iterator[None]:
+    if symbol not in lowered.profiled:
+        yield
+        return
+
+    out.line(f"final {PROFILE_START} = FfiProfiler.start();")
+    with out.block("try {", "} finally {"):
+        yield
+    with out.indent():
+        out.line(f"FfiProfiler.stop({profile_id(lowered, symbol)}, {PROFILE_START});")
+    out.line("}")
+
+# @Out() functions return one of these, with the return value (if there is one) & whatever
+# got written through each out param. Our SDK constraint's too old for records, so it's a class.
+def result_class_name(owner: str, func: LoweredFunction) -> str:
+    name = func.func.display_name()
+    return f"{owner}{name[0].upper()}{name[1:]}Result"
+
+def api_return_type(owner: str, func: LoweredFunction) -> str:
+    if len(func.outs) == 0:
+        return func.returns.api_type
+    return result_class_name(owner, func)
+
+# The native side of an @Out() param writes into one of these. They're static & never freed,
+# & all the methods on a class share them - func's first Int32 out param always goes in
+# _outInt32_0 & so on - so there's no allocation per call, & only a handful per class.
+def out_slots(func: LoweredFunction) -> list[tuple[LoweredParam, str]]:
+    out: list[tuple[LoweredParam, str]] = []
+    counts: dict[str, int] = {}
+    for param in func.outs:
+        native_type = param.out.native_type
+        idx = counts.get(native_type, 0)
+        counts[native_type] = idx + 1
+        out.append((param, f"_out{native_type}_{idx}"))
     return out
 
-def func_class_init_refs(funcs: list[CodegenFunction], getName: Callable[[CodegenFunction, bool], str]) -> str:
-    out = ""
-
+def declare_out_slots(out: Emitter, funcs: Iterable[LoweredFunction]):
+    declared: dict[str, LoweredParam] = {}
     for func in funcs:
-        out += f"            _{func.name} = lib.lookupFunction<{getName(func, True)}, {getName(func, False)}>('{func.name}');\n"
-
-    return out
-
-def func_class_refs_initializer(file: ParsedGenFile, funcs: list[CodegenFunction], getName: Callable[[CodegenFunction, bool], str]) -> str:
-    out: str = ""
-
-    out += "    void _initRefs() {\n"
-    
-    out += "        if (\n"
-    for i, func in enumerate(funcs):
-        out += "            "
-        out += f"_{func.name} == null"
-        if i != len(funcs) - 1:
-            out += " ||"
-        out += "\n"
-    out += "        ) {\n"
-    out += func_class_get_library(file)
-    out += func_class_init_refs(funcs, getName)
-    out += "        }\n"
-    out += "    }\n\n"
+        for param, slot in out_slots(func):
+            declared.setdefault(slot, param)
+    if len(declared) == 0: return
 
-    return out
+    out.line("// written to by the native side of @Out() params")
+    for slot, param in declared.items():
+        out.line(f"static final {param.plan.native_type} {slot} = malloc<{param.out.native_type}>();")
+    out.line()
 
-def func_class_func_return_type(func: CodegenFunction) -> str:
-    typename = get_typename(func.return_type, DART)
-    if func.return_type.typename == "bool":
-        typename = "bool"
-    elif lookup.is_enum(func.return_type.typename):
-        typename = func.return_type.typename
-    elif typename == "Pointer<Utf8>":
-        typename = "String"
-    elif lookup.is_class(func.return_type.typename):
-        typename = func.return_type.typename
-
-    return typename
-
-def func_params(func: CodegenFunction) -> str:
-    out = ""
-
-    for i, param_name in enumerate(func.params):
-        param_type = func.params[param_name]
-        param_typename = get_typename(param_type, DART)
-        if param_typename == "Pointer<Utf8>":
-            out += f"{param_name}.toNativeUtf8()"
-        elif param_type.typename == "bool":
-            out += f"{param_name} ? 1 : 0"
-        elif lookup.is_enum(param_type.typename):
-            out += f"{param_type.typename}ToInt({param_name})"
-        elif lookup.is_class(param_type.typename):
-            out += f"{param_name}.structPointer"
+def result_classes(out: Emitter, owner: str, funcs: Iterable[LoweredFunction]):
+    for func in funcs:
+        if len(func.outs) == 0: continue
+
+        fields: list[tuple[str, str]] = []
+        if func.returns.api_type != "void":
+            fields.append((func.returns.api_type, "value"))
+        fields += [(param.out.api_type, param.name) for param in func.outs]
+
+        name = result_class_name(owner, func)
+        with out.block(f"class {name} {{"):
+            for type_, field in fields:
+                out.line(f"final {type_} {field};")
+            out.line()
+            out.line(f"const {name}({', '.join('this.' + field for _, field in fields)});")
+        out.line()
+
+# Everything written inside this is in a StringScratch scope, if func needs one - so any
+# strings encoded for the call are released as soon as it returns, even if it throws.
+@contextmanager
+def call_scope(out: Emitter, file: ParsedGenFile, func: LoweredFunction) -> Iterator[None]:
+    if not func.needs_scope():
+        yield
+        return
+
+    out.line(f"final {SCRATCH} = {bindings_name(file)}.strings;")
+    out.line(f"final {SCOPE} = {SCRATCH}.mark();")
+    with out.block("try {", "} finally {"):
+        yield
+    with out.indent():
+        out.line(f"{SCRATCH}.release({SCOPE});")
+    out.line("}")
+
+# the args for a call to the looked up function, not counting struct_ptr
+def func_params(func: LoweredFunction) -> str:
+    slots = {param.name: slot for param, slot in out_slots(func)}
+    return ", ".join(
+        slots[param.name] if param.out is not None else
+        f"{param.length_of}.length" if param.length_of is not None else
+        param.plan.marshal_in(param.name, SCRATCH)
+        for param in func.params
+    )
+
+# Arrays that share a length param have to actually be the same length, & fixed-length ones
+# have to be that long - otherwise the native side reads (or writes!) off the end.
+def array_checks(out: Emitter, func: LoweredFunction):
+    for param in func.arrays:
+        length = param.plan.type_.array_length
+        if length.isdigit():
+            out.line(f"if ({param.name}.length != {length}) throw ArgumentError.value({param.name}, '{param.name}', 'Must have exactly {length} elements');")
+            continue
+        first = next(other.length_of for other in func.lengths if other.name == length)
+        if first != param.name:
+            out.line(f"if ({param.name}.length != {first}.length) throw ArgumentError.value({param.name}, '{param.name}', 'Must be the same length as {first}');")
+
+# the Dart expression for how long func's returned array is
+def return_length(func: LoweredFunction, slots: dict[str, str]) -> str:
+    length = func.returns.type_.array_length
+    if length is None or length.isdigit(): return length or ""
+    if length in slots: return f"{slots[length]}.value"
+    param = next(param for param in func.params if param.name == length)
+    return f"{param.length_of}.length" if param.length_of is not None else length
+
+# the body of a wrapper, from the native call onwards
+# on_invalidate is any cleanup to do once structPointer's gone
+def call_and_return(out: Emitter, owner: str, func: LoweredFunction, call: str, invalidates: bool = False, on_invalidate: tuple[str, ...] = ()):
+    outs = out_slots(func)
+    length = return_length(func, {param.name: slot for param, slot in outs})
+    if len(outs) == 0:
+        return_string = func.returns.marshal_out(call, length)
+        if invalidates:
+            out.line(f"final out = {return_string};")
+            out.line()
+            out.line("// this method invalidates the pointer, probably by freeing memory")
+            for line in on_invalidate:
+                out.line(line)
+            out.line("structPointer = nullptr;")
+            out.line()
+            out.line("return out;")
         else:
-            out += param_name
-        
-        if i != len(func.params) - 1:
-            out += ", "
+            out.line(f"return {return_string};")
+        return
 
-    return out
-
-def func_class_return_string(func: CodegenFunction, get_value: str) -> str:
-    out = ""
-
-    if func.return_type.typename == "bool":
-        out += f"({get_value}) == 1"
-    elif lookup.is_enum(func.return_type.typename):
-        out += f"{func.return_type.typename}FromInt({get_value})"
-    elif get_typename(func.return_type, DART) == "Pointer<Utf8>":
-        out += f"({get_value}).toDartString()"
-    elif lookup.is_class(func.return_type.typename):
-        # hoohooheehohaaaaaaaaaaaaaaa
-        # trusting the C code to produce a valid struct!!!
-        # also this kinda fucks the memory management - who is responsible for destroying this?
-        out += f"{func.return_type.typename}.fromPointer({get_value})"
+    fields: list[str] = []
+    if func.returns.api_type == "void":
+        out.line(f"{call};")
     else:
-        out += get_value
+        out.line(f"final {VALUE} = {func.returns.marshal_out(call, length)};")
+        fields.append(VALUE)
+    fields += [param.out.marshal_out(f"{slot}.value") for param, slot in outs]
+
+    if invalidates:
+        out.line()
+        out.line("// this method invalidates the pointer, probably by freeing memory")
+        for line in on_invalidate:
+            out.line(line)
+        out.line("structPointer = nullptr;")
+        out.line()
+    out.line(f"return {result_class_name(owner, func)}({', '.join(fields)});")
+
+def batch_sig_name(file: ParsedGenFile, class_: CodegenClass, native: bool) -> str:
+    out = f"_{file.libname()}_class_{class_.name}_batch"
 
-    out += ";\n"
+    if native: out += "_native"
+    out += "_sig"
 
     return out
 
-def funcs(file: ParsedGenFile) -> str:
-    out: str = ""
+def batch_typedefs(out: Emitter, file: ParsedGenFile, class_: LoweredClass):
+    out.line(f"// void {class_.batch_symbol()}(void* struct_ptr, int64_t* commands, int length)")
+    out.line(f"typedef {batch_sig_name(file, class_.class_, True)} = Void Function(Pointer<Void>, Pointer<Int64>, Int32);")
+    out.line(f"typedef {batch_sig_name(file, class_.class_, False)} = void Function(Pointer<Void>, Pointer<Int64>, int);")
+    out.line()
 
-    if len(file.functions) == 0: return out
+BATCH = "$batch"
+AT = "$at"
 
-    out += banner("function signature typedefs")
-    out += func_typedefs(file.functions, lambda func, is_native: func_sig_name(file, func.name, is_native))
-    
-    out += banner(file.libname())
+# what the class's NativeFinalizer calls - the destructor itself, or for FINALIZE_DEFERRED, the
+# generated function that queues it up for later
+def finalizer_symbol(class_: LoweredClass) -> str:
+    if class_.finalization == FINALIZE_DEFERRED:
+        return class_.defer_symbol()
+    return class_.destructor.func.name
 
-    out += f"class {file.libname()} {{\n\n"
-    out += func_class_private_refs(file.functions, lambda func: func_sig_name(file, func.name, False))
-    out += func_class_refs_initializer(file, file.functions, lambda func, is_native: func_sig_name(file, func.name, is_native))
-    
-    out += f"    {file.libname()}() {{\n"
-    out +=  "        _initRefs();\n"
-    out += "    }\n\n"
+# the binding holder's field for a finalizer's address - there's a field with the plain symbol as
+# its name already, if it's the destructor, & C symbols can't have a $ in
+def finalizer_address(symbol: str) -> str:
+    return f"${symbol}"
 
-    for func in file.functions:
-        out += f"    {func_class_func_return_type(func)} {func.display_name()}("
+def destroy_deferred_sig_name(file: ParsedGenFile, class_: CodegenClass, native: bool) -> str:
+    out = f"_{file.libname()}_class_{class_.name}_destroy_deferred"
 
-        out += param_list(func)
+    if native: out += "_native"
+    out += "_sig"
 
-        out +=  "        return "
-        out += func_class_return_string(func,
-            f"_{func.name}!({func_params(func)})"
-        )
-        out += "    }\n\n"
-    
-    out += "}\n\n\n"
-    
     return out
 
-
-
-def enums(file: ParsedGenFile) -> str:
-    out = ""
-
-    if len(file.enums) == 0: return out
-
-    out += banner("enums")
-    for enum in file.enums:
-        out += f"enum {enum.name} {{\n"
+def destroy_deferred_typedefs(out: Emitter, file: ParsedGenFile, class_: LoweredClass):
+    out.line(f"// int {class_.destroy_deferred_symbol()}()")
+    out.line(f"typedef {destroy_deferred_sig_name(file, class_.class_, True)} = Int32 Function();")
+    out.line(f"typedef {destroy_deferred_sig_name(file, class_.class_, False)} = int Function();")
+    out.line()
+
+# Classes with a finalizer free their native memory once they're garbage collected, unless an
+# @Invalidates() method's already done it. Everything but the constructor & owned fromPointers
+# is exactly the same as without one, so there's no cost per call.
+def finalizer_members(out: Emitter, lowered: LoweredFile, class_: LoweredClass):
+    file = lowered.file
+    name = class_.class_.name
+    bindings = bindings_name(file)
+    if class_.finalization == FINALIZE_DEFERRED:
+        out.line(f"// {class_.destructor.func.name} can't run on whatever thread the GC's on, so this just queues the pointer up")
+        out.line("// for destroyDeferred")
+    else:
+        out.line(f"// calls {class_.destructor.func.name} once this is garbage collected, unless it's already been called")
+    out.line(f"static final _finalizer = NativeFinalizer({bindings}.{finalizer_address(finalizer_symbol(class_))});")
+    out.line()
+    with out.block("void _attachFinalizer() {"):
+        out.line("if (structPointer.address != 0) _finalizer.attach(this, structPointer, detach: this);")
+    out.line()
+
+    if class_.finalization == FINALIZE_DEFERRED:
+        out.line(f"/// Calls {class_.destructor.func.display_name()} on every {name} that's been garbage collected since last time,")
+        out.line(f"/// & returns how many. This happens whenever a new {name} is made anyway.")
+        symbol = class_.destroy_deferred_symbol()
+        if symbol in lowered.profiled:
+            with out.block("static int destroyDeferred() {"):
+                with profile_scope(out, lowered, symbol):
+                    out.line(f"return {bindings}.{symbol}();")
+        else:
+            out.line(f"static int destroyDeferred() => {bindings}.{symbol}();")
+        out.line()
+
+# @IdentityCache() classes keep a weak map of native address -> wrapper, so a function that keeps
+# returning the same object every frame doesn't make a new wrapper every time. Entries go when the
+# wrapper's garbage collected, or when an @Invalidates() method's called on it.
+def identity_cache_members(out: Emitter, class_: LoweredClass):
+    name = class_.class_.name
+    out.line(f"static final _identities = <int, WeakReference<{name}>>{{}};")
+    out.line("// by the time this runs, something else might've been given the same address, so only clear")
+    out.line("// the entry if it's still dead")
+    with out.block("static final _identityEvictor = Finalizer<int>((address) {", "});"):
+        out.line("if (_identities[address]?.target == null) _identities.remove(address);")
+    out.line()
+    with out.block("void _cacheIdentity() {"):
+        out.line("if (structPointer.address == 0) return;")
+        out.line("_identities[structPointer.address] = WeakReference(this);")
+        out.line("_identityEvictor.attach(this, structPointer.address, detach: this);")
+    out.line()
+
+def identity_cached_from_pointer(out: Emitter, class_: LoweredClass):
+    name = class_.class_.name
+    finalized = class_.finalization is not None
+    owned_param = ", {bool owned = false}" if finalized else ""
+
+    out.line("/// Hands back the existing wrapper for ptr if there is one, & only makes a new one otherwise.")
+    if finalized:
+        out.line("/// Only new [owned] ones are freed when they're garbage collected - an existing wrapper")
+        out.line("/// stays however it was.")
+    with out.block(f"factory {name}.fromPointer(Pointer<Void> ptr{owned_param}) {{"):
+        out.line("final cached = _identities[ptr.address]?.target;")
+        out.line("if (cached != null) return cached;")
+        out.line(f"return {name}._fromPointer(ptr{', owned' if finalized else ''}).._cacheIdentity();")
+    out.line()
+
+    with out.block(f"{name}._fromPointer(Pointer<Void> ptr{', bool owned' if finalized else ''}) {{"):
+        out.line("structPointer = ptr;")
+        if finalized:
+            out.line("if (owned) _attachFinalizer();")
+
+def string_bytes_name(param: LoweredParam) -> str:
+    return f"${param.name}Bytes"
+
+def batch_slot_value(param: LoweredParam, slot: str) -> str:
+    if slot == SLOT_STRING:
+        return f"{string_bytes_name(param)}.length"
+    value = param.plan.marshal_in(param.name, SCRATCH)
+    if slot == SLOT_POINTER:
+        return f"{value}.address"
+    return value
+
+# A @Batchable() method doesn't call anything - it writes itself into the CommandBuffer, which
+# calls the generated decoder in native/generated with everything that's queued up when it's flushed.
+def batched_call(out: Emitter, command: BatchCommand):
+    params = command.method.params
+    strings = [param for param, slot in zip(params, command.slots) if slot == SLOT_STRING]
+    for param in strings:
+        out.line(f"final {string_bytes_name(param)} = CommandBuffer.encode({param.name});")
+
+    size = str(command.fixed_size())
+    for param in strings:
+        size += f" + CommandBuffer.stringSlots({string_bytes_name(param)})"
+
+    if len(params) == 0:
+        out.line(f"_batch.begin({command.opcode}, {size});")
+        return
+
+    out.line(f"final {BATCH} = _batch;")
+    out.line(f"final {AT} = {BATCH}.begin({command.opcode}, {size});")
+    for name in command.retained:
+        out.line(f"{BATCH}.retain({name});")
+    for idx, (param, slot) in enumerate(zip(params, command.slots)):
+        store = "doubles" if slot == SLOT_DOUBLE else "ints"
+        index = AT if idx == 0 else f"{AT} + {idx}"
+        out.line(f"{BATCH}.{store}[{index}] = {batch_slot_value(param, slot)};")
+
+    if len(strings) > 0:
+        # each one starts straight after the last
+        put = f"{AT} + {len(params)}"
+        for param in strings:
+            put = f"{BATCH}.putString({put}, {string_bytes_name(param)})"
+        out.line(f"{put};")
+
+def struct_name(class_: LoweredClass) -> str:
+    return f"_{class_.class_.name}Struct"
+
+# the same layout as the struct in the C header
+def struct_class(out: Emitter, class_: LoweredClass):
+    name = struct_name(class_)
+    out.line(f"// {class_.class_.name}'s memory, which the generated C header declares as well")
+    with out.block(f"class {name} extends Struct {{"):
+        for idx, field in enumerate(class_.fields):
+            if idx > 0:
+                out.line()
+            # pointers don't need telling what size they are
+            if not field.plan.type_.is_pointer:
+                out.line(f"@{field.plan.native_type}()")
+            out.line(f"external {field.plan.ffi_type} {field.name};")
+    out.line()
+
+def struct_accessor(class_: LoweredClass) -> str:
+    return f"struct{class_.class_.name}"
+
+def zero_value(plan: MarshalPlan) -> str:
+    if plan.type_.is_pointer: return "nullptr"
+    return {"double": "0.0", "bool": "false"}.get(plan.ffi_type, "0")
+
+# the C side _Static_asserts the same size & offsets, so this only fails if Dart lays the struct out differently
+def layout_check(out: Emitter, class_: LoweredClass):
+    struct = struct_name(class_)
+    with out.block(f"checkStructLayout('{class_.class_.name}', sizeOf<{struct}>(), {class_.struct_size}, [", "]);"):
+        for field in class_.fields:
+            clear = f"memory.cast<{struct}>().ref.{field.name} = {zero_value(field.plan)}"
+            out.line(f"StructField('{field.name}', {field.offset}, (memory) => {clear}),")
+
+# Fields are loads & stores straight from native memory - no FFI call
+def field_accessors(out: Emitter, lowered: LoweredFile, class_: LoweredClass, flush_first: bool):
+    out.line(f"{struct_name(class_)} get _struct => {bindings_name(lowered.file)}.{struct_accessor(class_)}(structPointer);")
+    out.line()
+
+    for field in class_.fields:
+        accessors = [(f"{field.plan.api_type} get {field.name} {{", f"return {field.plan.marshal_out('_struct.' + field.name)};")]
+        if not field.read_only:
+            accessors.append((f"set {field.name}({field.plan.api_type} value) {{", f"_struct.{field.name} = {field.plan.marshal_in('value', SCRATCH)};"))
+
+        for opener, body in accessors:
+            with out.block(opener):
+                out.line(f"_validatePointer('{field.name}');")
+                if flush_first:
+                    out.line("_batch.flush();")
+                out.line(body)
+            out.line()
+
+def funcs(out: Emitter, lowered: LoweredFile):
+    file = lowered.file
+    if len(lowered.functions) == 0: return
+
+    out.banner("function signature typedefs")
+    func_typedefs(out, lowered.functions, lambda func, is_native: func_sig_name(file, func.name, is_native))
+    
+    out.banner(file.libname())
+
+    owner = file.libname()
+    out.line(f"class {owner} {{")
+    out.line()
+    with out.indent():
+        out.line(f"{owner}();")
+        out.line()
+        declare_out_slots(out, lowered.functions)
+
+        for func in lowered.functions:
+            with out.block(f"{api_return_type(owner, func)} {func.func.display_name()}({param_list(func)}) {{"):
+                array_checks(out, func)
+                with profile_scope(out, lowered, func.func.name), call_scope(out, file, func):
+                    call_and_return(out, owner, func, f"{bindings_name(file)}.{func.func.name}({func_params(func)})")
+            out.line()
+    
+    out.line("}")
+    out.line()
+    out.line()
+    result_classes(out, owner, lowered.functions)
+
+
+
+# a lookup table from int to value is fine as long as it's not mostly empty - past that
+# it's a map instead
+def is_dense(enum: CodegenEnum) -> bool:
+    ints = [value.value for value in enum.values]
+    return max(ints) - min(ints) + 1 <= 2 * len(ints) + 8
+
+def enum_conversions(out: Emitter, enum: CodegenEnum):
+    name = enum.name
+
+    # plain 0, 1, 2... - the Dart enum's own index already is the int
+    if enum.is_sequential():
+        out.line(f"{name} {name}FromInt(int val) => {name}.values[val];")
+        out.line(f"int {name}ToInt({name} val) => val.index;")
+        out.line()
+        return
+
+    out.line(f"const _{name}ToIntTable = <int>[{', '.join(str(value.value) for value in enum.values)}];")
+    ints = [value.value for value in enum.values]
+    lowest, highest = min(ints), max(ints)
+    if is_dense(enum):
+        by_int: dict[int, str] = {value.value: value.name for value in enum.values}
+        table = ", ".join(f"{name}.{by_int[i]}" if i in by_int else "null" for i in range(lowest, highest + 1))
+        out.line(f"const _{name}FromIntTable = <{name}?>[{table}];")
+        idx = "val" if lowest == 0 else f"val - {lowest}" if lowest > 0 else f"val + {-lowest}"
+        lookup = f"val >= {lowest} && val <= {highest} ? _{name}FromIntTable[{idx}] : null"
+    else:
+        table = ", ".join(f"{value.value}: {name}.{value.name}" for value in enum.values)
+        out.line(f"const _{name}FromIntTable = <int, {name}>{{{table}}};")
+        lookup = f"_{name}FromIntTable[val]"
+    out.line()
+
+    with out.block(f"{name} {name}FromInt(int val) {{"):
+        out.line(f"final out = {lookup};")
+        out.line(f"if (out == null) throw ArgumentError.value(val, 'val', 'Not a value of {name}');")
+        out.line("return out;")
+    out.line(f"int {name}ToInt({name} val) => _{name}ToIntTable[val.index];")
+    out.line()
+
+# @Flags() enums can be ORed together, so on the Dart side they're a class wrapping the int
+# rather than an actual enum
+def flags_enum(out: Emitter, enum: CodegenEnum):
+    name = enum.name
+    with out.block(f"class {name} {{"):
+        out.line("final int value;")
+        out.line(f"const {name}._(this.value);")
+        out.line()
         for value in enum.values:
-            out += f"    {value.name},\n"
-        out += "}\n\n"
+            out.line(f"static const {value.name} = {name}._({value.value});")
+        out.line()
+        out.line(f"static const values = <{name}>[{', '.join(value.name for value in enum.values)}];")
+        out.line()
+        out.line(f"{name} operator |({name} other) => {name}._(value | other.value);")
+        out.line(f"{name} operator &({name} other) => {name}._(value & other.value);")
+        out.line(f"bool has({name} flag) => (value & flag.value) == flag.value;")
+        out.line()
+        out.line("@override")
+        out.line(f"bool operator ==(Object other) => other is {name} && other.value == value;")
+        out.line("@override")
+        out.line("int get hashCode => value.hashCode;")
+        out.line("@override")
+        out.line(f"String toString() => {name}ToString(this);")
+    out.line()
+
+    out.line(f"{name} {name}FromInt(int val) => {name}._(val);")
+    out.line(f"int {name}ToInt({name} val) => val.value;")
+    out.line()
+
+    # anything that's exactly one of the declared values (including combinations like an
+    # All = 7) gets its own name, & everything else is its single bits joined up
+    exact: dict[int, CodegenEnumValue] = {}
+    for value in enum.values:
+        exact.setdefault(value.value, value)
+    single_bits = [value for value in exact.values() if value.value != 0 and value.value & (value.value - 1) == 0]
+    with out.block(f"String {name}ToString({name} val) {{"):
+        with out.block("switch (val.value) {"):
+            for value in exact.values():
+                out.line(f"case {value.value}: {{ return '{value.stringify_as}'; }}")
+        out.line("final names = <String>[];")
+        for value in single_bits:
+            out.line(f"if (val.has({name}.{value.name})) names.add('{value.stringify_as}');")
+        out.line("return names.isEmpty ? val.value.toString() : names.join(' | ');")
+    out.line()
+
+def enums(out: Emitter, file: ParsedGenFile):
+    if len(file.enums) == 0: return
+
+    out.banner("enums")
+    for enum in file.enums:
+        if enum.is_flags():
+            flags_enum(out, enum)
+            continue
+
+        with out.block(f"enum {enum.name} {{"):
+            for value in enum.values:
+                out.line(f"{value.name},")
+        out.line()
         
-        out += f"{enum.name} {enum.name}FromInt(int val) => {enum.name}.values[val];\n"
-        out += f"int {enum.name}ToInt({enum.name} val) => {enum.name}.values.indexOf(val);\n\n"
-        out += f"String {enum.name}ToString({enum.name} val) {{\n"
-        out += "    switch (val) {\n"
-        for value in enum.values:
-            out += f"        case {enum.name}.{value.name}: {{ return '{value.stringify_as}'; }}\n"
-        out += "    }\n"
-        out += "}\n\n"
-
-    return out
-
-def classes(file: ParsedGenFile) -> str:
-    out: str = ""
-
-    if len(file.classes) == 0: return out
-
-    out += banner("func sig typedefs for classes")
-    for class_ in file.classes:
-        out += banner(class_.name)
-        out += func_typedefs(class_.methods, lambda method, is_native: method_sig_name(file, class_, method, is_native))
+        enum_conversions(out, enum)
+        with out.block(f"String {enum.name}ToString({enum.name} val) {{"):
+            with out.block("switch (val) {"):
+                for value in enum.values:
+                    out.line(f"case {enum.name}.{value.name}: {{ return '{value.stringify_as}'; }}")
+        out.line()
+
+def classes(out: Emitter, lowered: LoweredFile):
+    file = lowered.file
+    if len(lowered.classes) == 0: return
+
+    out.banner("func sig typedefs for classes")
+    for class_ in lowered.classes:
+        out.banner(class_.class_.name)
+        func_typedefs(out, class_.all_methods, lambda method, is_native: method_sig_name(file, class_.class_, method, is_native))
+        if len(class_.batch) > 0:
+            batch_typedefs(out, file, class_)
+        if class_.finalization == FINALIZE_DEFERRED:
+            destroy_deferred_typedefs(out, file, class_)
     
-    out += banner("class implementations")
-    for class_ in file.classes:
-        out += f"class {class_.name} {{\n"
-        out +=  "    Pointer<Void> structPointer = nullptr;\n\n"
-        out +=  "    void _validatePointer(String methodName) {\n"
-        out +=  "        if (structPointer.address == 0) {\n"
-        out += f"            throw Exception('{class_.name}.$methodName was called, but structPointer is a nullptr.');\n"
-        out +=  "        }\n"
-        out +=  "    }\n\n"
-
-        out += func_class_private_refs(class_.methods, lambda method: method_sig_name(file, class_, method, False))
-
-        out += func_class_refs_initializer(file, class_.methods,  lambda method, is_native: method_sig_name(file, class_, method, is_native))
-
-        initializer = class_.initializer()
-        out += f"    {class_.name}("
-        out += param_list(initializer)
-
-        #! ALL CONSTRUCTORS MUST CALL _initRefs()
-        out +=  "        _initRefs();\n"
-        out += f"        structPointer = _{initializer.name}!("
-        out += func_params(initializer)
-        out += ");\n"
-        out += "    }\n\n"
-
-        out += f"    {class_.name}.fromPointer(Pointer<Void> ptr) {{\n"
-        out +=  "        _initRefs();\n"
-        out +=  "        structPointer = ptr;\n"
-        out +=  "    }\n\n"
-
-        for method in class_.methods:
-            if has_annotation(method.annotations, "Initializer"): continue
-
-            # hopefully it's not mutable !!!!!
-            del method.params["struct_ptr"]
-
-            if has_annotation(method.annotations, "Getter"):
-                getter = get_annotation(method.annotations, "Getter")
-                if has_annotation(method.annotations, "Show"):
-                    print(f"Warning: Annotation {get_annotation(method.annotations, 'Show')} on {class_.name}.{method.name} will have no effect, because the method also has the annotation {getter}.")
-                param_count = len(method.params)
-                assert param_count == 0, f"A getter cannot take any parameters, but {method.name} takes {param_count}"
-                out += f"    {func_class_func_return_type(method)} get "
-                out += getter.args[0]
-                out += " {\n"
-
+    out.banner("class implementations")
+    for class_ in lowered.classes:
+        name = class_.class_.name
+        if len(class_.fields) > 0:
+            struct_class(out, class_)
+        finalized = class_.finalization is not None
+        identity_cached = "IdentityCache" in class_.class_.annotations
+        with out.block(f"class {name}{' implements Finalizable' if finalized else ''} {{"):
+            out.line("Pointer<Void> structPointer = nullptr;")
+            out.line()
+            if finalized:
+                finalizer_members(out, lowered, class_)
+            if identity_cached:
+                identity_cache_members(out, class_)
+            declare_out_slots(out, class_.methods)
+            batched = {command.method.func.name: command for command in class_.batch}
+            if len(batched) > 0:
+                out.line("// @Batchable() methods queue up in here, & only actually run when it's flushed - which happens")
+                out.line("// when it fills up, or before any other method on this runs")
+                run_batch = f"{bindings_name(file)}.{class_.batch_symbol()}(structPointer, commands, length)"
+                if class_.batch_symbol() in lowered.profiled:
+                    with out.block("late final _batch = CommandBuffer((commands, length) {", "});"):
+                        with profile_scope(out, lowered, class_.batch_symbol()):
+                            out.line(f"{run_batch};")
+                else:
+                    out.line(f"late final _batch = CommandBuffer((commands, length) => {run_batch});")
+                out.line()
+            with out.block("void _validatePointer(String methodName) {"):
+                with out.block("if (structPointer.address == 0) {"):
+                    out.line(f"throw Exception('{name}.$methodName was called, but structPointer is a nullptr.');")
+            out.line()
+
+            initializer = class_.initializer
+            with out.block(f"{name}({param_list(initializer)}) {{"):
+                array_checks(out, initializer)
+                if class_.finalization == FINALIZE_DEFERRED:
+                    out.line("destroyDeferred();")
+                with profile_scope(out, lowered, initializer.func.name), call_scope(out, file, initializer):
+                    out.line(f"structPointer = {bindings_name(file)}.{initializer.func.name}({func_params(initializer)});")
+                if finalized:
+                    out.line("_attachFinalizer();")
+                if identity_cached:
+                    out.line("_cacheIdentity();")
+            out.line()
+
+            if identity_cached:
+                identity_cached_from_pointer(out, class_)
+            elif finalized:
+                out.line("/// Only [owned] ones are freed when they're garbage collected - otherwise whoever handed out")
+                out.line("/// ptr is still responsible for it.")
+                with out.block(f"{name}.fromPointer(Pointer<Void> ptr, {{bool owned = false}}) {{"):
+                    out.line("structPointer = ptr;")
+                    out.line("if (owned) _attachFinalizer();")
             else:
-                if has_annotation(method.annotations, "Invalidates"):
-                    out += "    @mustCallSuper\n"
-                out += f"    {func_class_func_return_type(method)} {method.display_name()}("
-                out += param_list(method)
-
-            out += f"        _validatePointer('{method.display_name()}');\n"
-            get_return_value = f"_{method.name}!(structPointer"
-            if len(method.params) > 0:
-                get_return_value += ", "
-            get_return_value += func_params(method)
-            get_return_value += ")"
-            return_string = func_class_return_string(method, get_return_value)
-            if has_annotation(method.annotations, "Invalidates"):
-                out += f"        final out = {return_string}"
-                out += "\n        // this method invalidates the pointer, probably by freeing memory\n"
-                out += "        structPointer = nullptr;\n\n"
-                out += "        return out;\n"
-            else:
-                out += f"        return {return_string}"
-            out += "    }\n\n"
+                with out.block(f"{name}.fromPointer(Pointer<Void> ptr) {{"):
+                    out.line("structPointer = ptr;")
+            out.line()
+
+            if len(batched) > 0:
+                out.line("// only needed if something other than this object has to see what's been batched so far")
+                out.line("void flushBatch() => _batch.flush();")
+                out.line()
+
+            if len(class_.fields) > 0:
+                field_accessors(out, lowered, class_, len(batched) > 0)
+
+            for method in class_.methods:
+                annotations = method.func.annotations
+
+                if has_annotation(annotations, "Getter"):
+                    getter = get_annotation(annotations, "Getter")
+                    if has_annotation(annotations, "Show"):
+                        print(f"Warning: Annotation {get_annotation(annotations, 'Show')} on {name}.{method.func.name} will have no effect, because the method also has the annotation {getter}.")
+                    param_count = len(method.api_params())
+                    assert param_count == 0, f"A getter cannot take any parameters, but {method.func.name} takes {param_count}"
+                    opener = f"{api_return_type(name, method)} get {getter.args[0]} {{"
+
+                else:
+                    if has_annotation(annotations, "Invalidates"):
+                        out.line("@mustCallSuper")
+                    opener = f"{api_return_type(name, method)} {method.func.display_name()}({param_list(method)}) {{"
+
+                get_return_value = f"{bindings_name(file)}.{method.func.name}(structPointer"
+                if len(method.params) > 0:
+                    get_return_value += ", "
+                get_return_value += func_params(method)
+                get_return_value += ")"
+
+                with out.block(opener):
+                    out.line(f"_validatePointer('{method.func.display_name()}');")
+                    array_checks(out, method)
+                    if method.func.name in batched:
+                        # only the queueing up - the native side times the call itself when it's flushed
+                        with profile_scope(out, lowered, method.func.name):
+                            batched_call(out, batched[method.func.name])
+                    else:
+                        on_invalidate: tuple[str, ...] = ()
+                        if len(batched) > 0:
+                            # anything that's queued up has to happen before this does
+                            out.line("_batch.flush();")
+                            on_invalidate += ("_batch.free();",)
+                        if finalized:
+                            on_invalidate += ("_finalizer.detach(this);",)
+                        if identity_cached:
+                            on_invalidate += ("_identities.remove(structPointer.address);", "_identityEvictor.detach(this);")
+                        with profile_scope(out, lowered, method.func.name), call_scope(out, file, method):
+                            call_and_return(out, name, method, get_return_value, has_annotation(annotations, "Invalidates"), on_invalidate)
+                out.line()
         
-        out += "}\n\n"
-
-
-
-
-    return out
+        out.line()
+        result_classes(out, name, class_.methods)
 
 
-def codegen(files: list[ParsedGenFile]) -> str:
-    out = ""
-    out += \
+HEADER = \
 """// for native types & basic FFI functionality
 import 'dart:ffi';
 // for string utils
@@ -374,13 +789,70 @@ import 'package:meta/meta.dart';
 
 """
 
-    global lookup
-    lookup = TypeLookup(files)
+def codegen_file(out: Emitter, lowered: LoweredFile, unified: bool = False):
+    out.banner(f"file: {lowered.file.name}")
+    funcs(out, lowered)
+    enums(out, lowered.file)
+    classes(out, lowered)
+    bindings(out, lowered, unified)
+
+# the import for the runtime (or another bit of hand-written support code), from a Dart file at output_path
+def runtime_import(output_path: str, runtime: str = DART_RUNTIME_PATH) -> str:
+    runtime_path = path.relpath(runtime, path.dirname(output_path))
+    return f"import '{runtime_path.replace(path.sep, '/')}';"
+
+# only when something's profiled, so that otherwise the output's exactly the same as ever
+def profiler_import(out: Emitter, output_path: str):
+    out.line("// timing for the profiled bindings")
+    out.line(runtime_import(output_path, DART_PROFILER_PATH))
+    out.line()
+
+TYPED_DATA_IMPORT = "// for typed arrays\nimport 'dart:typed_data';\n\n"
+
+def codegen(out: Emitter, files: list[LoweredFile], unified: bool = False):
+    out.write(HEADER)
+    if any(uses_arrays(file) for file in files):
+        out.write(TYPED_DATA_IMPORT)
+    if any(needs_runtime(file) for file in files):
+        out.line("// support code for the generated bindings")
+        out.line(runtime_import(DART_OUTPUT_PATH))
+        out.line()
+    if any(len(file.profiled) > 0 for file in files):
+        profiler_import(out, DART_OUTPUT_PATH)
 
     for file in files:
-        out += banner(f"file: {file.name}")
-        out += funcs(file)
-        out += enums(file)
-        out += classes(file)
-
-    return out
\ No newline at end of file
+        codegen_file(out, file, unified)
+
+# sharded mode: one library per file, which only imports the shards whose types it uses
+def codegen_shard(out: Emitter, file: LoweredFile, deps: FileDeps, unified: bool = False):
+    out.write(HEADER)
+    if uses_arrays(file):
+        out.write(TYPED_DATA_IMPORT)
+    if needs_runtime(file):
+        out.line("// support code for the generated bindings")
+        out.line(runtime_import(file.file.dart_shard_path()))
+        out.line()
+    if len(file.profiled) > 0:
+        profiler_import(out, file.file.dart_shard_path())
+
+    dependencies = deps.direct(file.file)
+    for dependency in dependencies:
+        out.line(f"import '{path.basename(dependency.dart_shard_path())}';")
+    if len(dependencies) > 0:
+        out.line()
+
+    codegen_file(out, file, unified)
+
+# sharded mode: DART_OUTPUT_PATH just re-exports every shard, for anything that wants everything at once
+def codegen_umbrella(out: Emitter, files: list[ParsedGenFile]):
+    for file in files:
+        shard_path = path.relpath(file.dart_shard_path(), path.dirname(DART_OUTPUT_PATH))
+        out.line(f"export '{shard_path.replace(path.sep, '/')}';")
+
+# unsharded mode: each file's shard path just re-exports DART_OUTPUT_PATH, so the hand-written
+# Dart's imports work either way - & since these are committed, `dart analyze` & `dart run`
+# work on a fresh checkout too
+def codegen_forwarder(out: Emitter, file: ParsedGenFile):
+    output_path = path.relpath(DART_OUTPUT_PATH, path.dirname(file.dart_shard_path()))
+    out.line("// unsharded - everything's in here")
+    out.line(f"export '{output_path.replace(path.sep, '/')}';")
\ No newline at end of file
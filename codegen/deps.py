@@ -0,0 +1,50 @@
+from codegen_types import *
+from typelookup import *
+
+# Which files use which other files' types. Used in sharded mode so each shard only
+# pulls in (and each library only gets rebuilt for) the shards it actually needs.
+
+def all_functions(file: ParsedGenFile) -> list[CodegenFunction]:
+    out = list(file.functions)
+    for class_ in file.classes:
+        out += class_.methods
+    return out
+
+def referenced_typenames(file: ParsedGenFile) -> set[str]:
+    out: set[str] = set()
+    for func in all_functions(file):
+        out.add(func.return_type.typename)
+        for param in func.params:
+            out.add(param.type_.typename)
+    for class_ in file.classes:
+        for field in class_.fields:
+            out.add(field.type_.typename)
+    return out
+
+class FileDeps:
+    def __init__(self, lookup: TypeLookup):
+        self.lookup = lookup
+        self.files = lookup.files
+
+    # other files whose enums or classes appear in file's signatures, in the same order as self.files
+    def direct(self, file: ParsedGenFile, enums_only: bool = False) -> list[ParsedGenFile]:
+        owners: set[str] = set()
+        for typename in referenced_typenames(file):
+            symbol = self.lookup.get(typename)
+            if symbol is None: continue
+            if symbol.kind == ENUM or not enums_only:
+                owners.add(symbol.file.name)
+
+        return [other for other in self.files if other.name != file.name and other.name in owners]
+
+    # everything file's C shard ends up including, including its own shard
+    def c_shard_closure(self, file: ParsedGenFile) -> list[ParsedGenFile]:
+        seen: set[str] = set()
+        pending = [file]
+        while len(pending) > 0:
+            current = pending.pop()
+            if current.name in seen: continue
+            seen.add(current.name)
+            pending += self.direct(current, enums_only = True)
+
+        return [other for other in self.files if other.name in seen]
@@ -0,0 +1,54 @@
+from contextlib import contextmanager
+from typing import Iterator, Protocol
+from banner import *
+
+INDENT = "    "
+
+class Sink(Protocol):
+    def write(self, text: str) -> int: ...
+
+# Writes generated code straight to a sink (usually a buffered file handle from
+# outputs.open_output()) instead of building it up in a string, so the size of the
+# output doesn't drive time or memory.
+class Emitter:
+    def __init__(self, sink: Sink):
+        self.sink = sink
+        self.level = 0
+        # characters written so far
+        self.written = 0
+
+    # raw text - no indentation, no newline
+    def write(self, text: str):
+        self.sink.write(text)
+        self.written += len(text)
+
+    # one line at the current indentation. empty lines don't get any trailing whitespace.
+    def line(self, text: str = ""):
+        if text == "":
+            self.write("\n")
+        else:
+            self.write(f"{INDENT * self.level}{text}\n")
+
+    @contextmanager
+    def indent(self, levels: int = 1) -> Iterator[None]:
+        self.level += levels
+        try:
+            yield
+        finally:
+            self.level -= levels
+
+    # opener, everything inside indented one level, closer
+    @contextmanager
+    def block(self, opener: str, closer: str = "}") -> Iterator[None]:
+        self.line(opener)
+        with self.indent():
+            yield
+        self.line(closer)
+
+    def banner(self, msg: str, uppercase: bool = True, hyphen_count: int = 10):
+        self.write(banner(msg, uppercase, hyphen_count))
+
+# for when only the size of the output matters, eg benchmarking
+class DiscardSink:
+    def write(self, text: str) -> int:
+        return len(text)
@@ -0,0 +1,28 @@
+import ctypes
+from dataclasses import dataclass
+from functools import lru_cache
+from codegen_types import *
+
+# Where each field of a class's struct ends up. ctypes lays structs out by the same C ABI rules
+# as the compiler & Dart's Struct, so this is what both sides should agree on - the C header
+# static_asserts it, and the generated Dart checks the size.
+
+@dataclass(frozen = True, slots = True)
+class StructLayout:
+    size: int
+    # one per field, in order
+    offsets: tuple[int, ...]
+
+def ctypes_type(type_: CodegenType) -> type:
+    if type_.is_pointer: return ctypes.c_void_p
+    if type_.typename == "double": return ctypes.c_double
+    if type_.typename == "uint8": return ctypes.c_uint8
+    # int, BOOL & enums
+    return ctypes.c_int
+
+# lots of classes have the same field types, & building a ctypes Structure isn't free
+@lru_cache(maxsize = None)
+def struct_layout(types: tuple[CodegenType, ...]) -> StructLayout:
+    fields = [(f"field{idx}", ctypes_type(type_)) for idx, type_ in enumerate(types)]
+    struct = type("Layout", (ctypes.Structure,), {"_fields_": fields})
+    return StructLayout(ctypes.sizeof(struct), tuple(getattr(struct, name).offset for name, _ in fields))
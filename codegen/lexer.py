@@ -0,0 +1,85 @@
+from dataclasses import dataclass
+from typing import Iterator
+import re
+import sys
+
+# token kinds
+IDENT = "identifier"
+NUMBER = "number"
+PUNCT = "punctuation"
+COMMENT = "comment"
+NEWLINE = "newline"
+# a newline ending a line with nothing (not even a comment) on it - these are
+# significant, because they separate file annotations from whatever comes next
+BLANK_LINE = "blank line"
+EOF = "end of file"
+
+@dataclass(slots = True)
+class Token:
+    kind: str
+    text: str
+    # both 1-based
+    line: int
+    column: int
+    # offsets into the source, for slicing out the original text
+    start: int
+    end: int
+
+    def __str__(self) -> str:
+        if self.kind in (NEWLINE, BLANK_LINE, EOF):
+            return self.kind
+        return f"'{self.text}'"
+
+# whitespace is folded into the front of each match rather than being its own token,
+# which roughly halves the number of matches on typical input
+TOKEN_REGEX = re.compile(r"""
+    [ \t\r]*
+(?:
+    (?P<newline>\n)
+  | (?P<end>\Z)
+  | (?P<comment>//[^\n]*)
+  | (?P<identifier>[A-Za-z_][A-Za-z0-9_]*)
+  | (?P<number>-?(?:0[xX][0-9a-fA-F]+|[0-9]+(?:\.[0-9]+)?))
+  | (?P<punctuation>[{}()\[\]*,;@=<>|])
+  | (?P<error>.)
+)
+""", re.VERBOSE)
+
+class LexError(Exception):
+    def __init__(self, msg: str, line: int, column: int):
+        super().__init__(msg)
+        self.line = line
+        self.column = column
+
+# Streams the tokens in source in a single pass. Whitespace other than newlines is dropped.
+def tokenize(source: str) -> Iterator[Token]:
+    line = 1
+    line_start = 0
+    line_empty = True
+
+    for match in TOKEN_REGEX.finditer(source):
+        kind = match.lastgroup
+        if kind == "end":
+            break
+
+        start = match.start(kind)
+        column = start - line_start + 1
+
+        if kind == "newline":
+            yield Token(BLANK_LINE if line_empty else NEWLINE, "\n", line, column, start, start + 1)
+            line += 1
+            line_start = start + 1
+            line_empty = True
+            continue
+
+        if kind == "error":
+            raise LexError(f"Unexpected character '{match.group(kind)}'", line, column)
+
+        line_empty = False
+        text = match.group(kind)
+        if kind == "identifier":
+            # names & typenames end up in the model, & the same few get used over & over
+            text = sys.intern(text)
+        yield Token(kind, text, line, column, start, match.end())
+
+    yield Token(EOF, "", line, len(source) - line_start + 1, len(source), len(source))
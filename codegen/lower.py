@@ -0,0 +1,482 @@
+from codegen_types import *
+from typelookup import *
+from layout import *
+from dataclasses import dataclass, replace
+from typing import Optional
+
+# Resolves every param & return type in the parsed files exactly once, into a MarshalPlan
+# that says everything the Dart backend needs to know about getting that value across the
+# FFI boundary. The backend then just renders plans - it never has to look a type up itself.
+# Nothing in here modifies the parsed files.
+
+# who's responsible for the memory behind a value
+OWNERSHIP_VALUE = "value"        # passed by value, there's nothing to own
+OWNERSHIP_BORROWED = "borrowed"  # a pointer to memory someone else is managing
+OWNERSHIP_SCOPED = "scoped"      # encoded (or for arrays, pinned) by the generated Dart code into its binding's StringScratch, & released when the call returns
+OWNERSHIP_NATIVE = "native"      # handed back by native code, which decides when it dies
+OWNERSHIP_OWNED = "owned"        # handed back by native code, & freed by the class's finalizer once the Dart object's garbage collected
+
+# the type of each primitive in the native typedefs
+NATIVE: dict[str, str] = {
+    "void": "Void",
+    "char": "Utf8",
+    "uint8": "Uint8",
+    "int": "Int32",
+    "double": "Double",
+    "bool": "Int32"
+}
+
+# the type of each primitive in the Dart typedefs
+DART: dict[str, str] = {
+    "void": "void",
+    "char": "Utf8",
+    "uint8": "int",
+    "int": "int",
+    "double": "double",
+    "bool": "int"
+}
+
+@dataclass(frozen = True, slots = True)
+class ArrayType:
+    # what the generated API takes & returns
+    list_type: str
+    # the StringScratch method which gets a pointer to one for the duration of a call
+    pin: str
+    # the runtime function which wraps returned native memory in one
+    view: str
+
+# the primitives that can be arrays, & the TypedData they turn into
+ARRAYS: dict[str, ArrayType] = {
+    "uint8": ArrayType("Uint8List", "uint8s", "nativeUint8List"),
+    "int": ArrayType("Int32List", "int32s", "nativeInt32List"),
+    "double": ArrayType("Float64List", "float64s", "nativeFloat64List"),
+}
+
+# the expression templates all have a {value} placeholder. convert_in for scoped values
+# also has {scratch}, for the StringScratch to encode into, & convert_out for arrays has
+# {length}.
+IDENTITY = "{value}"
+
+@dataclass(frozen = True, slots = True)
+class MarshalPlan:
+    # the C type, for reference
+    type_: CodegenType
+    # type in the native typedef, eg Int32
+    native_type: str
+    # type in the Dart typedef, ie what the looked up function actually takes/returns, eg int
+    ffi_type: str
+    # type in the generated API, eg bool
+    api_type: str
+    # API value -> FFI value
+    convert_in: str
+    # FFI value -> API value
+    convert_out: str
+    ownership_in: str
+    ownership_out: str
+
+    def marshal_in(self, value: str, scratch: str) -> str:
+        return self.convert_in.format(value = value, scratch = scratch)
+
+    def marshal_out(self, value: str, length: str = "") -> str:
+        return self.convert_out.format(value = value, length = length)
+
+@dataclass(frozen = True, slots = True)
+class LoweredParam:
+    name: str
+    plan: MarshalPlan
+    # for @Out() params, how to read the value the native function wrote into the pointer
+    out: Optional[MarshalPlan] = None
+    # for int params that say how long an array param is, the (first) array param - the caller
+    # doesn't pass these, they're just the array's length
+    length_of: Optional[str] = None
+
+@dataclass(frozen = True, slots = True)
+class LoweredFunction:
+    func: CodegenFunction
+    # for methods, the struct_ptr param, which the generated code fills in from structPointer
+    receiver: Optional[LoweredParam]
+    # everything the native function takes apart from the receiver, in order - including @Out() params
+    params: tuple[LoweredParam, ...]
+    returns: MarshalPlan
+    # the @Out() params, which come back as fields of a result object instead
+    outs: tuple[LoweredParam, ...] = ()
+    # the array params, & the params that are filled in from the length of one
+    arrays: tuple[LoweredParam, ...] = ()
+    lengths: tuple[LoweredParam, ...] = ()
+
+    # what the caller of the generated API passes
+    def api_params(self) -> tuple[LoweredParam, ...]:
+        if len(self.outs) == 0 and len(self.lengths) == 0: return self.params
+        return tuple(param for param in self.params if param.out is None and param.length_of is None)
+
+    # whether calling it needs a StringScratch scope
+    def needs_scope(self) -> bool:
+        return any(param.plan.ownership_in == OWNERSHIP_SCOPED for param in self.params)
+
+    # what the native function actually takes, in order
+    def native_params(self) -> tuple[LoweredParam, ...]:
+        if self.receiver is None: return self.params
+        return (self.receiver,) + self.params
+
+# How each arg of a @Batchable() method is packed into the CommandBuffer. Every arg gets one
+# 8-byte slot - a string's slot holds its length, & its bytes get copied in after the fixed ones.
+SLOT_INT = "int"
+SLOT_DOUBLE = "double"
+SLOT_POINTER = "pointer"
+SLOT_STRING = "string"
+
+@dataclass(frozen = True, slots = True)
+class BatchCommand:
+    method: LoweredFunction
+    opcode: int
+    # one per param, not counting the receiver
+    slots: tuple[str, ...]
+    # the class pointer params whose Dart objects the CommandBuffer has to keep alive until it's flushed -
+    # otherwise their finalizer could free them while the command's still queued
+    retained: tuple[str, ...] = ()
+
+    # header + fixed slots, ie everything but the string bytes
+    def fixed_size(self) -> int:
+        return 1 + len(self.slots)
+
+@dataclass(frozen = True, slots = True)
+class LoweredField:
+    name: str
+    plan: MarshalPlan
+    # the type in the generated C struct
+    c_type: str
+    # from the start of the struct, in bytes
+    offset: int
+    # char* fields always are - there'd be nobody to own the string
+    read_only: bool
+
+@dataclass(frozen = True, slots = True)
+class LoweredClass:
+    class_: CodegenClass
+    initializer: LoweredFunction
+    # everything but the initializer
+    methods: tuple[LoweredFunction, ...]
+    # all of them, in declaration order, for the typedefs & function refs
+    all_methods: tuple[LoweredFunction, ...]
+    # the @Batchable() methods, in declaration order - the index is the opcode
+    batch: tuple[BatchCommand, ...] = ()
+    # if there are any, the generated code owns the struct definition, & the hand-written C doesn't declare one
+    fields: tuple[LoweredField, ...] = ()
+    struct_size: int = 0
+    # FINALIZE_DIRECT, FINALIZE_DEFERRED or None, & if it's not None, the method the finalizer (eventually) calls
+    finalization: Optional[str] = None
+    destructor: Optional[LoweredFunction] = None
+
+    # the generated C function which runs a buffer full of batched calls
+    def batch_symbol(self) -> str:
+        return f"{self.class_.name}_RunBatch"
+
+    # for FINALIZE_DEFERRED - the generated C function the NativeFinalizer calls, which just queues the pointer up
+    def defer_symbol(self) -> str:
+        return f"{self.class_.name}_DeferDestroy"
+
+    # for FINALIZE_DEFERRED - the generated C function which destroys everything that's been queued up
+    def destroy_deferred_symbol(self) -> str:
+        return f"{self.class_.name}_DestroyDeferred"
+
+# the generated C wrapper that times a call to symbol - see c.profiling
+def profiled_symbol(symbol: str) -> str:
+    return f"{symbol}_Profiled"
+
+@dataclass(frozen = True, slots = True)
+class LoweredFile:
+    file: ParsedGenFile
+    functions: tuple[LoweredFunction, ...]
+    classes: tuple[LoweredClass, ...]
+    # the symbols whose calls get timed, in the same order as the native side's table of timings
+    profiled: tuple[str, ...] = ()
+
+    # the generated C function which hands the native side's timings over
+    def profile_read_symbol(self) -> str:
+        return f"{self.file.id()}_ProfileRead"
+
+    # everything the generated Dart looks up in the library (including what NativeFinalizers call),
+    # in the order the bindings do
+    def exported_symbols(self) -> list[str]:
+        out = [func.func.name for func in self.functions]
+        for class_ in self.classes:
+            out += [method.func.name for method in class_.all_methods]
+            if len(class_.batch) > 0:
+                out.append(class_.batch_symbol())
+            if class_.finalization == FINALIZE_DEFERRED:
+                out.append(class_.defer_symbol())
+                out.append(class_.destroy_deferred_symbol())
+        # the plain ones stay exported too - the batch decoders & finalizers don't go through the wrappers
+        if len(self.profiled) > 0:
+            out += [profiled_symbol(symbol) for symbol in self.profiled]
+            out.append(self.profile_read_symbol())
+        return out
+
+# A plan only depends on the type, and types are interned, so every param & return value
+# of the same type can share one.
+class Planner:
+    def __init__(self, lookup: TypeLookup):
+        self.lookup = lookup
+        self.plans: dict[CodegenType, MarshalPlan] = {}
+
+    def plan(self, type_: CodegenType) -> MarshalPlan:
+        out = self.plans.get(type_)
+        if out is None:
+            out = self.plans[type_] = plan_type(type_, self.lookup)
+        return out
+
+def plan_type(type_: CodegenType, lookup: TypeLookup) -> MarshalPlan:
+    typename = type_.typename
+
+    # Arrays come out as a view straight onto the native memory, & go in as a pointer to the
+    # TypedData's own memory if it's from NativeArrays - otherwise it's copied into the scratch
+    # for the call, & back out again afterwards in case the native side wrote to it.
+    if type_.is_array():
+        array = ARRAYS.get(typename)
+        if array is None:
+            raise ValueError(f"Can't have an array of {typename} - only {', '.join(ARRAYS)}")
+        pointer_type = f"Pointer<{NATIVE[typename]}>"
+        return MarshalPlan(
+            type_, pointer_type, pointer_type, array.list_type,
+            f"{{scratch}}.{array.pin}({{value}})", f"{array.view}({{value}}, {{length}})",
+            OWNERSHIP_SCOPED, OWNERSHIP_NATIVE
+        )
+
+    if typename in NATIVE:
+        if type_.is_pointer:
+            pointer_type = f"Pointer<{NATIVE[typename]}>"
+            if typename == "char":
+                return MarshalPlan(
+                    type_, pointer_type, pointer_type, "String",
+                    "{scratch}.encode({value})", "({value}).toDartString()",
+                    OWNERSHIP_SCOPED, OWNERSHIP_NATIVE
+                )
+            return MarshalPlan(type_, pointer_type, pointer_type, pointer_type, IDENTITY, IDENTITY, OWNERSHIP_BORROWED, OWNERSHIP_BORROWED)
+
+        if typename == "bool":
+            return MarshalPlan(type_, NATIVE[typename], DART[typename], "bool", "{value} ? 1 : 0", "({value}) == 1", OWNERSHIP_VALUE, OWNERSHIP_VALUE)
+        return MarshalPlan(type_, NATIVE[typename], DART[typename], DART[typename], IDENTITY, IDENTITY, OWNERSHIP_VALUE, OWNERSHIP_VALUE)
+
+    symbol = lookup.get(typename)
+    if symbol is None:
+        raise ValueError(f"Cannot find type {typename}")
+
+    if symbol.kind == ENUM:
+        if type_.is_pointer:
+            return MarshalPlan(type_, "Pointer<Int32>", "Pointer<Int32>", "Pointer<Int32>", IDENTITY, IDENTITY, OWNERSHIP_BORROWED, OWNERSHIP_BORROWED)
+        return MarshalPlan(
+            type_, "Int32", "int", typename,
+            f"{typename}ToInt({{value}})", f"{typename}FromInt({{value}})",
+            OWNERSHIP_VALUE, OWNERSHIP_VALUE
+        )
+
+    if symbol.kind == CLASS:
+        if not type_.is_pointer:
+            raise ValueError("Cannot pass class by value - please pass a pointer instead.")
+        # trusting the C code to produce a valid struct!!! & nobody's responsible for destroying
+        # the ones we get back, other than whoever calls an @Invalidates method on them - unless
+        # the function's @ReturnsOwned(), which swaps this for owned_plan
+        return MarshalPlan(
+            type_, "Pointer<Void>", "Pointer<Void>", typename,
+            "{value}.structPointer", f"{typename}.fromPointer({{value}})",
+            OWNERSHIP_BORROWED, OWNERSHIP_NATIVE
+        )
+
+    raise ValueError(f"Data structures like {typename} aren't currently supported.")
+
+# types that an @Out() function can write back through a pointer
+def is_out_type(type_: CodegenType, lookup: TypeLookup) -> bool:
+    return type_.is_pointer and not type_.is_array() and (type_.typename in ("int", "double", "bool") or lookup.is_enum(type_.typename))
+
+INT = CodegenType.of("int", False)
+INT_POINTER = CodegenType.of("int", True)
+
+# Array params say how long they are with another param. That one's filled in from the array,
+# so several arrays using the same one all have to be the same length. A returned array can
+# also get its length from an @Out() int* param.
+def bind_array_lengths(func: CodegenFunction, params: list[LoweredParam]) -> list[LoweredParam]:
+    by_name = {param.name: param for param in params}
+    length_of: dict[str, str] = {}
+
+    def check(type_: CodegenType, what: str, allow_out: bool):
+        length = type_.array_length
+        if length.isdigit(): return
+        param = by_name.get(length)
+        if param is None:
+            raise ValueError(f"{func.name}'s {what} is {type_.c_type()}, but it doesn't have a param called {length}")
+        if param.plan.type_ is INT: return
+        if allow_out and param.out is not None and param.plan.type_ is INT_POINTER: return
+        expected = "an int or an @Out() int*" if allow_out else "an int"
+        raise ValueError(f"{func.name}'s {what} is {type_.c_type()}, so {length} has to be {expected}, but it's {param.plan.type_.c_type()}")
+
+    for param in params:
+        type_ = param.plan.type_
+        if not type_.is_array(): continue
+        check(type_, f"param {param.name}", False)
+        if not type_.array_length.isdigit():
+            length_of.setdefault(type_.array_length, param.name)
+    if func.return_type.is_array():
+        check(func.return_type, "return type", True)
+
+    if len(length_of) == 0: return params
+    return [
+        LoweredParam(param.name, param.plan, param.out, length_of[param.name]) if param.name in length_of else param
+        for param in params
+    ]
+
+# the parser puts struct_ptr at the start of every method's params (except the initializer)
+def lower_function(func: CodegenFunction, planner: Planner, is_method: bool = False) -> LoweredFunction:
+    has_outs = "Out" in func.annotations
+
+    receiver: Optional[LoweredParam] = None
+    params: list[LoweredParam] = []
+    for param in func.params:
+        out_plan: Optional[MarshalPlan] = None
+        if has_outs and is_out_type(param.type_, planner.lookup):
+            out_plan = planner.plan(CodegenType.of(param.type_.typename, False))
+
+        lowered = LoweredParam(param.name, planner.plan(param.type_), out_plan)
+        if is_method and param.name == "struct_ptr":
+            receiver = lowered
+        else:
+            params.append(lowered)
+    params = bind_array_lengths(func, params)
+
+    returns = planner.plan(func.return_type)
+    if "ReturnsOwned" in func.annotations:
+        returns = owned_plan(func, returns, planner.lookup)
+    outs = tuple(param for param in params if param.out is not None)
+    arrays = tuple(param for param in params if param.plan.type_.is_array())
+    lengths = tuple(param for param in params if param.length_of is not None)
+    if has_outs:
+        # the constructor's only got structPointer to put anything in
+        if "Initializer" in func.annotations:
+            raise ValueError(f"{func.name} is the @Initializer(), so it can't be @Out() as well")
+        out_names = [param.name for param in outs]
+        if len(out_names) == 0:
+            raise ValueError(f"{func.name} is marked @Out(), but it doesn't have any int*, double*, bool* or enum pointer params")
+        # the return value goes in a field called value
+        if "value" in out_names and returns.api_type != "void":
+            raise ValueError(f"{func.name} is marked @Out() & returns something, so it can't have an out param called 'value'")
+
+    return LoweredFunction(func, receiver, tuple(params), returns, outs, arrays, lengths)
+
+# the Dart object gets the class's finalizer attached, so nobody has to remember to free it
+def owned_plan(func: CodegenFunction, plan: MarshalPlan, lookup: TypeLookup) -> MarshalPlan:
+    typename = func.return_type.typename
+    if not lookup.is_class(typename):
+        raise ValueError(f"{func.name} is @ReturnsOwned(), but it doesn't return a class")
+    if lookup.get(typename).decl.finalization() is None:
+        raise ValueError(f"{func.name} is @ReturnsOwned(), but {typename} doesn't have a finalizer to free it with")
+    return replace(plan, convert_out = f"{typename}.fromPointer({{value}}, owned: true)", ownership_out = OWNERSHIP_OWNED)
+
+def batch_slot(type_: CodegenType, lookup: TypeLookup) -> Optional[str]:
+    if type_.is_pointer:
+        if type_.typename == "char": return SLOT_STRING
+        if lookup.is_class(type_.typename): return SLOT_POINTER
+        return None
+    if type_.typename == "double": return SLOT_DOUBLE
+    if type_.typename in ("int", "bool") or lookup.is_enum(type_.typename): return SLOT_INT
+    return None
+
+# A batched call doesn't actually happen until the buffer's flushed, so it can't return anything,
+# & everything it takes has to be copyable into the buffer.
+def lower_batch(class_: CodegenClass, methods: tuple[LoweredFunction, ...], lookup: TypeLookup) -> tuple[BatchCommand, ...]:
+    out: list[BatchCommand] = []
+    for method in methods:
+        annotations = method.func.annotations
+        if "Batchable" not in annotations: continue
+
+        name = f"{class_.name}.{method.func.name}"
+        for other in ("Initializer", "Getter", "Invalidates", "Out", "ReturnsOwned"):
+            if other in annotations:
+                raise ValueError(f"{name} can't be both @Batchable() and @{other}()")
+        if method.func.return_type.typename != "void" or method.func.return_type.is_pointer:
+            raise ValueError(f"{name} is @Batchable(), so it can't return anything")
+
+        slots: list[str] = []
+        for param in method.params:
+            slot = batch_slot(param.plan.type_, lookup)
+            if slot is None:
+                raise ValueError(f"{name} is @Batchable(), but its param {param.name} is {param.plan.type_.c_type()} - only int, double, bool, enums, char* & class pointers can be batched")
+            slots.append(slot)
+
+        retained = tuple(
+            param.name for param, slot in zip(method.params, slots)
+            if slot == SLOT_POINTER and lookup.get(param.plan.type_.typename).decl.finalization() is not None
+        )
+        out.append(BatchCommand(method, len(out), tuple(slots), retained))
+    return tuple(out)
+
+# the C spelling of a field's type
+def field_c_type(type_: CodegenType) -> str:
+    out = C_TYPENAMES.get(type_.typename, type_.typename)
+    if type_.is_pointer: out += "*"
+    return out
+
+C_TYPENAMES: dict[str, str] = {
+    "bool": "BOOL",
+    "uint8": "uint8_t"
+}
+
+def lower_fields(class_: CodegenClass, methods: tuple[LoweredFunction, ...], planner: Planner) -> tuple[tuple[LoweredField, ...], int]:
+    if len(class_.fields) == 0: return (), 0
+
+    method_names = {method.func.display_name() for method in methods}
+    for field in class_.fields:
+        name = f"{class_.name}.{field.name}"
+        type_ = field.type_
+        if type_.typename in ("void", "char") and not type_.is_pointer:
+            raise ValueError(f"{name} can't be a {type_.c_type()}")
+        if type_.is_array():
+            raise ValueError(f"{name} is an array, which isn't supported for fields - use a method")
+        if type_.is_pointer and planner.lookup.is_class(type_.typename):
+            raise ValueError(f"{name} is a pointer to a class, which isn't supported for fields yet - use a void* & a method")
+        if field.name in method_names:
+            raise ValueError(f"{name} has the same name as a method")
+
+    layout = struct_layout(tuple(field.type_ for field in class_.fields))
+    out: list[LoweredField] = []
+    for field, offset in zip(class_.fields, layout.offsets):
+        plan = planner.plan(field.type_)
+        read_only = "ReadOnly" in field.annotations or plan.ownership_in == OWNERSHIP_SCOPED
+        out.append(LoweredField(field.name, plan, field_c_type(field.type_), offset, read_only))
+    return tuple(out), layout.size
+
+def lower_class(class_: CodegenClass, planner: Planner) -> LoweredClass:
+    all_methods = tuple(lower_function(method, planner, is_method = True) for method in class_.methods)
+    initializer = class_.initializer()
+    finalization = class_.finalization()
+    destructor = class_.destructor() if finalization is not None else None
+    return LoweredClass(
+        class_,
+        next(method for method in all_methods if method.func is initializer),
+        tuple(method for method in all_methods if not has_annotation(method.func.annotations, "Initializer")),
+        all_methods,
+        lower_batch(class_, all_methods, planner.lookup),
+        *lower_fields(class_, all_methods, planner),
+        finalization = finalization,
+        destructor = next((method for method in all_methods if method.func is destructor), None)
+    )
+
+# With profile_all (ie --profile-ffi) that's everything the Dart side calls, including the batch runners -
+# otherwise just the @Profile() functions & methods.
+def profiled_symbols(functions: tuple[LoweredFunction, ...], classes: tuple[LoweredClass, ...], profile_all: bool) -> tuple[str, ...]:
+    out = [func.func.name for func in functions if profile_all or "Profile" in func.func.annotations]
+    for class_ in classes:
+        out += [method.func.name for method in class_.all_methods if profile_all or "Profile" in method.func.annotations]
+        if not profile_all: continue
+        if len(class_.batch) > 0:
+            out.append(class_.batch_symbol())
+        if class_.finalization == FINALIZE_DEFERRED:
+            out.append(class_.destroy_deferred_symbol())
+    return tuple(out)
+
+def lower_file(file: ParsedGenFile, planner: Planner, profile_all: bool = False) -> LoweredFile:
+    functions = tuple(lower_function(func, planner) for func in file.functions)
+    classes = tuple(lower_class(class_, planner) for class_ in file.classes)
+    return LoweredFile(file, functions, classes, profiled_symbols(functions, classes, profile_all))
+
+def lower_all(lookup: TypeLookup, profile_all: bool = False) -> list[LoweredFile]:
+    planner = Planner(lookup)
+    return [lower_file(file, planner, profile_all) for file in lookup.files]
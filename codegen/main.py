@@ -1,9 +1,25 @@
 import os
 import os.path as path
+import sys
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+from termcolor import colored
 
 from parse import *
 from codegen_types import *
 from paths import *
+from cache import *
+from outputs import *
+from typelookup import *
+from lower import *
+from deps import *
+from emitter import *
+from shared_library_extension import *
+from watch import *
+from metrics import *
 
 import dart
 import c
@@ -17,24 +33,277 @@ def all_with_extension(directory: str, ext: str) -> list[str]:
             if path.splitext(file)[-1] == ext:
                 out.append(path.join(root, file))
     
-    return out
+    # os.walk order depends on the filesystem - keep the output stable
+    return sorted(out)
 
-def main():
-    parsed_files: list[ParsedGenFile] = []
-    for gen_file in all_with_extension("native", ".gen"):
-        parsed_files.append(
-            Parser(gen_file).parse()
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description = "Generate Dart & C bindings from the .gen files in native/")
+    parser.add_argument(
+        "--sharded",
+        action = "store_true",
+        help = f"generate one Dart library & one C header per .gen file (in {DART_SHARD_DIR} & {C_SHARD_DIR}), " +
+               f"with {DART_OUTPUT_PATH} & {C_OUTPUT_PATH} as umbrellas - otherwise, those have everything, " +
+               "& each file's library & header just forward to them"
+    )
+    parser.add_argument(
+        "--unified",
+        action = "store_true",
+        help = f"link every .gen file's C into one library, {UNIFIED_LIBRARY_NAME}{shared_library_extension()}, " +
+               "instead of one library each"
+    )
+    parser.add_argument(
+        "--build-profile",
+        choices = list(makefile.BUILD_PROFILES),
+        default = DEFAULT_BUILD_PROFILE,
+        help = f"the profile the generated Makefile builds with if make isn't given a PROFILE (default: {DEFAULT_BUILD_PROFILE})"
+    )
+    parser.add_argument(
+        "--profile-ffi",
+        action = "store_true",
+        help = f"time every call into native code, on both sides of the FFI boundary - see {DART_PROFILER_PATH}. " +
+               "without it, only the functions & methods marked @Profile() are"
+    )
+    parser.add_argument(
+        "--watch",
+        action = "store_true",
+        help = "keep running, & regenerate whenever a .gen file changes. changes to codegen itself aren't picked up"
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type = float,
+        default = DEFAULT_POLL_INTERVAL_MS,
+        help = f"with --watch, how often to check for changes, in ms (default: {DEFAULT_POLL_INTERVAL_MS})"
+    )
+    parser.add_argument(
+        "--debounce",
+        type = float,
+        default = DEFAULT_DEBOUNCE_MS,
+        help = f"with --watch, how long nothing has to change for before regenerating, in ms (default: {DEFAULT_DEBOUNCE_MS})"
+    )
+    parser.add_argument(
+        "--profile",
+        action = "store_true",
+        help = "print how long each phase, backend & .gen file took, & how much memory each one allocated at its peak. " +
+               "tracing memory makes everything a lot slower, so only compare runs which both had this on. " +
+               "with --watch, it's only the first generation"
+    )
+    parser.add_argument(
+        "--metrics-json",
+        metavar = "PATH",
+        help = "write everything --profile would print, plus counts of declarations, params & emitted bytes, to PATH as JSON"
+    )
+    parser.add_argument(
+        "-j", "--jobs",
+        type = int,
+        default = 1,
+        help = "number of worker processes to parse & generate with (default: 1, ie no worker processes)"
+    )
+    return parser.parse_args(argv)
+
+
+# the flags that change what gets generated, rather than how
+@dataclass(frozen = True, slots = True)
+class OutputOptions:
+    sharded: bool = False
+    build_profile: str = DEFAULT_BUILD_PROFILE
+    unified: bool = False
+    profile_ffi: bool = False
+
+# The backends only ever see the parsed files through these, so that a worker process
+# gets them once when it starts rather than once per output.
+_files: list[ParsedGenFile] = []
+_lowered: list[LoweredFile] = []
+_deps: Optional[FileDeps] = None
+
+def init_backends(lookup: TypeLookup, lowered: list[LoweredFile]):
+    global _files, _lowered, _deps
+    _files = lookup.files
+    _lowered = lowered
+    _deps = FileDeps(lookup)
+
+def render_dart(out: Emitter, unified: bool):                         dart             .codegen(out, _lowered, unified)
+def render_c(out: Emitter):                                           c                .codegen(out, _lowered)
+def render_dart_shard(out: Emitter, i: int, unified: bool):           dart             .codegen_shard(out, _lowered[i], _deps, unified)
+def render_c_shard(out: Emitter, i: int):                             c                .codegen_shard(out, _lowered[i], _deps)
+def render_c_shared_header(out: Emitter):                             c                .codegen_shared_header(out)
+def render_dart_umbrella(out: Emitter):                               dart             .codegen_umbrella(out, _files)
+def render_c_umbrella(out: Emitter):                                  c                .codegen_umbrella(out, _files)
+def render_dart_forwarder(out: Emitter, i: int):                      dart             .codegen_forwarder(out, _files[i])
+def render_c_forwarder(out: Emitter, i: int):                         c                .codegen_forwarder(out)
+def render_c_source(out: Emitter, i: int):                            c                .codegen_source(out, _lowered[i])
+def render_export_map(out: Emitter, i: int):                          c                .codegen_export_map(out, _lowered[i])
+def render_unified_export_map(out: Emitter):                          c                .codegen_unified_export_map(out, _lowered)
+def render_makefile(out: Emitter, options: OutputOptions):           makefile         .codegen(out, _files, options.sharded, options.build_profile, options.unified, options.profile_ffi)
+def render_cloc_exclude_list(out: Emitter):                           cloc_exclude_list.codegen(out)
+
+# (output path, render function, args for the render function after the emitter)
+Job = tuple[str, Callable[..., None], tuple[Any, ...]]
+
+# Streams one output straight to disk - whichever process renders it writes it, so
+# nothing bigger than a write buffer ever has to come back to the parent.
+def run_job(job: Job):
+    output_path, render, args = job
+    with open_output(output_path) as fh:
+        render(Emitter(fh), *args)
+
+# the render functions whose first arg is the index of the one .gen file they're for
+PER_FILE_RENDERS = (render_dart_shard, render_c_shard, render_dart_forwarder, render_c_forwarder, render_c_source, render_export_map)
+
+# run_job, but timing the rendering & the writing separately - for --profile
+def run_job_measured(job: Job) -> JobMetrics:
+    output_path, render, args = job
+    profiler = Profiler(True)
+    rendering, writing = Measurement(), Measurement()
+    with ExitStack() as stack:
+        with profiler.measure(writing):
+            out = Emitter(stack.enter_context(open_output(output_path)))
+        with profiler.measure(rendering):
+            render(out, *args)
+        # the rendering goes straight into a temp file, so the rest of the writing is once it's closed -
+        # flushing it, comparing it with what's there already & swapping it in
+        with profiler.measure(writing):
+            stack.close()
+
+    gen_file = _files[args[0]].name if render in PER_FILE_RENDERS else None
+    return JobMetrics(output_path, render.__name__.removeprefix("render_"), gen_file, rendering, writing, out.written)
+
+# only is the .gen files to generate the per-file outputs for - everything, if it's None
+def output_jobs(parsed_files: list[ParsedGenFile], options: OutputOptions, only: Optional[set[str]] = None) -> list[Job]:
+    jobs: list[Job] = []
+    wanted = [(i, file) for i, file in enumerate(parsed_files) if only is None or file.name in only]
+
+    if options.sharded:
+        for i, file in wanted:
+            jobs.append((file.dart_shard_path(), render_dart_shard, (i, options.unified)))
+            jobs.append((file.c_shard_path(),    render_c_shard,    (i,)))
+        jobs.append((C_SHARED_HEADER_PATH, render_c_shared_header, ()))
+        jobs.append((DART_OUTPUT_PATH,     render_dart_umbrella,   ()))
+        jobs.append((C_OUTPUT_PATH,        render_c_umbrella,      ()))
+    else:
+        for i, file in wanted:
+            jobs.append((file.dart_shard_path(), render_dart_forwarder, (i,)))
+            jobs.append((file.c_shard_path(),    render_c_forwarder,    (i,)))
+        jobs.append((DART_OUTPUT_PATH, render_dart, (options.unified,)))
+        jobs.append((C_OUTPUT_PATH,    render_c,    ()))
+
+    for i, file in wanted:
+        if file.has_generated_c(options.profile_ffi):
+            jobs.append((file.c_source_path(), render_c_source, (i,)))
+        jobs.append((file.export_map_path(), render_export_map, (i,)))
+    if options.unified:
+        jobs.append((UNIFIED_EXPORT_MAP_PATH, render_unified_export_map, ()))
+
+    jobs.append(("Makefile",             render_makefile,          (options,)))
+    jobs.append((CLOC_EXCLUDE_LIST_PATH, render_cloc_exclude_list, ()))
+
+    return jobs
+
+# The outputs are all independent of each other (& each one is written atomically), so they
+# can be rendered in any order on any process & the result is the same as the serial path.
+# Returns how many outputs were rendered (not all of them will have actually changed).
+def write_outputs(
+    lookup: TypeLookup,
+    lowered: list[LoweredFile],
+    options: OutputOptions,
+    jobs: int,
+    only: Optional[set[str]] = None,
+    metrics: Optional[RunMetrics] = None
+) -> int:
+    parsed_files = lookup.files
+    to_run = output_jobs(parsed_files, options, only)
+    run = run_job if metrics is None else run_job_measured
+
+    with measured_phase(metrics, "render"):
+        if jobs > 1:
+            with ProcessPoolExecutor(min(jobs, len(to_run)), initializer = init_backends, initargs = (lookup, lowered)) as pool:
+                # list() so that any exception from a worker gets raised here
+                results = list(pool.map(run, to_run))
+        else:
+            init_backends(lookup, lowered)
+            results = [run(job) for job in to_run]
+
+    if metrics is not None:
+        for result in results:
+            metrics.add_job(result)
+
+    with measured_phase(metrics, "prune"):
+        # sources & maps for .gen files which have since been deleted, or sources they don't need any more
+        prune_outputs(
+            C_SOURCE_DIR,
+            [file.c_source_path() for file in parsed_files if file.has_generated_c(options.profile_ffi)] +
+            [file.export_map_path() for file in parsed_files] +
+            ([UNIFIED_EXPORT_MAP_PATH] if options.unified else [])
         )
-    
-    with open(DART_OUTPUT_PATH,       "wt") as fh:
-        fh.write(dart             .codegen(parsed_files))
-    with open(C_OUTPUT_PATH,          "wt") as fh:
-        fh.write(c                .codegen(parsed_files))
-    with open("Makefile",             "wt") as fh:
-        fh.write(makefile         .codegen(parsed_files))
-    with open(CLOC_EXCLUDE_LIST_PATH, "wt") as fh:
-        fh.write(cloc_exclude_list.codegen())
 
-    
+        # shards (or forwarders) for .gen files which have since been deleted, & common.h if it's not sharded any more
+        prune_outputs(DART_SHARD_DIR, [file.dart_shard_path() for file in parsed_files])
+        prune_outputs(C_SHARD_DIR,    [file.c_shard_path()    for file in parsed_files] + ([C_SHARED_HEADER_PATH] if options.sharded else []))
+
+    return len(to_run)
+
+# With changed (a set of .gen paths), the per-file outputs are only rendered for those files & the
+# ones that use their types - the outputs that cover every file always are. Raises ValueError if
+# the files don't make sense together.
+def generate(
+    parsed_files: list[ParsedGenFile],
+    options: OutputOptions,
+    jobs: int,
+    changed: Optional[set[str]] = None,
+    metrics: Optional[RunMetrics] = None
+) -> int:
+    with measured_phase(metrics, "lower"):
+        # both built once up front, so that name clashes & bad types are caught before anything gets written
+        lookup = TypeLookup(parsed_files)
+        lowered = lower_all(lookup, options.profile_ffi)
+
+    only: Optional[set[str]] = None
+    if changed is not None:
+        deps = FileDeps(lookup)
+        only = {
+            file.name for file in parsed_files
+            if file.name in changed or any(dependency.name in changed for dependency in deps.direct(file))
+        }
+
+    return write_outputs(lookup, lowered, options, jobs, only, metrics)
+
+def gen_files() -> list[str]:
+    return all_with_extension("native", ".gen")
+
+def main(argv: Optional[list[str]] = None):
+    args = parse_args(argv)
+    options = OutputOptions(args.sharded, args.build_profile, args.unified, args.profile_ffi)
+
+    metrics = RunMetrics(trace_memory = True) if args.profile or args.metrics_json is not None else None
+
+    with measured_phase(metrics, "walk"):
+        fnames = gen_files()
+    with measured_phase(metrics, "cache load"):
+        cache = ParseCache()
+    with measured_phase(metrics, "parse"):
+        parsed_files = cache.parse_all(fnames, args.jobs, metrics)
+    with measured_phase(metrics, "cache save"):
+        cache.save()
+
+    try:
+        generate(parsed_files, options, args.jobs, metrics = metrics)
+    except ValueError as e:
+        print(colored(f"Error: {e}", 'red'))
+        # the watcher reports errors & carries on, so it can start off broken too
+        if not args.watch: sys.exit(1)
+
+    if metrics is not None:
+        for file in parsed_files:
+            file_metrics = metrics.file(file.name)
+            file_metrics.declarations = file.declaration_count()
+            file_metrics.params = file.param_count()
+        if args.profile:
+            metrics.print_report()
+        if args.metrics_json is not None:
+            metrics.write_json(args.metrics_json)
+
+    if args.watch:
+        # in-process from here on - the whole point is to not pay for starting anything up again
+        watch(cache, parsed_files, gen_files, lambda files, changed: generate(files, options, 1, changed), args.poll_interval / 1000, args.debounce / 1000)
+
 
-if __name__ == '__main__': main()
\ No newline at end of file
+if __name__ == '__main__': main()
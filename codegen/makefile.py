@@ -2,82 +2,245 @@ from codegen_types import *
 import os.path as path
 from shared_library_extension import *
 from paths import *
+from emitter import *
 
-def generate_makefile_item(target: str, dependencies: list[str], commands: list[str]) -> str:
-    out = f"{target}:"
-    for dependency in dependencies: out += f" {dependency}"
-    for command in commands: out += f"\n	{command}"
-    out += "\n\n"
-    return out
+def generate_makefile_item(out: Emitter, target: str, dependencies: list[str], commands: list[str]):
+    out.write(f"{target}:")
+    for dependency in dependencies: out.write(f" {dependency}")
+    for command in commands: out.write(f"\n	{command}")
+    out.write("\n\n")
 
-def codegen(files: list[ParsedGenFile]) -> str:
-    out = ""
+# the make variables the rules build with - everything that depends on the profile is in terms of these
+PROFILE_BUILD_DIR = "$(BUILD_DIR)"
+HEADLESS_BUILD_DIR = f"{PROFILE_BUILD_DIR}{path.sep}headless"
 
-    libs: list[str] = []
-    for file in files:
-        lib_path = f"build{path.sep}{file.libpath_no_ext()}"
-        lib_name = f"{lib_path}{shared_library_extension()}"
+# name -> (compile flags, link flags, what it's for). LTO needs the optimisation flags at link time
+# too, since that's when most of the compiling actually happens.
+BUILD_PROFILES: dict[str, tuple[str, str, str]] = {
+    "debug":        ("-O0 -g", "", "no optimisation, for gdb"),
+    "release":      ("$(OPT) -DNDEBUG -fno-semantic-interposition", "", "what gets shipped without LTO"),
+    "lto":          ("$(OPT) -DNDEBUG -fno-semantic-interposition -flto", "$(OPT) -flto", "release, optimised across each library's files at link time"),
+    # atomic, since deferred finalizers get queued from whichever thread the GC's on
+    "pgo-generate": ("$(OPT) -DNDEBUG -fno-semantic-interposition -flto -fprofile-generate -fprofile-update=atomic", "$(OPT) -flto -fprofile-generate", "lto, instrumented to record what's hot - see the pgo rule"),
+    # anything the training run didn't get to is optimised as normal rather than for size
+    "pgo-use":      ("$(OPT) -DNDEBUG -fno-semantic-interposition -flto -fprofile-use -fprofile-partial-training -Wno-missing-profile", "$(OPT) -flto", "lto, optimised using what pgo-generate recorded"),
+}
 
-        link_libs: list[str] = []
+# how many frames the pgo rule runs beans for - the default for PGO_FRAMES
+PGO_TRAINING_FRAMES = 600
 
-        for annotation in file.annotations:
-            if annotation.name == "LinkWithLib":
-                link_libs.append(annotation.args[0])
+def build_profiles(out: Emitter, default_profile: str):
+    out.write(f"# one of {', '.join(BUILD_PROFILES)} - eg make PROFILE=release. each one builds into its\n")
+    out.write("# own directory, so switching between them doesn't throw anything away\n")
+    out.write(f"PROFILE ?= {default_profile}\n")
+    out.write(f"BUILD_DIR = {BUILD_DIR}{path.sep}$(PROFILE)\n")
+    out.write("# for everything but debug - eg make PROFILE=release OPT=-O3\n")
+    out.write("OPT ?= -O2\n")
+    out.write(f"PGO_FRAMES ?= {PGO_TRAINING_FRAMES}\n\n")
 
-        command = f"gcc -shared -o {lib_name} -fPIC -I. {file.name_no_ext()}.c"
-        for lib in link_libs:
-            command += f" -l{lib}"
+    keyword = "ifeq"
+    for name, (compile_flags, link_flags, description) in BUILD_PROFILES.items():
+        out.write(f"{keyword} ($(PROFILE),{name})\n")
+        out.write(f"# {description}\n")
+        out.write(f"CFLAGS = {compile_flags}\n")
+        out.write(f"LDFLAGS = {link_flags}\n".replace(" \n", "\n"))
+        keyword = "else ifeq"
+    out.write("else\n")
+    out.write(f"$(error Unknown PROFILE '$(PROFILE)' - it has to be one of {', '.join(BUILD_PROFILES)})\n")
+    out.write("endif\n\n")
 
-        # todo: #included dependencies
-        out += generate_makefile_item(
-            lib_name,
-            [
-                f"{file.name_no_ext()}.c"
-            ],
+# eg native/headless/RenderWindowStub.c - only the libraries that have one get a headless build
+def headless_stub_path(file: ParsedGenFile) -> str:
+    return f"{HEADLESS_STUB_DIR}/{file.id()}Stub.c"
+
+# eg build/obj/native/SDL/RenderWindow.o - every build dir gets its own objects, so the headless
+# build doesn't clobber the real one's copy of the generated C
+def object_path(build_dir: str, source: str) -> str:
+    return f"{build_dir}{path.sep}obj{path.sep}{path.splitext(source)[0]}.o"
+
+def depfile_path(object_: str) -> str:
+    return f"{path.splitext(object_)[0]}.d"
+
+# Everything's compiled to an object file first & linked separately, so changing one .c file only
+# recompiles that one. gcc writes a depfile next to each object listing every header it #included
+# (c_codegen.h, the shards, the hand-written .h files...), which is -included at the bottom - so
+# editing any of them rebuilds exactly the objects that use it. -MP adds an empty rule for each
+# header, so deleting one doesn't break the build.
+#
+# Objects are order-only dependent on codegen, so the generated headers always exist before
+# anything's compiled, even with make -j. codegen only rewrites an output when it's actually
+# changed, so that alone never makes anything stale.
+#
+# The export map hides everything the Dart side doesn't look up, which is what lets LTO inline &
+# drop things - see c.codegen_export_map. The headless libraries don't get one, because the stubs
+# have functions of their own for the benchmarks to call.
+def library_items(build_dir: str, lib_name: str, sources: list[str], link_libs: list[str], export_map: Optional[str]) -> tuple[list[str], list[tuple[str, list[str], list[str]]]]:
+    objects = [object_path(build_dir, source) for source in sources]
+
+    items: list[tuple[str, list[str], list[str]]] = []
+    link = "gcc -shared $(LDFLAGS)"
+    if export_map is not None:
+        link += f" -Wl,--version-script={export_map}"
+    link += f" -o {lib_name} {' '.join(objects)}"
+    for lib in link_libs:
+        link += f" -l{lib}"
+    items.append((
+        lib_name,
+        objects + ([export_map] if export_map is not None else []),
+        [
+            f"mkdir -p {path.dirname(lib_name)}",
+            link
+        ]
+    ))
+
+    for source, object_ in zip(sources, objects):
+        items.append((
+            object_,
+            [source, "|", "codegen"],
             [
-                f"mkdir -p {path.dirname(lib_name)}",
-                command
+                f"mkdir -p {path.dirname(object_)}",
+                f"gcc -c -fPIC -I. $(CFLAGS) -MMD -MP -o {object_} {source}"
             ]
-        )
+        ))
 
-        libs.append(lib_name)
+    return [depfile_path(object_) for object_ in objects], items
+
+def link_libs(file: ParsedGenFile) -> list[str]:
+    return [annotation.args[0] for annotation in file.annotations if annotation.name == "LinkWithLib"]
+
+def codegen(out: Emitter, files: list[ParsedGenFile], sharded: bool = False, build_profile: str = DEFAULT_BUILD_PROFILE, unified: bool = False, profile_ffi: bool = False):
+    # (target, dependencies, commands) for each library & its objects - these go at the end, but
+    # the libraries rule needs to know the libraries' names first
+    lib_names: list[str] = []
+    lib_items: list[tuple[str, list[str], list[str]]] = []
+    headless_names: list[str] = []
+    headless_items: list[tuple[str, list[str], list[str]]] = []
+    depfiles: list[str] = []
+    # the C codegen writes besides the headers - they're real prerequisites, so make needs to know
+    # where they come from if they're not there yet (eg after a make clean)
+    generated_files: list[str] = []
+
+    def add_library(lib_name: str, sources: list[str], libs: list[str], export_map: str):
+        lib_depfiles, items = library_items(PROFILE_BUILD_DIR, lib_name, sources, libs, export_map)
+        lib_names.append(lib_name)
+        lib_items.extend(items)
+        depfiles.extend(lib_depfiles)
+
+    def add_headless_library(lib_name: str, sources: list[str]):
+        lib_depfiles, items = library_items(HEADLESS_BUILD_DIR, lib_name, sources, [], None)
+        headless_names.append(lib_name)
+        headless_items.extend(items)
+        depfiles.extend(lib_depfiles)
+
+    # unified mode collects everything up for one library at the end instead
+    all_sources: list[str] = []
+    all_libs: list[str] = []
+    all_headless_sources: list[str] = []
+    for file in files:
+        generated = [file.c_source_path()] if file.has_generated_c(profile_ffi) else []
+        generated_files += generated + [file.export_map_path()]
+        sources = [f"{file.name_no_ext()}.c"] + generated
+        stub = headless_stub_path(file)
+        headless_sources = [stub] + generated if path.exists(stub) else []
+
+        if unified:
+            all_sources += sources
+            all_libs += [lib for lib in link_libs(file) if lib not in all_libs]
+            all_headless_sources += headless_sources
+            continue
+
+        add_library(f"{PROFILE_BUILD_DIR}{path.sep}{file.libpath_no_ext()}{shared_library_extension()}", sources, link_libs(file), file.export_map_path())
+        if len(headless_sources) > 0:
+            add_headless_library(f"{HEADLESS_BUILD_DIR}{path.sep}{file.libpath_no_ext()}{shared_library_extension()}", headless_sources)
+
+    # One library means one dlopen (& one lot of relocations) at startup instead of one per file,
+    # & with PROFILE=lto, calls between files can be inlined. The headless one only has the files
+    # that have a stub - the symbols the rest would've had just aren't there.
+    if unified:
+        generated_files.append(UNIFIED_EXPORT_MAP_PATH)
+        unified_name = f"{UNIFIED_LIBRARY_NAME}{shared_library_extension()}"
+        add_library(f"{PROFILE_BUILD_DIR}{path.sep}{unified_name}", all_sources, all_libs, UNIFIED_EXPORT_MAP_PATH)
+        if len(all_headless_sources) > 0:
+            add_headless_library(f"{HEADLESS_BUILD_DIR}{path.sep}{unified_name}", all_headless_sources)
     
     
     # there's a directory called codegen, so we have to use .PHONY to
     # tell make to use the rule called "codegen" instead of the directory
-    out = ".PHONY: codegen\n\n" \
-      + generate_makefile_item(
+    out.write(".PHONY: codegen watch pgo bench bench-dart bench-startup" + (" headless bench-batching" if len(headless_names) > 0 else "") + "\n\n")
+    build_profiles(out, build_profile)
+    generate_makefile_item(out,
         "all",
-        ["codegen", "libraries"], # codegen MUST be before libraries because the C files might need to include c_codegen.h
+        ["codegen", "libraries"],
         []
-    ) + generate_makefile_item(
+    )
+    generate_makefile_item(out,
         "libraries",
-        libs,
+        lib_names,
         []
-    ) + generate_makefile_item(
+    )
+    codegen_command = (
+        f"python codegen{path.sep}main.py" +
+        (" --sharded" if sharded else "") +
+        (f" --build-profile {build_profile}" if build_profile != DEFAULT_BUILD_PROFILE else "") +
+        (" --unified" if unified else "") +
+        (" --profile-ffi" if profile_ffi else "")
+    )
+    generate_makefile_item(out,
         "codegen",
         [],
         [
-            f"python codegen{path.sep}main.py"
+            codegen_command
         ]
-    ) + generate_makefile_item(
+    )
+    generate_makefile_item(out,
+        # leave this running to regenerate as soon as a .gen file's saved
+        "watch",
+        [],
+        [
+            f"{codegen_command} --watch"
+        ]
+    )
+    generate_makefile_item(out,
         "run",
         [
             "all"
         ],
         [
-            "dart run"
-            #"dart run --enable-vm-service"
+            "BEANS_BUILD_PROFILE=$(PROFILE) dart run"
+            #"BEANS_BUILD_PROFILE=$(PROFILE) dart run --enable-vm-service"
         ]
-    ) + generate_makefile_item(
+    )
+    pgo_generate = f"{BUILD_DIR}{path.sep}pgo-generate"
+    pgo_use = f"{BUILD_DIR}{path.sep}pgo-use"
+    generate_makefile_item(out,
+        # Builds everything instrumented, runs beans for a while with SDL's dummy video driver (so it
+        # doesn't need a display) to see what's hot, & then builds PROFILE=pgo-use with that. gcc
+        # looks for each object's profile next to it, so they're copied across.
+        "pgo",
+        ["codegen"],
+        [
+            "$(MAKE) PROFILE=pgo-generate libraries",
+            f"find {pgo_generate} -name '*.gcda' -delete",
+            "SDL_VIDEODRIVER=dummy BEANS_BUILD_PROFILE=pgo-generate BEANS_FRAME_LIMIT=$(PGO_FRAMES) dart run",
+            f"rm -rf {pgo_use}",
+            f"mkdir -p {pgo_use}{path.sep}obj",
+            f"cd {pgo_generate}{path.sep}obj && find . -name '*.gcda' -exec cp --parents {{}} ..{path.sep}..{path.sep}pgo-use{path.sep}obj \\;",
+            "$(MAKE) PROFILE=pgo-use libraries"
+        ]
+    )
+    generate_makefile_item(out,
         "clean",
         [],
         [
             "rm -rf build",
             f"rm -f {C_OUTPUT_PATH}",
-            f"rm -f {DART_OUTPUT_PATH}"
+            f"rm -f {DART_OUTPUT_PATH}",
+            f"rm -rf {C_SOURCE_DIR}",
+            f"rm -rf {C_SHARD_DIR}",
+            f"rm -rf {DART_SHARD_DIR}"
         ]
-    ) + generate_makefile_item(
+    )
+    generate_makefile_item(out,
         # The `cloc` command-line utility MUST be installed, or this won't work.
         # https://github.com/AlDanial/cloc
         "cloc",
@@ -86,12 +249,58 @@ def codegen(files: list[ParsedGenFile]) -> str:
             # exclude generated files so cloc actually shows real results
             f"cloc . --exclude-list={CLOC_EXCLUDE_LIST_PATH}"
         ]
-    ) + generate_makefile_item(
+    )
+    generate_makefile_item(out,
+        # times each codegen phase on a synthetic corpus, and fails if it's regressed from codegen/bench/baseline.json
+        "bench",
+        [],
+        [
+            f"python codegen{path.sep}bench{path.sep}phases.py"
+        ]
+    )
+    generate_makefile_item(out,
+        # how long opening the libraries & looking up every binding takes, per-file vs --unified - see the script for setup
+        "bench-startup",
+        [],
+        [
+            f"BEANS_BUILD_PROFILE=$(PROFILE) dart run benchmark{path.sep}library_loading.dart"
+        ]
+    )
+    generate_makefile_item(out,
+        # RSS over a long run of string-passing calls, with & without the generated bindings' StringScratch
+        "bench-dart",
+        [],
+        [
+            f"dart run benchmark{path.sep}string_marshalling.dart"
+        ]
+    )
+    if len(headless_names) > 0:
+        generate_makefile_item(out,
+            # the libraries that have a stub in native/headless, built from that instead - no SDL needed
+            "headless",
+            headless_names,
+            []
+        )
+        generate_makefile_item(out,
+            # per-frame cost of a busy frame's worth of draw calls, batched vs one FFI call each
+            "bench-batching",
+            ["headless"],
+            [
+                f"BEANS_BUILD_DIR={HEADLESS_BUILD_DIR} dart run benchmark{path.sep}draw_batching.dart"
+            ]
+        )
+    generate_makefile_item(out,
         "cloc-by-file",
         [],
         [
             f"cloc . --exclude-list={CLOC_EXCLUDE_LIST_PATH} --by-file"
         ]
-    ) + out
+    )
+
+    for target, dependencies, commands in lib_items + headless_items:
+        generate_makefile_item(out, target, dependencies, commands)
+
+    for generated_file in generated_files:
+        generate_makefile_item(out, generated_file, ["|", "codegen"], [])
 
-    return out
\ No newline at end of file
+    out.write(f"-include {' '.join(depfiles)}\n")
@@ -0,0 +1,207 @@
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field, asdict
+from typing import ContextManager, Iterator, Optional
+
+# --profile & --metrics-json: where a run's time & memory go - per phase, per backend & per .gen
+# file - so a slow CI build can be pinned on whichever file or backend got slower. Everything's
+# measured wherever it actually runs, so it works the same with -j - the per-file & per-backend
+# numbers are then summed across the worker processes, but the phases are only ever this process's,
+# so their CPU time leaves the workers' out.
+
+@dataclass(slots = True)
+class Measurement:
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    # the most allocated at once over what was allocated at the start, if memory's being traced
+    peak_bytes: int = 0
+
+    def add(self, other: "Measurement"):
+        self.wall_seconds += other.wall_seconds
+        self.cpu_seconds += other.cpu_seconds
+        self.peak_bytes = max(self.peak_bytes, other.peak_bytes)
+
+# The highest absolute peak seen so far by each measurement in progress in this process, since
+# starting a nested one resets tracemalloc's peak out from under the outer ones.
+_open: list[list[int]] = []
+
+# Tracing memory slows everything down a lot, but there's no other way to get allocation peaks -
+# so it's only on when something's actually going to look at them.
+class Profiler:
+    def __init__(self, trace_memory: bool):
+        self.trace_memory = trace_memory
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def measure(self, into: Measurement) -> Iterator[None]:
+        base = 0
+        if self.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            for seen in _open:
+                seen[0] = max(seen[0], peak)
+            tracemalloc.reset_peak()
+            base = current
+            _open.append([current])
+
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            into.wall_seconds += time.perf_counter() - wall
+            into.cpu_seconds += time.process_time() - cpu
+            if self.trace_memory:
+                seen = _open.pop()
+                peak = max(seen[0], tracemalloc.get_traced_memory()[1])
+                into.peak_bytes = max(into.peak_bytes, peak - base)
+                for outer in _open:
+                    outer[0] = max(outer[0], peak)
+
+# one output from main.output_jobs()
+@dataclass(slots = True)
+class JobMetrics:
+    output_path: str
+    backend: str
+    # for outputs that only cover one .gen file
+    gen_file: Optional[str]
+    render: Measurement
+    # flushing, comparing with what's there already & swapping it in - the rendering streams straight to disk
+    write: Measurement
+    emitted_bytes: int
+
+@dataclass(slots = True)
+class FileMetrics:
+    # came out of the parse cache, so wasn't parsed (or validated) at all
+    cached: bool = False
+    parse: Measurement = field(default_factory = Measurement)
+    validate: Measurement = field(default_factory = Measurement)
+    # the outputs for just this file - in unsharded mode, bin/dart_codegen.dart & native/c_codegen.h
+    # cover every file, so they only count towards their backend
+    render: Measurement = field(default_factory = Measurement)
+    write: Measurement = field(default_factory = Measurement)
+    emitted_bytes: int = 0
+    declarations: int = 0
+    params: int = 0
+
+@dataclass(slots = True)
+class BackendMetrics:
+    outputs: int = 0
+    render: Measurement = field(default_factory = Measurement)
+    write: Measurement = field(default_factory = Measurement)
+    emitted_bytes: int = 0
+
+class RunMetrics:
+    def __init__(self, trace_memory: bool):
+        self.profiler = Profiler(trace_memory)
+        # in the order they ran
+        self.phases: dict[str, Measurement] = {}
+        self.backends: dict[str, BackendMetrics] = {}
+        self.files: dict[str, FileMetrics] = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        with self.profiler.measure(self.phases.setdefault(name, Measurement())):
+            yield
+
+    # they run one after the other, so this is the whole run
+    def total(self) -> Measurement:
+        out = Measurement()
+        for phase in self.phases.values():
+            out.add(phase)
+        return out
+
+    def file(self, fname: str) -> FileMetrics:
+        return self.files.setdefault(fname, FileMetrics())
+
+    def add_job(self, job: JobMetrics):
+        backend = self.backends.setdefault(job.backend, BackendMetrics())
+        backend.outputs += 1
+        backend.render.add(job.render)
+        backend.write.add(job.write)
+        backend.emitted_bytes += job.emitted_bytes
+
+        if job.gen_file is not None:
+            file = self.file(job.gen_file)
+            file.render.add(job.render)
+            file.write.add(job.write)
+            file.emitted_bytes += job.emitted_bytes
+
+    def writes(self) -> Measurement:
+        out = Measurement()
+        for backend in self.backends.values():
+            out.add(backend.write)
+        return out
+
+    def to_json(self) -> dict:
+        return {
+            "phases": {name: asdict(phase) for name, phase in self.phases.items()},
+            "backends": {name: asdict(backend) for name, backend in self.backends.items()},
+            "files": {name: asdict(file) for name, file in self.files.items()},
+            "totals": {
+                **asdict(self.total()),
+                "files": len(self.files),
+                "cached_files": sum(file.cached for file in self.files.values()),
+                "declarations": sum(file.declarations for file in self.files.values()),
+                "params": sum(file.params for file in self.files.values()),
+                "outputs": sum(backend.outputs for backend in self.backends.values()),
+                "emitted_bytes": sum(backend.emitted_bytes for backend in self.backends.values()),
+            },
+        }
+
+    def write_json(self, fname: str):
+        with open(fname, "wt") as fh:
+            json.dump(self.to_json(), fh, indent = 4)
+            fh.write("\n")
+
+    def print_report(self, slowest: int = 10):
+        def row(name: str, measurement: Measurement, extra: str = ""):
+            print(
+                f"{name:<32}{measurement.wall_seconds * 1000:>10.1f}{measurement.cpu_seconds * 1000:>10.1f}" +
+                f"{measurement.peak_bytes / 1e6:>10.2f}{extra}"
+            )
+
+        parse, validate = Measurement(), Measurement()
+        for file in self.files.values():
+            parse.add(file.parse)
+            validate.add(file.validate)
+
+        print(f"{'phase':<32}{'wall ms':>10}{'cpu ms':>10}{'peak MB':>10}{'out KB':>10}")
+        for name, phase in self.phases.items():
+            row(name, phase)
+            # the breakdowns - summed across workers with -j
+            if name == "parse":
+                row("  Parser.parse", parse)
+                row("  validate_all_annotations", validate)
+            elif name == "render":
+                for backend_name, backend in self.backends.items():
+                    row(f"  {backend_name}", backend.render, f"{backend.emitted_bytes / 1e3:>10.1f}")
+                row("  file writes", self.writes())
+        row("total", self.total())
+
+        totals = self.to_json()["totals"]
+        print(
+            f"{totals['files']} .gen files ({totals['cached_files']} from the parse cache), {totals['declarations']} declarations, " +
+            f"{totals['params']} params, {totals['emitted_bytes'] / 1e3:.1f}KB across {totals['outputs']} outputs"
+        )
+
+        by_time = sorted(
+            self.files.items(),
+            key = lambda item: item[1].parse.wall_seconds + item[1].validate.wall_seconds + item[1].render.wall_seconds + item[1].write.wall_seconds,
+            reverse = True
+        )
+        print()
+        print("slowest .gen files:")
+        print(f"{'file':<40}{'parse ms':>10}{'valid. ms':>10}{'render ms':>10}{'write ms':>10}{'out KB':>10}{'decls':>8}{'params':>8}")
+        for name, file in by_time[:slowest]:
+            parse_ms = "cached" if file.cached else f"{file.parse.wall_seconds * 1000:.1f}"
+            validate_ms = "cached" if file.cached else f"{file.validate.wall_seconds * 1000:.1f}"
+            print(
+                f"{name:<40}{parse_ms:>10}{validate_ms:>10}{file.render.wall_seconds * 1000:>10.1f}{file.write.wall_seconds * 1000:>10.1f}" +
+                f"{file.emitted_bytes / 1e3:>10.1f}{file.declarations:>8}{file.params:>8}"
+            )
+
+# whatever's inside this is one of metrics' phases, if there are any metrics being kept
+def measured_phase(metrics: Optional[RunMetrics], name: str) -> ContextManager[None]:
+    return nullcontext() if metrics is None else metrics.phase(name)
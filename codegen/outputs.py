@@ -0,0 +1,39 @@
+import os
+import os.path as path
+import filecmp
+from contextlib import contextmanager
+from typing import Iterator, TextIO
+
+# Everything written to the handle goes to a temp file next to fname, which only replaces fname
+# if the contents are different. make decides what to rebuild from mtimes, so rewriting identical
+# bytes would make every library downstream look stale.
+@contextmanager
+def open_output(fname: str) -> Iterator[TextIO]:
+    dirname = path.dirname(fname)
+    if dirname != "":
+        os.makedirs(dirname, exist_ok = True)
+
+    # pid in the name so parallel runs can't trample each other's temp files
+    tmp_fname = f"{fname}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_fname, "wt", encoding = "utf-8", newline = "", buffering = 1 << 16) as fh:
+            yield fh
+
+        if path.exists(fname) and filecmp.cmp(tmp_fname, fname, shallow = False):
+            os.remove(tmp_fname)
+        else:
+            os.replace(tmp_fname, fname)
+    finally:
+        if path.exists(tmp_fname):
+            os.remove(tmp_fname)
+
+# Delete any file in directory which isn't in keep, eg the shard for a .gen file that no longer exists
+def prune_outputs(directory: str, keep: list[str]):
+    if not path.isdir(directory): return
+
+    keep_paths = set(map(path.normpath, keep))
+    for root, _, files in os.walk(directory):
+        for file in files:
+            fname = path.join(root, file)
+            if path.normpath(fname) not in keep_paths:
+                os.remove(fname)
@@ -1,207 +1,320 @@
 from codegen_types import *
 from annotations import *
+from lexer import *
 from termcolor import colored
+from typing import Optional
 import sys
 
-def strip_all(strings: list[str]) -> list[str]:
-    return list(map(
-        lambda string: string.strip(),
-        strings
-    ))
-
+# Recursive descent over the token stream from lexer.tokenize(). Each parse_* function
+# starts on the first token of the thing it parses, and leaves self.current on the first
+# token after it - nothing ever gets looked at twice.
 class Parser:
     def __init__(self, fname: str):
         self.fname = fname
+        # everything warn() has printed, so the parse cache can print it again when this file's
+        # parsed file comes out of the cache instead
+        self.warnings: list[str] = []
 
     def parse(self) -> ParsedGenFile:
-        contents: list[str]
+        out = self.parse_declarations()
+        self.validate(out)
+        return out
+
+    # parse() is these two - they're only separate so they can be timed separately
+    def parse_declarations(self) -> ParsedGenFile:
         with open(self.fname, "rt") as fh:
-            contents = fh.readlines()
-        
-        out = ParsedGenFile(
-            self.fname,
-            [], [], [], []
-        )
+            self.source = fh.read()
 
-        skip = 0
-        annotations: list[CodegenAnnotation] = []
-        for i, line in enumerate(contents):
-            if skip:
-                skip -= 1
-                continue
+        self.tokens = tokenize(self.source)
+        self.current: Token = self.next_token()
 
-            if line.startswith("//"):
-                continue
+        # the model's immutable, so everything gets collected up here first
+        functions: list[CodegenFunction] = []
+        enums: list[CodegenEnum] = []
+        classes: list[CodegenClass] = []
+        file_annotations: list[CodegenAnnotation] = []
 
-            if line.isspace():
+        annotations: list[CodegenAnnotation] = []
+        while self.current.kind != EOF:
+            token = self.current
+
+            if token.kind == BLANK_LINE:
                 # if we've had any annotations & they're followed by whitespace,
                 # they apply to the whole file.
-                out.annotations += annotations
+                file_annotations += annotations
                 annotations = []
+                self.advance()
 
-                continue
-            
-            
-            if line.startswith("enum"):
-                enum = self.get_part(contents, i)
-                out.enums.append(
-                    self.parse_enum(
-                        enum,
-                        annotations
-                    )
+            elif token.kind in (NEWLINE, COMMENT):
+                self.advance()
+
+            elif self.at(PUNCT, "@"):
+                annotations.append(
+                    self.parse_annotation()
+                )
+
+            elif self.at(PUNCT, ";"):
+                self.stray_semicolon()
+
+            elif self.at(IDENT, "enum"):
+                enums.append(
+                    self.parse_enum(annotations)
                 )
                 annotations = []
-                skip = len(enum) - 1
-
-            elif line.startswith("class"):
-                class_ = self.get_part(contents, i)
-                out.classes.append(
-                    self.parse_class(
-                        class_,
-                        annotations
-                    )
+
+            elif self.at(IDENT, "class"):
+                classes.append(
+                    self.parse_class(annotations)
                 )
                 annotations = []
-                skip = len(class_) - 1
 
-            elif line.startswith("@"):
-                annotations.append(
-                    self.parse_annotation(line)
+            elif token.kind == IDENT:
+                functions.append(
+                    self.parse_function(annotations)
                 )
-            
+                annotations = []
+
             else:
-                out.functions.append(
-                    self.parse_function(
-                        line,
-                        annotations
-                    )
-                )
-        
-        annotation_warnings = out.validate_all_annotations()
+                self.error(f"Unexpected {token}", token)
+
+        return ParsedGenFile(
+            self.fname,
+            tuple(functions),
+            tuple(enums),
+            tuple(classes),
+            Annotations.of(file_annotations)
+        )
+
+    def validate(self, parsed: ParsedGenFile):
+        annotation_warnings = parsed.validate_all_annotations()
         if annotation_warnings != "":
             self.warn(annotation_warnings)
-        
-        return out
-    
 
-    # get lines between i and "}"
-    def get_part(self, contents: list[str], i: int):
+
+    #* token stream helpers
+
+    def next_token(self) -> Token:
         try:
-            close_bracket_idx = contents[i:].index("}\n")
-        except ValueError:
-            # could be one at the end of the file with no newline after
-            try:
-                close_bracket_idx = contents[i:].index('}')
-            except ValueError:
-                self.error("Closing bracket not found", contents[i], '{')
-                
-        return contents[i:
-            i + close_bracket_idx + 1
-        ]
-    
-
-    # "class SomeClass {\n" => "SomeClass"
-    def get_structure_name(self, structure_type: str, structure_decl: str) -> str:
-        return structure_decl[len(structure_type) + 1:][:-2].strip()
-    
-    # decl should be something like "int *varName"
-    def to_codegen_type(self, decl: str) -> tuple[CodegenType, str]:
-        is_pointer = "*" in decl
-        if is_pointer:
-            typename, name = strip_all(decl.split("*"))
-        else:
-            typename, name = decl.split(" ")
+            return next(self.tokens)
+        except LexError as e:
+            self.error(str(e), Token(EOF, "", e.line, e.column, 0, 0))
 
-        return CodegenType(
-            typename,
-            is_pointer
-        ), name
-    
-    def error(self, msg: str, line: str = '', error: str = '', prefix: str = 'Error'):
-        self.warn(msg, line, error, prefix)
-        sys.exit()
-    
-    # if this is passed dodgy arguments then things will get v messy
-    def warn(self, msg: str, line: str = '', error: str = '', prefix: str = 'Warning'):
-        print(f'In file: {self.fname}')
-        print(colored(f"{prefix}: {msg}", 'red'))
-        if line != '':
-            line = line.strip()
-            if error != '':
-                error_pos = line.index(error)
-                before_error = line[:error_pos]
-                after_error = line[error_pos + len(error):]
-                print(before_error, end='')
-                print(colored(error, 'red'), end='')
-                print(after_error)
-                print(' ' * len(before_error), end='')
-                print('^')
-            else:
-                print(colored(line, 'red'))
-                print(' ' * len(line), end='')
-                print('^')
+    def advance(self) -> Token:
+        token = self.current
+        if token.kind != EOF:
+            self.current = self.next_token()
+        return token
+
+    def at(self, kind: str, text: Optional[str] = None) -> bool:
+        return self.current.kind == kind and (text is None or self.current.text == text)
+
+    def expect(self, kind: str, text: Optional[str] = None) -> Token:
+        if not self.at(kind, text):
+            expected = f"'{text}'" if text is not None else kind
+            self.error(f"Expected {expected}, but got {self.current}", self.current)
+        return self.advance()
 
-    #* ALL PARSE FUNCTIONS NEED TO MAKE SURE THEY CAN ACCEPT LINES WITH A COMMENT AT THE END:
+    def stray_semicolon(self):
+        self.warn('Semicolons are not required in codegen any more', self.current)
+        self.advance()
+
+    #* ALL DECLARATIONS CAN END WITH A COMMENT:
     # void some_code() // this code does something!!
+    # so this eats an optional semicolon & comment, then the newline.
+    def end_of_line(self):
+        if self.at(PUNCT, ";"):
+            self.stray_semicolon()
+        if self.at(COMMENT):
+            self.advance()
+        if self.current.kind in (NEWLINE, BLANK_LINE):
+            self.advance()
+        elif self.current.kind != EOF:
+            self.error(f"Expected the end of the line, but got {self.current}", self.current)
+
+    # skips newlines & comments, but stops on blank lines
+    def skip_lines(self):
+        while self.current.kind in (NEWLINE, COMMENT):
+            self.advance()
+
 
-    def normalize(self, line: str, ensure_newline: bool = False) -> str:
-        if '//' in line:
-            line = line.split('//')[0]
-            
+    #* error reporting
+
+    def error(self, msg: str, token: Optional[Token] = None, prefix: str = 'Error'):
+        self.warn(msg, token, prefix)
+        sys.exit()
+
+    def warn(self, msg: str, token: Optional[Token] = None, prefix: str = 'Warning'):
+        text = self.format_warning(msg, token, prefix)
+        print(text)
+        self.warnings.append(text)
+
+    def format_warning(self, msg: str, token: Optional[Token], prefix: str) -> str:
+        out: list[str] = []
+        if token is not None:
+            out.append(f'In file: {self.fname}:{token.line}:{token.column}')
+        else:
+            out.append(f'In file: {self.fname}')
+        out.append(colored(f"{prefix}: {msg}", 'red'))
+        if token is None: return "\n".join(out)
+
+        lines = self.source.split("\n")
+        if token.line > len(lines): return "\n".join(out)
+        line = lines[token.line - 1]
+        indent = len(line) - len(line.lstrip())
         line = line.strip()
-        
-        if line.endswith(';'):
-            self.warn('Semicolons are not required in codegen any more', line, ';')
-            line = line[:-1]
+        column = token.column - 1 - indent
+        if line == '': return "\n".join(out)
+
+        if token.kind in (IDENT, NUMBER, PUNCT, COMMENT):
+            before_error = line[:column]
+            out.append(before_error + colored(token.text, 'red') + line[column + len(token.text):])
+            out.append(' ' * len(before_error) + '^')
+        else:
+            out.append(colored(line, 'red'))
+            out.append(' ' * len(line) + '^')
+        return "\n".join(out)
 
-        if ensure_newline:
-            line += '\n'
-        
-        return line
 
-    def parse_annotation(self, annotation: str) -> CodegenAnnotation:
+    #* grammar
 
-        annotation = self.normalize(annotation, True)
+    # @Name(arg, arg)
+    def parse_annotation(self) -> CodegenAnnotation:
+        self.expect(PUNCT, "@")
+        name = self.expect(IDENT).text
 
-        if not annotation.endswith(')\n'):
-            self.error('Annotations must end with parentheses, even if they have no arguments', annotation)
+        if not self.at(PUNCT, "("):
+            self.error('Annotations must end with parentheses, even if they have no arguments', self.current)
+        self.advance()
 
-        name, args_raw = annotation[1:].split("(")
         args: list[str] = []
-        if not args_raw == ")\n":
-            args = strip_all(
-                args_raw[:-2].split(",")
-            )
+        arg_start: Optional[Token] = None
+        arg_end: Optional[Token] = None
+        while not self.at(PUNCT, ")"):
+            if self.current.kind in (NEWLINE, BLANK_LINE, EOF):
+                self.error("Expected ')' to close the annotation's arguments", self.current)
+
+            if self.at(PUNCT, ","):
+                if arg_start is None:
+                    self.error("Empty annotation argument", self.current)
+                args.append(self.source[arg_start.start:arg_end.end])
+                arg_start = None
+            else:
+                if arg_start is None:
+                    arg_start = self.current
+                arg_end = self.current
+            self.advance()
+
+        if arg_start is not None:
+            args.append(self.source[arg_start.start:arg_end.end])
+        elif len(args) > 0:
+            self.error("Empty annotation argument", self.current)
+        self.advance()
+
+        self.end_of_line()
+
         return CodegenAnnotation(
             name,
-            args
+            tuple(args)
         )
 
-    
-    def parse_function(self, function: str, annotations: list[CodegenAnnotation]) -> CodegenFunction:
-        function = self.normalize(function, True)
+    # decimal or hex, eg -1 or 0x100
+    def parse_int(self) -> int:
+        token = self.expect(NUMBER)
+        text = token.text
+        if "." in text:
+            self.error(f"Expected a whole number, but got {text}", token)
+        if text.lstrip("-").lower().startswith("0x"):
+            return int(text, 16)
+        return int(text)
+
+    # int *varName, char* varName, int[count] varName, etc
+    def parse_type_and_name(self) -> tuple[CodegenType, str]:
+        typename = self.expect(IDENT).text
+
+        array_length: Optional[str] = None
+        is_pointer = self.at(PUNCT, "*")
+        if is_pointer:
+            self.advance()
+            if self.at(PUNCT, "*"):
+                self.error("Pointers to pointers aren't supported", self.current)
+        elif self.at(PUNCT, "["):
+            # an array is a pointer, plus whatever says how many there are
+            self.advance()
+            if self.at(NUMBER):
+                length_token = self.current
+                length = self.parse_int()
+                if length <= 0:
+                    self.error("An array has to have at least one element", length_token)
+                array_length = str(length)
+            else:
+                array_length = self.expect(IDENT).text
+            self.expect(PUNCT, "]")
+            is_pointer = True
+            if self.at(PUNCT, "*"):
+                self.error("Arrays of pointers aren't supported", self.current)
+
+        name = self.expect(IDENT).text
+
+        return CodegenType.of(
+            typename,
+            is_pointer,
+            array_length
+        ), name
+
+    # starts on the return type, stops after the newline
+    def parse_function(self, annotations: list[CodegenAnnotation]) -> CodegenFunction:
+        return_type, name = self.parse_type_and_name()
+        return self.parse_function_rest(return_type, name, annotations)
+
+    # starts on the '('
+    def parse_function_rest(self, return_type: CodegenType, name: str, annotations: list[CodegenAnnotation], is_method: bool = False) -> CodegenFunction:
+        self.expect(PUNCT, "(")
 
-        name_and_return_type, params_raw = function.split("(")
+        params: list[CodegenParam] = []
+        if is_method and "Initializer" not in Annotations.of(annotations):
+            # fuckery to put struct_ptr at the _start_ of the params
+            params.append(CodegenParam("struct_ptr", CodegenType.of("void", True)))
+        param_names: set[str] = set()
+
+        if not self.at(PUNCT, ")"):
+            while True:
+                param_token = self.current
+                param_type, param_name = self.parse_type_and_name()
+                if is_method and param_name == "struct_ptr":
+                    self.error("Class methods cannot have a parameter named 'struct_ptr'.", param_token)
+                if param_name in param_names:
+                    self.error(f"Duplicate parameter '{param_name}'", param_token)
+                param_names.add(param_name)
+                params.append(CodegenParam(param_name, param_type))
+
+                if not self.at(PUNCT, ","): break
+                self.advance()
+        self.expect(PUNCT, ")")
+
+        self.end_of_line()
 
-        return_type, name = self.to_codegen_type(name_and_return_type)
-        
-        params: dict[str, CodegenType] = {}
-        if not params_raw == ")\n":
-            for param in params_raw[:-2].split(","):
-                param_type, param_name = self.to_codegen_type(param.strip())
-                params[param_name] = param_type
-        
         return CodegenFunction(
             name,
             return_type,
-            params,
-            annotations
+            tuple(params),
+            Annotations.of(annotations)
         )
 
-    def parse_enum(self, enum: list[str], annotations: list[CodegenAnnotation]) -> CodegenEnum:
-        name = self.get_structure_name("enum", enum[0])
-        contents = enum[1:-1]
-        out = CodegenEnum(name, [], annotations)
+    # "class SomeClass {" => "SomeClass", leaving us on the first line of the body
+    def parse_structure_header(self, structure_type: str) -> str:
+        self.expect(IDENT, structure_type)
+        name = self.expect(IDENT).text
+        self.skip_lines()
+        self.expect(PUNCT, "{")
+        return name
+
+    def parse_structure_footer(self):
+        self.expect(PUNCT, "}")
+        self.end_of_line()
+
+    def parse_enum(self, annotations: list[CodegenAnnotation]) -> CodegenEnum:
+        name = self.parse_structure_header("enum")
+        values: list[CodegenEnumValue] = []
 
         # possible states:
         #   - comment
@@ -210,34 +323,69 @@ class Parser:
         #   - val  // stringify
         #   - val,
         #   - val
+        #   - any of those with = value after the val
         # no annotations
-        for line in strip_all(contents):
-            if line.startswith('//') or line == '':
+        is_flags = "Flags" in Annotations.of(annotations)
+        # like C - a value without an = is one more than the last. In a @Flags() enum it's
+        # the next bit up instead.
+        next_value = 1 if is_flags else 0
+        seen_values: dict[int, str] = {}
+        while not self.at(PUNCT, "}"):
+            if self.current.kind in (NEWLINE, BLANK_LINE, COMMENT):
+                self.advance()
                 continue
-            
-            if '//' in line:
-                val_name, stringify = strip_all(line.split('//'))
-                if "," in val_name:
-                    val_name = val_name[:val_name.find(",")]
-            elif ',' in line:
-                val_name = stringify = line[:line.find(',')]
+
+            if self.at(PUNCT, ";"):
+                self.stray_semicolon()
+                continue
+
+            name_token = self.expect(IDENT)
+            val_name = name_token.text
+            stringify = val_name
+
+            value = next_value
+            if self.at(PUNCT, "="):
+                self.advance()
+                value = self.parse_int()
+
+            if is_flags:
+                if value < 0:
+                    self.error(f"{name}.{val_name} is negative, which doesn't make sense for a @Flags() enum", name_token)
+                if val_name in FLAGS_RESERVED_NAMES:
+                    self.error(f"A @Flags() enum can't have a value called {val_name}", name_token)
+                # the smallest power of 2 that's bigger than value
+                next_value = 1 << value.bit_length()
             else:
-                val_name = stringify = line
-            
-            out.values.append(
+                # the conversion back from an int has to know which one it is
+                if value in seen_values:
+                    self.error(f"{name}.{val_name} has the same value as {name}.{seen_values[value]} ({value})", name_token)
+                next_value = value + 1
+            seen_values.setdefault(value, val_name)
+
+            if self.at(PUNCT, ","):
+                self.advance()
+            if self.at(PUNCT, ";"):
+                self.stray_semicolon()
+            if self.at(COMMENT):
+                stringify = self.advance().text[2:].strip()
+
+            values.append(
                 CodegenEnumValue(
                     val_name,
                     stringify,
+                    value
                 )
             )
 
-        return out
+        self.parse_structure_footer()
+
+        return CodegenEnum(name, tuple(values), Annotations.of(annotations))
 
-    def parse_class(self, class_: list[str], annotations: list[CodegenAnnotation]) -> CodegenClass:
-        name = self.get_structure_name("class", class_[0])
-        contents = class_[1:-1]
+    def parse_class(self, annotations: list[CodegenAnnotation]) -> CodegenClass:
+        name = self.parse_structure_header("class")
 
-        out = CodegenClass(name, [], [], annotations)
+        fields: list[CodegenDataStructureField] = []
+        methods: list[CodegenFunction] = []
 
         # lots of possibilities!!
         #   - whitespace, clear annotations etc etc
@@ -246,54 +394,55 @@ class Parser:
         #   - field
         #   - method
         current_annotations: list[CodegenAnnotation] = []
-        for line in strip_all(contents):
-            if line.startswith('//'):
+        while not self.at(PUNCT, "}"):
+            if self.current.kind in (NEWLINE, COMMENT):
+                self.advance()
                 continue
-                
-            if line == '':
+
+            if self.current.kind == BLANK_LINE:
                 if len(current_annotations) > 0:
                     self.error(
-                        f"Whitespace after annotations in a class - what do these annotations apply to?\n{current_annotations}\n" + 
-                        "To apply annotations to the whole class, place them directly before the class definition."
+                        f"Whitespace after annotations in a class - what do these annotations apply to?\n{current_annotations}\n" +
+                        "To apply annotations to the whole class, place them directly before the class definition.",
+                        self.current
                     )
+                self.advance()
                 continue
-                
-            line = self.normalize(line)
 
+            if self.at(PUNCT, ";"):
+                self.stray_semicolon()
+                continue
 
-            if line.startswith('@'):
+            if self.at(PUNCT, "@"):
                 current_annotations.append(
-                    self.parse_annotation(line)
+                    self.parse_annotation()
                 )
-                # not using elifs off this bc of the semicolon check
                 continue
-            
-            if line.endswith(')'):
+
+            member_type, member_name = self.parse_type_and_name()
+
+            if self.at(PUNCT, "("):
                 # method
-                method = self.parse_function(line, current_annotations)
-                for param in method.params:
-                    if param == "struct_ptr":
-                        self.error("Class methods cannot have a parameter named 'struct_ptr'.", line, 'struct_ptr')
-                if not has_annotation(current_annotations, "Initializer"):
-                    # fuckery to put struct_ptr at the _start_ of method.params
-                    method.params = {"struct_ptr": CodegenType(typename = "void", is_pointer = True), **method.params}
-                out.methods.append(
-                    method
+                methods.append(
+                    self.parse_function_rest(member_type, member_name, current_annotations, is_method = True)
                 )
                 current_annotations = []
             else:
-                self.error("Class fields aren't supported yet, what the fuck do you think i am, a miracle worker?", line)
-                field_type, field_name = self.to_codegen_type(line[:-1])
                 # it's a field. probably.
-                out.fields.append(
+                self.end_of_line()
+                fields.append(
                     CodegenDataStructureField(
-                        field_name,
-                        field_type,
-                        current_annotations
+                        member_name,
+                        member_type,
+                        Annotations.of(current_annotations)
                     )
                 )
                 current_annotations = []
-        
+
+        self.parse_structure_footer()
+
+        out = CodegenClass(name, tuple(fields), tuple(methods), Annotations.of(annotations))
+
         # all that bollocks
         err_msg = out.validate()
         if err_msg is not None:
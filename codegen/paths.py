@@ -1,3 +1,28 @@
 DART_OUTPUT_PATH = "bin/dart_codegen.dart"
 C_OUTPUT_PATH = "native/c_codegen.h"
-CLOC_EXCLUDE_LIST_PATH = ".cloc_exclude_list.txt"
\ No newline at end of file
+CLOC_EXCLUDE_LIST_PATH = ".cloc_exclude_list.txt"
+PARSE_CACHE_PATH = "build/codegen/parse_cache.pickle"
+# hand-written support code for the generated Dart
+DART_RUNTIME_PATH = "bin/CodegenRuntime.dart"
+# hand-written support code for timing the bindings that are profiled - see --profile-ffi & @Profile()
+DART_PROFILER_PATH = "bin/FfiProfiler.dart"
+# generated C built into the libraries - decoders for @Batchable() methods, queues for
+# @DeferFinalizer() classes & timing wrappers for profiled bindings - one per .gen file that has any
+C_SOURCE_DIR = "native/generated"
+# SDL-free stand-ins for some of the libraries, so the generated code can be run without a display
+HEADLESS_STUB_DIR = "native/headless"
+# the Makefile builds each profile (see makefile.BUILD_PROFILES) into its own directory in here,
+# & the libraries that have a headless stub into a headless directory inside that
+BUILD_DIR = "build"
+DEFAULT_BUILD_PROFILE = "debug"
+# unified mode - every .gen file's C is linked into this one library (in the profile's build
+# directory), instead of one library each
+UNIFIED_LIBRARY_NAME = "libbeans"
+UNIFIED_EXPORT_MAP_PATH = f"{C_SOURCE_DIR}/{UNIFIED_LIBRARY_NAME}.map"
+
+# sharded mode - one output per .gen file, plus DART_OUTPUT_PATH & C_OUTPUT_PATH as umbrellas. The
+# hand-written code only ever imports (or includes) its own file's, so without --sharded each one
+# is still there, but just forwards to DART_OUTPUT_PATH or C_OUTPUT_PATH
+DART_SHARD_DIR = "bin/codegen"
+C_SHARD_DIR = "native/codegen"
+C_SHARED_HEADER_PATH = f"{C_SHARD_DIR}/common.h"
@@ -0,0 +1,57 @@
+import io
+import os.path as path
+import sys
+from typing import Callable
+
+import pytest
+
+# the codegen modules import each other by bare name
+CODEGEN_DIR = path.dirname(path.dirname(path.abspath(__file__)))
+REPO_ROOT = path.dirname(CODEGEN_DIR)
+sys.path.insert(0, CODEGEN_DIR)
+
+from emitter import *
+from parse import *
+from typelookup import *
+from lower import *
+
+# a backend function's output as a string - codegen is called with an Emitter first, then args
+def render(codegen: Callable[..., None], *args) -> str:
+    out = io.StringIO()
+    codegen(Emitter(out), *args)
+    return out.getvalue()
+
+CLASS_HEADER = "class Thing {\n    @Initializer()\n    void* InitThing()\n\n"
+
+# .gen source -> the parsed file, via a real file in tmp_path since that's all Parser reads
+@pytest.fixture
+def parse_source(tmp_path) -> Callable[..., ParsedGenFile]:
+    def parse_source(source: str, name: str = "Test.gen") -> ParsedGenFile:
+        fname = tmp_path / name
+        fname.write_text(source)
+        return Parser(str(fname)).parse()
+    return parse_source
+
+# .gen sources (by file name) -> each one lowered, in the same order
+@pytest.fixture
+def lower_sources(parse_source) -> Callable[..., list[LoweredFile]]:
+    def lower_sources(sources: dict[str, str], profile_all: bool = False) -> list[LoweredFile]:
+        files = [parse_source(source, name) for name, source in sources.items()]
+        return lower_all(TypeLookup(files), profile_all)
+    return lower_sources
+
+# the real .gen files in native/, parsed from the repo root like main.py does - so every path
+# in the model is the same as it is for a real run
+@pytest.fixture
+def repo_files(monkeypatch) -> list[ParsedGenFile]:
+    monkeypatch.chdir(REPO_ROOT)
+    from main import gen_files
+    return [Parser(fname).parse() for fname in gen_files()]
+
+# the body of a class (whatever comes after its initializer), lowered on its own
+@pytest.fixture
+def lower_class_body(lower_sources) -> Callable[[str], LoweredClass]:
+    def lower_class_body(body: str) -> LoweredClass:
+        file, = lower_sources({"Thing.gen": CLASS_HEADER + body + "\n}"})
+        return file.classes[0]
+    return lower_class_body
@@ -0,0 +1,27 @@
+import re
+
+import pytest
+
+from lower import *
+
+def test_lengths_are_filled_in(lower_sources):
+    file, = lower_sources({"Test.gen": "void Draw(int[count] xs, double[count] ys, int count)"})
+    func, = file.functions
+    assert [param.name for param in func.arrays] == ["xs", "ys"]
+    assert [(param.name, param.length_of) for param in func.lengths] == [("count", "xs")]
+    assert [param.name for param in func.api_params()] == ["xs", "ys"]
+
+def test_plan(lower_sources):
+    file, = lower_sources({"Test.gen": "void Draw(double[4] xs)"})
+    xs, = file.functions[0].params
+    assert (xs.plan.native_type, xs.plan.api_type) == ("Pointer<Double>", "Float64List")
+    assert xs.length_of is None
+
+@pytest.mark.parametrize("source, message", [
+    ("void Draw(int[n] xs)", "doesn't have a param called n"),
+    ("void Draw(int[n] xs, double n)", "so n has to be an int, but it's double"),
+    ("void Draw(char[n] xs, int n)", "Can't have an array of char"),
+])
+def test_errors(lower_sources, source: str, message: str):
+    with pytest.raises(ValueError, match = re.escape(message)):
+        lower_sources({"Test.gen": source})
@@ -0,0 +1,231 @@
+import ctypes
+import os.path as path
+import re
+import shutil
+import struct
+import subprocess
+
+import pytest
+
+from conftest import REPO_ROOT, CLASS_HEADER, render
+from emitter import *
+from lower import *
+import c
+import dart
+
+needs_gcc = pytest.mark.skipif(shutil.which("gcc") is None, reason = "needs gcc to build the headless stub")
+
+def test_batch_commands(lower_sources):
+    _, file = lower_sources({
+        "Font.gen": "class Font {\n    @Initializer()\n    void* InitFont()\n}",
+        "Thing.gen": CLASS_HEADER +
+            "    @Batchable()\n    void A(int x, double y, bool z)\n" +
+            "    void NotBatched()\n" +
+            "    @Batchable()\n    void B(Font* font, char* text, char* more)\n" +
+            "\n}",
+    })
+    a, b = file.classes[0].batch
+    # declaration order, skipping anything that isn't batchable
+    assert (a.method.func.name, a.opcode, a.slots) == ("A", 0, (SLOT_INT, SLOT_DOUBLE, SLOT_INT))
+    assert (b.method.func.name, b.opcode, b.slots) == ("B", 1, (SLOT_POINTER, SLOT_STRING, SLOT_STRING))
+    # the header, then one slot per arg - the string bytes come after
+    assert a.fixed_size() == 4
+    assert b.fixed_size() == 4
+    assert file.classes[0].batch_symbol() in file.exported_symbols()
+
+@pytest.mark.parametrize("body, message", [
+    ("    @Batchable()\n    int A()", "is @Batchable(), so it can't return anything"),
+    ("    @Batchable()\n    void A(int[n] xs, int n)", "only int, double, bool, enums, char* & class pointers"),
+    ("    @Batchable()\n    @Out()\n    void A(int* x)", "can't be both @Batchable() and @Out()"),
+])
+def test_batch_errors(lower_class_body, body: str, message: str):
+    with pytest.raises(ValueError, match = re.escape(message)):
+        lower_class_body(body)
+
+CANVAS = (
+    "class Font {\n"
+    "    @Initializer()\n"
+    "    void* InitFont()\n"
+    "}\n"
+    "\n"
+    "enum Mode {\n"
+    "    Fill = 2\n"
+    "    Outline\n"
+    "}\n"
+    "\n"
+    "class Canvas {\n"
+    "    @Initializer()\n"
+    "    void* InitCanvas()\n"
+    "\n"
+    "    @Batchable()\n"
+    "    void Text(Font* font, char* text, double x, Mode mode)\n"
+    "}"
+)
+
+def test_dart_batched_call(lower_sources):
+    canvas, = lower_sources({"Canvas.gen": CANVAS})
+    out = render(dart.codegen_file, canvas)
+    expected = [
+        "final $textBytes = CommandBuffer.encode(text);",
+        "final $batch = _batch;",
+        "final $at = $batch.begin(0, 5 + CommandBuffer.stringSlots($textBytes));",
+        "$batch.ints[$at] = font.structPointer.address;",
+        "$batch.ints[$at + 1] = $textBytes.length;",
+        "$batch.doubles[$at + 2] = x;",
+        "$batch.ints[$at + 3] = ModeToInt(mode);",
+        "$batch.putString($at + 4, $textBytes);",
+    ]
+    lines = [line.strip() for line in out.splitlines()]
+    start = lines.index(expected[0])
+    assert lines[start:start + len(expected)] == expected
+    # Font doesn't have a finalizer that could free it before the batch runs
+    assert "$batch.retain(font);" not in out
+
+def test_c_batch_decoder(lower_sources):
+    canvas, = lower_sources({"Canvas.gen": CANVAS})
+    out = render(c.codegen_source, canvas)
+    assert "void Canvas_RunBatch(void* struct_ptr, int64_t* commands, int length) {" in out
+    assert "case 0: {" in out
+    assert "char* string1 = (char*)(args + 4);" in out
+    assert "Text(struct_ptr, (void*)(intptr_t)args[0], string1, slot_double(args[2]), (int)args[3]);" in out
+    assert "at += (int)(header >> 32);" in out
+
+# The generated Dart encodes @Batchable() calls into a CommandBuffer (bin/CodegenRuntime.dart), &
+# the generated C decodes them & makes the real calls. This encodes them the same way here, runs
+# them through the decoder generated for RenderWindow.gen against the headless stub, & checks the
+# stub saw exactly what it sees when the same calls are made directly.
+
+# CommandBuffer.begin, & each arg's slot like dart.batch_slot_value
+def encode(commands: list[tuple[BatchCommand, tuple]]) -> list[int]:
+    out: list[int] = []
+    for command, args in commands:
+        fixed: list[int] = []
+        strings: list[bytes] = []
+        for slot, arg in zip(command.slots, args):
+            if slot == SLOT_DOUBLE:
+                fixed.append(struct.unpack("<q", struct.pack("<d", arg))[0])
+            elif slot == SLOT_STRING:
+                encoded = arg.encode("utf-8")
+                strings.append(encoded)
+                fixed.append(len(encoded))
+            else:
+                fixed.append(int(arg))
+
+        # CommandBuffer.putString - nul-terminated & padded to a whole slot
+        string_bytes = b"".join(encoded + b"\0" * (((len(encoded) + 8) & ~7) - len(encoded)) for encoded in strings)
+        string_slots = list(struct.unpack(f"<{len(string_bytes) // 8}q", string_bytes))
+
+        size = command.fixed_size() + len(string_slots)
+        out += [command.opcode | (size << 32)] + fixed + string_slots
+    return out
+
+@pytest.fixture
+def render_window(repo_files, tmp_path):
+    lowered = lower_all(TypeLookup(repo_files))
+    file = next(file for file in lowered if file.file.id() == "RenderWindow")
+
+    # everything the stub & the decoder need, generated fresh rather than whatever's on disk
+    def write(relative: str, codegen, *args) -> str:
+        fname = tmp_path / relative
+        fname.parent.mkdir(parents = True, exist_ok = True)
+        fname.write_text(render(codegen, *args))
+        return str(fname)
+
+    write("native/c_codegen.h", c.codegen, lowered)
+    write(file.file.c_shard_path(), c.codegen_forwarder)
+    decoder = write(file.file.c_source_path(), c.codegen_source, file)
+
+    library = str(tmp_path / "libRenderWindow.so")
+    subprocess.run(
+        ["gcc", "-shared", "-fPIC", "-I", str(tmp_path), "-o", library, path.join(REPO_ROOT, "native", "headless", "RenderWindowStub.c"), decoder],
+        check = True
+    )
+    lib = ctypes.CDLL(library)
+    lib.InitRenderWindow.restype = ctypes.c_void_p
+    lib.InitRenderWindow.argtypes = [ctypes.c_char_p]
+    lib.RenderWindow_RunBatch.argtypes = [ctypes.c_void_p, ctypes.POINTER(ctypes.c_int64), ctypes.c_int]
+    lib.StubCallCount.restype = ctypes.c_int64
+    lib.StubChecksum.restype = ctypes.c_int64
+    lib.DrawText.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_char_p] + [ctypes.c_int] * 6
+    lib.DrawImage.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_int, ctypes.c_int, ctypes.c_double]
+    for name in ("SetColour", "DrawLine", "DrawRect", "FillRect"):
+        getattr(lib, name).argtypes = [ctypes.c_void_p] + [ctypes.c_int] * 4
+    lib.DrawPoint.argtypes = [ctypes.c_void_p, ctypes.c_int, ctypes.c_int]
+
+    rw = lib.InitRenderWindow(b"test")
+    yield lib, rw, {command.method.func.name: command for command in file.classes[0].batch}
+    lib.DestroyRenderWindow(ctypes.c_void_p(rw))
+
+# (method, args) - the font & image are never looked at, so any address will do
+CALLS = [
+    ("SetColour", (255, 0, 128, 255)),
+    ("DrawPoint", (3, -4)),
+    ("DrawLine", (1, 2, 3, 4)),
+    # 7 bytes, so exactly one slot with the nul
+    ("DrawText", (0x1000, "hello w", 10, 20, 1, 2, 3, 4)),
+    # 8 bytes, so the nul spills into a second slot
+    ("DrawText", (0x2000, "8 bytes!", -1, -2, 5, 6, 7, 8)),
+    ("DrawText", (0x3000, "", 0, 0, 0, 0, 0, 0)),
+    ("DrawImage", (0x4000, 7, 8, 1.5)),
+    ("FillRect", (0, 0, 1920, 1080)),
+    ("DrawRect", (5, 6, 7, 8)),
+    # after the variable-length ones, so a wrong size would throw everything after it off
+    ("DrawText", (0x5000, "ünïcödé", 9, 9, 9, 9, 9, 9)),
+]
+
+def direct_call(lib, rw, name: str, args: tuple):
+    if name == "DrawText":
+        args = (args[0], args[1].encode("utf-8")) + args[2:]
+    getattr(lib, name)(ctypes.c_void_p(rw), *args)
+
+def run_batch(lib, rw, words: list[int]):
+    buffer = (ctypes.c_int64 * len(words))(*words)
+    lib.RenderWindow_RunBatch(ctypes.c_void_p(rw), buffer, len(words))
+
+@needs_gcc
+def test_batch_matches_direct_calls(render_window):
+    lib, rw, commands = render_window
+
+    lib.StubReset()
+    for name, args in CALLS:
+        direct_call(lib, rw, name, args)
+    expected = (lib.StubCallCount(), lib.StubChecksum())
+
+    lib.StubReset()
+    run_batch(lib, rw, encode([(commands[name], args) for name, args in CALLS]))
+    assert (lib.StubCallCount(), lib.StubChecksum()) == expected
+    assert expected[0] == len(CALLS)
+
+@needs_gcc
+def test_opcodes_are_declaration_order(render_window):
+    _, _, commands = render_window
+    assert list(commands) == ["SetColour", "DrawPoint", "DrawLine", "DrawRect", "FillRect", "DrawText", "DrawImage"]
+    assert [command.opcode for command in commands.values()] == list(range(len(commands)))
+    assert commands["DrawText"].slots == (SLOT_POINTER, SLOT_STRING) + (SLOT_INT,) * 6
+    assert commands["DrawImage"].slots == (SLOT_POINTER, SLOT_INT, SLOT_INT, SLOT_DOUBLE)
+
+@needs_gcc
+@pytest.mark.parametrize("name, args, other_args", [
+    # swapping two args has to change what the stub sees, or the comparison above proves nothing
+    ("DrawLine", (1, 2, 3, 4), (2, 1, 3, 4)),
+    ("DrawText", (0x1000, "ab", 1, 2, 3, 4, 5, 6), (0x1000, "ba", 1, 2, 3, 4, 5, 6)),
+    ("DrawImage", (0x4000, 1, 2, 0.5), (0x4001, 1, 2, 0.5)),
+])
+def test_the_stub_sees_every_arg(render_window, name: str, args: tuple, other_args: tuple):
+    lib, rw, commands = render_window
+    checksums = []
+    for each in (args, other_args):
+        lib.StubReset()
+        run_batch(lib, rw, encode([(commands[name], each)]))
+        checksums.append(lib.StubChecksum())
+    assert checksums[0] != checksums[1]
+
+@needs_gcc
+def test_string_slots(render_window):
+    _, _, commands = render_window
+    draw_text = commands["DrawText"]
+    words = encode([(draw_text, (0x1000, "8 bytes!", 1, 2, 3, 4, 5, 6))])
+    # header, 8 fixed slots, then 2 for the string & its nul
+    assert words[0] == draw_text.opcode | (11 << 32)
+    assert words[1:3] == [0x1000, 8]
+    assert struct.pack("<2q", *words[9:]) == b"8 bytes!" + b"\0" * 8
@@ -0,0 +1,81 @@
+import pytest
+
+import cache
+from cache import *
+
+@pytest.fixture
+def gen_file(tmp_path):
+    fname = tmp_path / "Test.gen"
+    # the semicolon's so there's a warning to cache
+    fname.write_text("void A();\n")
+    return str(fname)
+
+@pytest.fixture
+def cache_path(tmp_path) -> str:
+    return str(tmp_path / "cache" / "parse.pickle")
+
+# a cache loaded from disk again, like the next run would
+def reload(cache_path: str) -> ParseCache:
+    return ParseCache(cache_path)
+
+def first_run(cache_path: str, *fnames: str):
+    parse_cache = ParseCache(cache_path)
+    for fname in fnames:
+        parse_cache.parse(fname)
+    parse_cache.save()
+
+# so it's obvious when something's parsed rather than coming from the cache
+@pytest.fixture
+def parsed(monkeypatch) -> list[str]:
+    out = []
+    def counted(fname: str):
+        out.append(fname)
+        return parse_file(fname)
+    monkeypatch.setattr(cache, "parse_file", counted)
+    return out
+
+def test_hit_when_unchanged(gen_file, cache_path, parsed, capsys):
+    first_run(cache_path, gen_file)
+    first = capsys.readouterr().out
+    assert "Semicolons are not required" in first
+
+    file = reload(cache_path).parse(gen_file)
+    assert parsed == [gen_file]
+    assert [func.name for func in file.functions] == ["A"]
+    # the warning's printed again, even though nothing was parsed
+    assert capsys.readouterr().out == first
+
+def test_miss_when_changed(gen_file, cache_path, parsed, capsys):
+    first_run(cache_path, gen_file)
+    capsys.readouterr()
+    with open(gen_file, "w") as fh:
+        fh.write("void B()\n")
+
+    file = reload(cache_path).parse(gen_file)
+    assert parsed == [gen_file, gen_file]
+    assert [func.name for func in file.functions] == ["B"]
+    # & the old warning isn't printed for the new contents
+    assert "Semicolons are not required" not in capsys.readouterr().out
+
+def test_new_codegen_version_drops_everything(gen_file, cache_path, parsed, monkeypatch):
+    first_run(cache_path, gen_file)
+    monkeypatch.setattr(cache, "codegen_version", lambda: "something else")
+
+    parse_cache = reload(cache_path)
+    assert parse_cache.entries == {}
+    parse_cache.parse(gen_file)
+    assert parsed == [gen_file, gen_file]
+
+def test_forget_drops_a_deleted_file(gen_file, cache_path, tmp_path):
+    other = tmp_path / "Other.gen"
+    other.write_text("void B()\n")
+    parse_cache = ParseCache(cache_path)
+    parse_cache.parse(gen_file)
+    parse_cache.parse(str(other))
+    parse_cache.save()
+
+    # the same cache on the next --watch pass, after Other.gen's been deleted
+    parse_cache.forget(str(other))
+    parse_cache.save()
+    assert list(parse_cache.entries) == [gen_file]
+    assert list(reload(cache_path).entries) == [gen_file]
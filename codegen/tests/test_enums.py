@@ -0,0 +1,82 @@
+import pytest
+
+from conftest import render
+import c
+import dart
+
+def values(enum) -> list[tuple[str, int]]:
+    return [(value.name, value.value) for value in enum.values]
+
+def test_implicit_values_follow_on_like_c(parse_source):
+    enum, = parse_source("enum E {\n    A\n    B = 10\n    C\n    D = -3\n    F\n}").enums
+    assert values(enum) == [("A", 0), ("B", 10), ("C", 11), ("D", -3), ("F", -2)]
+    assert not enum.is_sequential()
+
+def test_hex_values_and_stringify(parse_source):
+    enum, = parse_source("enum E {\n    A = 0x100, // first one\n    B\n}").enums
+    assert values(enum) == [("A", 0x100), ("B", 0x101)]
+    assert [value.stringify_as for value in enum.values] == ["first one", "B"]
+
+def test_duplicate_values_are_an_error(parse_source, capsys):
+    with pytest.raises(SystemExit):
+        parse_source("enum E {\n    A = 1\n    B = 0\n    C\n}")
+    assert "E.C has the same value as E.A (1)" in capsys.readouterr().out
+
+def test_flags_values_are_the_next_bit_up(parse_source):
+    enum, = parse_source("@Flags()\nenum F {\n    None = 0\n    A\n    B\n    AB = 3\n    C\n    D = 0x10\n    E\n}").enums
+    assert enum.is_flags()
+    assert values(enum) == [("None", 0), ("A", 1), ("B", 2), ("AB", 3), ("C", 4), ("D", 16), ("E", 32)]
+
+def test_flags_start_at_one(parse_source):
+    enum, = parse_source("@Flags()\nenum F {\n    A\n    B\n}").enums
+    assert values(enum) == [("A", 1), ("B", 2)]
+
+def test_flags_can_share_values(parse_source):
+    # aliases are fine, since a flags value is just the int
+    enum, = parse_source("@Flags()\nenum F {\n    A = 1\n    First = 1\n}").enums
+    assert values(enum) == [("A", 1), ("First", 1)]
+
+@pytest.mark.parametrize("source, message", [
+    ("@Flags()\nenum F {\n    A = -1\n}", "F.A is negative"),
+    ("@Flags()\nenum F {\n    has\n}", "can't have a value called has"),
+    ("enum E {\n    A = 1.5\n}", "Expected a whole number"),
+])
+def test_flags_errors(parse_source, capsys, source: str, message: str):
+    with pytest.raises(SystemExit):
+        parse_source(source)
+    assert message in capsys.readouterr().out
+
+def test_c_uses_the_real_values(parse_source):
+    enum, = parse_source("enum E {\n    A = 5\n    B\n}").enums
+    assert render(c.generate_enum, enum) == "typedef enum {\n    E_A = 5,\n    E_B = 6,\n} E;\n\n"
+
+def test_sequential_enums_use_the_index(parse_source):
+    enum, = parse_source("enum E {\n    A\n    B\n}").enums
+    out = render(dart.enum_conversions, enum)
+    assert "E EFromInt(int val) => E.values[val];" in out
+    assert "int EToInt(E val) => val.index;" in out
+
+def test_dense_enums_use_tables(parse_source):
+    enum, = parse_source("enum E {\n    A = 3\n    B = 5\n}").enums
+    assert dart.is_dense(enum)
+    out = render(dart.enum_conversions, enum)
+    assert "const _EToIntTable = <int>[3, 5];" in out
+    assert "const _EFromIntTable = <E?>[E.A, null, E.B];" in out
+    assert "val >= 3 && val <= 5 ? _EFromIntTable[val - 3] : null" in out
+    assert "ArgumentError.value(val, 'val', 'Not a value of E')" in out
+
+def test_sparse_enums_use_a_map(parse_source):
+    enum, = parse_source("enum E {\n    A = 0\n    B = 0x10000\n}").enums
+    assert not dart.is_dense(enum)
+    out = render(dart.enum_conversions, enum)
+    assert "const _EFromIntTable = <int, E>{0: E.A, 65536: E.B};" in out
+
+def test_flags_enum_class(parse_source):
+    enum, = parse_source("@Flags()\nenum F {\n    A\n    B\n    Both = 3\n}").enums
+    out = render(dart.flags_enum, enum)
+    assert "static const B = F._(2);" in out
+    assert "F FFromInt(int val) => F._(val);" in out
+    # exact matches get their own name, & anything else is the single bits joined up
+    assert "case 3: { return 'Both'; }" in out
+    assert "if (val.has(F.A)) names.add('A');" in out
+    assert "val.has(F.Both)" not in out
@@ -0,0 +1,87 @@
+import re
+
+import pytest
+
+from conftest import render
+from parse import *
+import c
+import dart
+
+FONT = (
+    "class Font {\n"
+    "    char* name\n"
+    "    int size\n"
+    "    double scale\n"
+    "\n"
+    "    @Initializer()\n"
+    "    void* InitFont(char* name, int size)\n"
+    "}"
+)
+
+def test_parse(parse_source):
+    class_, = parse_source(
+        "class Thing {\n"
+        "    @ReadOnly()\n"
+        "    int count // how many\n"
+        "    void* handle\n"
+        "\n"
+        "    @Initializer()\n"
+        "    void* InitThing()\n"
+        "}"
+    ).classes
+    assert [(field.name, field.type_) for field in class_.fields] == [
+        ("count", CodegenType.of("int", False)),
+        ("handle", CodegenType.of("void", True)),
+    ]
+    assert "ReadOnly" in class_.fields[0].annotations
+    assert len(class_.fields[1].annotations) == 0
+
+def test_layout(lower_class_body):
+    class_ = lower_class_body("    char* name\n    int size\n    double scale\n    bool shown\n    int count")
+    assert [(field.name, field.c_type, field.offset) for field in class_.fields] == [
+        ("name", "char*", 0),
+        ("size", "int", 8),
+        ("scale", "double", 16),
+        ("shown", "BOOL", 24),
+        ("count", "int", 28),
+    ]
+    assert class_.struct_size == 32
+    # nobody would own a string that was written in
+    assert class_.fields[0].read_only
+
+@pytest.mark.parametrize("body, message", [
+    ("    int[4] xs", "is an array, which isn't supported for fields"),
+    ("    Thing* other", "is a pointer to a class"),
+    ("    void nothing", "can't be a void"),
+    ("    int Go\n    void Go()", "has the same name as a method"),
+])
+def test_errors(lower_class_body, body: str, message: str):
+    with pytest.raises(ValueError, match = re.escape(message)):
+        lower_class_body(body)
+
+def test_c_struct_is_checked_against_the_dart_layout(lower_sources):
+    out = render(c.codegen, lower_sources({"Font.gen": FONT}))
+    assert "typedef struct {\n    char* name;\n    int size;\n    double scale;\n} Font;" in out
+    assert '_Static_assert(sizeof(Font) == 24, "the generated Dart thinks Font is 24 bytes");' in out
+    assert '_Static_assert(offsetof(Font, scale) == 16, "the generated Dart thinks Font.scale is at 16");' in out
+
+def test_dart_checks_the_layout_once(lower_sources):
+    font, = lower_sources({"Font.gen": FONT})
+    out = render(dart.codegen_file, font)
+    # in the holder's constructor, so it runs when the library's opened
+    assert "_libFont_bindings() {\n        checkStructLayout('Font', sizeOf<_FontStruct>(), 24, [\n" in out
+    assert out.count("checkStructLayout(") == 1
+    assert "StructField('name', 0, (memory) => memory.cast<_FontStruct>().ref.name = nullptr)," in out
+    assert "StructField('size', 8, (memory) => memory.cast<_FontStruct>().ref.size = 0)," in out
+    assert "StructField('scale', 16, (memory) => memory.cast<_FontStruct>().ref.scale = 0.0)," in out
+    # every struct read goes through the holder, so the check's always run first
+    assert "_FontStruct get _struct => _libFont.structFont(structPointer);" in out
+    assert "assert(" not in out
+
+def test_read_only_fields_have_no_setter(lower_sources):
+    font, = lower_sources({"Font.gen": FONT.replace("    int size\n", "    @ReadOnly()\n    int size\n")})
+    out = render(dart.codegen_file, font)
+    assert "int get size" in out
+    assert "set size(" not in out
+    assert "set scale(" in out
+    assert "set name(" not in out
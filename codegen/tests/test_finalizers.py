@@ -0,0 +1,122 @@
+import ctypes
+import re
+import shutil
+import subprocess
+import threading
+
+import pytest
+
+from conftest import render
+from lower import *
+import c
+import dart
+
+def thing(annotation: str = "") -> str:
+    return (
+        f"{annotation}\n"
+        "class Thing {\n"
+        "    @Initializer()\n"
+        "    void* InitThing()\n"
+        "\n"
+        "    @Invalidates()\n"
+        "    void DestroyThing()\n"
+        "}\n"
+    )
+
+def test_invalidates_is_the_finalizer(lower_sources):
+    file, = lower_sources({"Thing.gen": thing()})
+    assert file.classes[0].finalization == FINALIZE_DIRECT
+    out = render(dart.codegen_file, file)
+    assert "static final _finalizer = NativeFinalizer(_libThing.$DestroyThing);" in out
+    assert "_lib.lookup<NativeFinalizerFunction>('DestroyThing')" in out
+    # attached when it's made, & detached when it's freed by hand so it isn't freed twice
+    assert "structPointer = _libThing.InitThing();\n        _attachFinalizer();" in out
+    assert "_finalizer.detach(this);\n        structPointer = nullptr;" in out
+
+def test_no_finalizer(lower_sources):
+    file, = lower_sources({"Thing.gen": thing("@NoFinalizer()")})
+    assert file.classes[0].finalization is None
+    out = render(dart.codegen_file, file)
+    assert "Finalizer" not in out
+    assert "_attachFinalizer" not in out
+    assert "owned" not in out
+    assert "Thing.fromPointer(Pointer<Void> ptr) {" in out
+
+def test_returns_owned(lower_sources):
+    file, = lower_sources({"Thing.gen": thing() + "\n@ReturnsOwned()\nThing* MakeThing()\nThing* FindThing()"})
+    make, find = file.functions
+    assert make.returns.ownership_out == OWNERSHIP_OWNED
+    out = render(dart.codegen_file, file)
+    assert "Thing.fromPointer(_libThing.MakeThing(), owned: true)" in out
+    # the ones that aren't stay someone else's to free
+    assert "Thing.fromPointer(_libThing.FindThing())" in out
+    assert "if (owned) _attachFinalizer();" in out
+
+@pytest.mark.parametrize("source, message", [
+    (thing() + "\n@ReturnsOwned()\nint MakeThing()", "MakeThing is @ReturnsOwned(), but it doesn't return a class"),
+    (thing("@NoFinalizer()") + "\n@ReturnsOwned()\nThing* MakeThing()", "but Thing doesn't have a finalizer to free it with"),
+])
+def test_returns_owned_errors(lower_sources, source: str, message: str):
+    with pytest.raises(ValueError, match = re.escape(message)):
+        lower_sources({"Thing.gen": source})
+
+def test_deferred_finalizer_is_queued(lower_sources):
+    file, = lower_sources({"Thing.gen": thing("@DeferFinalizer()")})
+    class_ = file.classes[0]
+    assert class_.finalization == FINALIZE_DEFERRED
+    assert [class_.defer_symbol(), class_.destroy_deferred_symbol()] == file.exported_symbols()[2:]
+    out = render(dart.codegen_file, file)
+    assert "static final _finalizer = NativeFinalizer(_libThing.$Thing_DeferDestroy);" in out
+    # anything that was queued is freed whenever a new one's made
+    assert "Thing() {\n        destroyDeferred();\n" in out
+
+# what DestroyThing was called with, so the test can see exactly what was freed
+DESTRUCTOR = """
+#include <stdint.h>
+
+static int64_t destroyed = 0;
+static int64_t destroyed_sum = 0;
+
+void DestroyThing(void* struct_ptr) {
+    destroyed++;
+    destroyed_sum += (int64_t)(intptr_t)struct_ptr;
+}
+
+int64_t DestroyedCount(void) { return destroyed; }
+int64_t DestroyedSum(void) { return destroyed_sum; }
+"""
+
+@pytest.mark.skipif(shutil.which("gcc") is None, reason = "needs gcc to build the deferred queue")
+def test_deferred_queue_drains(lower_sources, tmp_path):
+    file, = lower_sources({"Thing.gen": thing("@DeferFinalizer()")})
+    source = tmp_path / "Thing.c"
+    source.write_text(render(c.codegen_source, file))
+    destructor = tmp_path / "Destructor.c"
+    destructor.write_text(DESTRUCTOR)
+    library = str(tmp_path / "libThing.so")
+    subprocess.run(["gcc", "-shared", "-fPIC", "-Wall", "-Werror", "-o", library, str(source), str(destructor)], check = True)
+
+    lib = ctypes.CDLL(library)
+    lib.Thing_DeferDestroy.argtypes = [ctypes.c_void_p]
+    lib.Thing_DestroyDeferred.restype = ctypes.c_int
+    lib.DestroyedCount.restype = ctypes.c_int64
+    lib.DestroyedSum.restype = ctypes.c_int64
+
+    assert lib.Thing_DestroyDeferred() == 0
+
+    # finalizers can run on any thread, so queue up from a few at once
+    def defer(start: int):
+        for address in range(start, start + 1000):
+            lib.Thing_DeferDestroy(ctypes.c_void_p(address * 16))
+    threads = [threading.Thread(target = defer, args = (start,)) for start in (1, 1001, 2001, 3001)]
+    for thread in threads: thread.start()
+    for thread in threads: thread.join()
+    # nothing's actually freed until it's drained
+    assert lib.DestroyedCount() == 0
+
+    assert lib.Thing_DestroyDeferred() == 4000
+    assert lib.DestroyedCount() == 4000
+    assert lib.DestroyedSum() == sum(address * 16 for address in range(1, 4001))
+    # & it's empty again afterwards
+    assert lib.Thing_DestroyDeferred() == 0
+    assert lib.DestroyedCount() == 4000
@@ -0,0 +1,54 @@
+from conftest import render
+import dart
+
+# returned from a function & from one of its own methods, so both go through the cache
+THING = (
+    "@IdentityCache()\n"
+    "class Thing {\n"
+    "    @Initializer()\n"
+    "    void* InitThing()\n"
+    "\n"
+    "    @Invalidates()\n"
+    "    void DestroyThing()\n"
+    "\n"
+    "    Thing* Next()\n"
+    "}\n"
+    "\n"
+    "Thing* FindThing(int id)\n"
+)
+
+def lines(out: str) -> list[str]:
+    return [line.strip() for line in out.splitlines()]
+
+def test_from_pointer_is_a_factory(lower_sources):
+    file, = lower_sources({"Thing.gen": THING})
+    out = render(dart.codegen_file, file)
+    assert "static final _identities = <int, WeakReference<Thing>>{};" in out
+    expected = [
+        "factory Thing.fromPointer(Pointer<Void> ptr, {bool owned = false}) {",
+        "final cached = _identities[ptr.address]?.target;",
+        "if (cached != null) return cached;",
+        "return Thing._fromPointer(ptr, owned).._cacheIdentity();",
+    ]
+    all_lines = lines(out)
+    start = all_lines.index(expected[0])
+    assert all_lines[start:start + len(expected)] == expected
+    # returns go through the factory, & the constructor caches the new one too
+    assert "return Thing.fromPointer(_libThing.FindThing(id));" in out
+    assert "return Thing.fromPointer(_libThing.Next(structPointer));" in out
+    assert "structPointer = _libThing.InitThing();\n        _attachFinalizer();\n        _cacheIdentity();" in out
+
+def test_invalidating_drops_it_from_the_cache(lower_sources):
+    file, = lower_sources({"Thing.gen": THING})
+    all_lines = lines(render(dart.codegen_file, file))
+    destroy = all_lines.index("void DestroyThing() {")
+    body = all_lines[destroy:all_lines.index("}", destroy)]
+    # while structPointer's still the address it's cached under, so the next wrapper for that address is a new one
+    assert body.index("_identities.remove(structPointer.address);") < body.index("structPointer = nullptr;")
+    assert body.index("_identityEvictor.detach(this);") < body.index("structPointer = nullptr;")
+
+def test_without_it_from_pointer_is_a_constructor(lower_sources):
+    file, = lower_sources({"Thing.gen": THING.removeprefix("@IdentityCache()\n")})
+    out = render(dart.codegen_file, file)
+    assert "_identities" not in out
+    assert "Thing.fromPointer(Pointer<Void> ptr, {bool owned = false}) {\n        structPointer = ptr;" in out
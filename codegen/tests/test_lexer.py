@@ -0,0 +1,41 @@
+import pytest
+
+from lexer import *
+
+def kinds(source: str) -> list[str]:
+    return [token.kind for token in tokenize(source)]
+
+def test_tokens_and_positions():
+    tokens = list(tokenize("void  Draw(int x) // draws\n"))
+    assert [(token.kind, token.text) for token in tokens] == [
+        (IDENT, "void"), (IDENT, "Draw"), (PUNCT, "("), (IDENT, "int"), (IDENT, "x"), (PUNCT, ")"),
+        (COMMENT, "// draws"), (NEWLINE, "\n"), (EOF, ""),
+    ]
+    draw = tokens[1]
+    assert (draw.line, draw.column) == (1, 7)
+    assert (draw.start, draw.end) == (6, 10)
+
+def test_blank_lines_are_their_own_token():
+    # a line with only whitespace on it is still blank, but one with a comment isn't
+    assert kinds("a\n\n  \t\n// c\n") == [IDENT, NEWLINE, BLANK_LINE, BLANK_LINE, COMMENT, NEWLINE, EOF]
+
+def test_carriage_returns_are_whitespace():
+    assert kinds("a\r\n\r\nb") == [IDENT, NEWLINE, BLANK_LINE, IDENT, EOF]
+
+@pytest.mark.parametrize("text", ["0", "42", "-1", "0x100", "0XfF", "-0x10", "1.5"])
+def test_numbers(text: str):
+    tokens = list(tokenize(text))
+    assert (tokens[0].kind, tokens[0].text) == (NUMBER, text)
+
+def test_positions_on_later_lines():
+    tokens = [token for token in tokenize("enum E {\n    A = 3\n}") if token.kind != NEWLINE]
+    three = next(token for token in tokens if token.kind == NUMBER)
+    assert (three.line, three.column) == (2, 9)
+    eof = tokens[-1]
+    assert (eof.kind, eof.line) == (EOF, 3)
+
+def test_unexpected_character():
+    with pytest.raises(LexError) as error:
+        list(tokenize("int x\nint $y"))
+    assert (error.value.line, error.value.column) == (2, 5)
+    assert "'$'" in str(error.value)
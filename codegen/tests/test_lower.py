@@ -0,0 +1,52 @@
+import re
+
+import pytest
+
+from conftest import CLASS_HEADER
+from lower import *
+
+SOURCES = {
+    "Thing.gen": CLASS_HEADER + "    void Poke(int times)\n}",
+    "Test.gen": (
+        "enum Mode {\n"
+        "    A\n"
+        "    B\n"
+        "}\n"
+        "\n"
+        "Thing* Find(int id, bool exact, char* name, Mode mode, double* scale)\n"
+        "void Other(int id)"
+    ),
+}
+
+def plans(func: LoweredFunction) -> list[tuple[str, str, str, str, str]]:
+    return [(param.name, param.plan.native_type, param.plan.api_type, param.plan.convert_in, param.plan.ownership_in) for param in func.params]
+
+def test_param_plans(lower_sources):
+    _, file = lower_sources(SOURCES)
+    find, _ = file.functions
+    assert plans(find) == [
+        ("id", "Int32", "int", "{value}", OWNERSHIP_VALUE),
+        ("exact", "Int32", "bool", "{value} ? 1 : 0", OWNERSHIP_VALUE),
+        ("name", "Pointer<Utf8>", "String", "{scratch}.encode({value})", OWNERSHIP_SCOPED),
+        ("mode", "Int32", "Mode", "ModeToInt({value})", OWNERSHIP_VALUE),
+        ("scale", "Pointer<Double>", "Pointer<Double>", "{value}", OWNERSHIP_BORROWED),
+    ]
+    assert (find.returns.api_type, find.returns.convert_out, find.returns.ownership_out) == ("Thing", "Thing.fromPointer({value})", OWNERSHIP_NATIVE)
+
+def test_plans_are_shared_per_type(lower_sources):
+    thing, file = lower_sources(SOURCES)
+    find, other = file.functions
+    assert find.params[0].plan is other.params[0].plan
+    # the receiver's planned like any other param, but isn't one of the params the Dart side passes
+    poke, = thing.classes[0].methods
+    assert poke.receiver is not None and poke.receiver.name == "struct_ptr"
+    assert [param.name for param in poke.params] == ["times"]
+    assert poke.params[0].plan is other.params[0].plan
+
+@pytest.mark.parametrize("source, message", [
+    ("void Draw(Nope* x)", "Cannot find type Nope"),
+    ("class Thing {\n    @Initializer()\n    void* InitThing()\n}\nvoid Draw(Thing x)", "Cannot pass class by value"),
+])
+def test_errors(lower_sources, source: str, message: str):
+    with pytest.raises(ValueError, match = re.escape(message)):
+        lower_sources({"Test.gen": source})
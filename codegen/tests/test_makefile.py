@@ -0,0 +1,29 @@
+from conftest import render
+import makefile
+
+def rule(out: str, target: str) -> list[str]:
+    lines = out.splitlines()
+    start = next(i for i, line in enumerate(lines) if line.startswith(f"{target}:"))
+    end = next((i for i in range(start + 1, len(lines)) if not lines[i].startswith("\t")), len(lines))
+    return lines[start:end]
+
+def test_libraries_link_object_files(repo_files):
+    out = render(makefile.codegen, repo_files)
+    link = rule(out, "$(BUILD_DIR)/native/SDL/libImage.so")
+    assert link[0].split(": ", 1)[1].split() == [
+        "$(BUILD_DIR)/obj/native/SDL/Image.o",
+        "$(BUILD_DIR)/obj/native/generated/Image.o",
+        "native/generated/Image.map",
+    ]
+    assert ".c" not in link[-1]
+
+def test_objects_write_depfiles(repo_files):
+    out = render(makefile.codegen, repo_files)
+    compile_ = rule(out, "$(BUILD_DIR)/obj/native/SDL/Image.o")
+    # only the source itself - the headers it includes come from the depfile
+    assert compile_[0] == "$(BUILD_DIR)/obj/native/SDL/Image.o: native/SDL/Image.c | codegen"
+    assert "-MMD -MP" in compile_[-1]
+
+    objects = [line.split(":", 1)[0] for line in out.splitlines() if line.startswith("$(BUILD_DIR)") and line.split(":", 1)[0].endswith(".o")]
+    depfiles = next(line for line in out.splitlines() if line.startswith("-include ")).split()[1:]
+    assert depfiles == [obj.removesuffix(".o") + ".d" for obj in objects]
@@ -0,0 +1,30 @@
+import re
+
+import pytest
+
+from lower import *
+
+def test_out_params(lower_sources):
+    file, = lower_sources({"Test.gen": "@Out()\nint Measure(char* text, int* width, double* height)"})
+    func, = file.functions
+    assert [param.name for param in func.outs] == ["width", "height"]
+    assert [param.name for param in func.api_params()] == ["text"]
+    assert [param.out.api_type for param in func.outs] == ["int", "double"]
+
+@pytest.mark.parametrize("source, message", [
+    ("@Out()\nvoid Measure(int w)", "doesn't have any int*, double*, bool* or enum pointer params"),
+    ("@Out()\nint Measure(int* value)", "can't have an out param called 'value'"),
+])
+def test_errors(lower_sources, source: str, message: str):
+    with pytest.raises(ValueError, match = re.escape(message)):
+        lower_sources({"Test.gen": source})
+
+def test_out_initializer_is_an_error(lower_sources):
+    with pytest.raises(ValueError, match = re.escape("InitThing is the @Initializer(), so it can't be @Out() as well")):
+        lower_sources({"Thing.gen": "class Thing {\n    @Initializer()\n    @Out()\n    void* InitThing(int* status)\n}"})
+
+def test_out_getter(lower_class_body):
+    class_ = lower_class_body("    @Getter(size)\n    @Out()\n    void GetSize(int* w, int* h)")
+    getter, = class_.methods
+    assert [param.name for param in getter.outs] == ["w", "h"]
+    assert len(getter.api_params()) == 0
@@ -0,0 +1,21 @@
+import os.path as path
+
+import pytest
+
+from conftest import REPO_ROOT, render
+from lower import *
+from paths import *
+import c
+import dart
+
+# the outputs that are committed have to be what codegen would write now, or a fresh checkout
+# doesn't build the same thing as one that's run codegen
+@pytest.mark.parametrize("output_path, codegen", [
+    (DART_OUTPUT_PATH, dart.codegen),
+    (C_OUTPUT_PATH, c.codegen),
+])
+def test_committed_outputs_are_up_to_date(repo_files, output_path: str, codegen):
+    lowered = lower_all(TypeLookup(repo_files))
+    with open(path.join(REPO_ROOT, output_path), "rt", newline = "") as fh:
+        committed = fh.read()
+    assert render(codegen, lowered) == committed
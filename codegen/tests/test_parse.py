@@ -0,0 +1,96 @@
+import pytest
+
+from parse import *
+
+def test_function(parse_source):
+    parsed = parse_source("int Add(int a, double* b, int[count] xs, int count) // adds\n")
+    func, = parsed.functions
+    assert func.name == "Add"
+    assert func.return_type == CodegenType.of("int", False)
+    assert [(param.name, param.type_) for param in func.params] == [
+        ("a", CodegenType.of("int", False)),
+        ("b", CodegenType.of("double", True)),
+        ("xs", CodegenType.of("int", True, "count")),
+        ("count", CodegenType.of("int", False)),
+    ]
+
+def test_fixed_length_array(parse_source):
+    func, = parse_source("void Set(double[4] values)").functions
+    assert func.params[0].type_ == CodegenType.of("double", True, "4")
+
+def test_annotations_before_a_blank_line_are_the_files(parse_source):
+    parsed = parse_source(
+        "@LinkWithLib(SDL2)\n"
+        "\n"
+        "@Show(doIt)\n"
+        "void DoIt()\n"
+        "void Other()\n"
+    )
+    assert [(annotation.name, annotation.args) for annotation in parsed.annotations] == [("LinkWithLib", ("SDL2",))]
+    first, second = parsed.functions
+    assert first.annotations.get("Show").args == ("doIt",)
+    # annotations aren't carried past the function they're on
+    assert len(second.annotations) == 0
+
+def test_class(parse_source):
+    parsed = parse_source(
+        "class Thing {\n"
+        "    @Initializer()\n"
+        "    void* InitThing(char* name)\n"
+        "\n"
+        "    @Invalidates()\n"
+        "    void DestroyThing()\n"
+        "}"
+    )
+    class_, = parsed.classes
+    init, destroy = class_.methods
+    # methods get the struct pointer first, apart from the initializer, which makes it
+    assert [param.name for param in init.params] == ["name"]
+    assert [param.name for param in destroy.params] == ["struct_ptr"]
+    assert "Invalidates" in destroy.annotations
+
+def test_stray_semicolons_are_a_warning(parse_source, capsys):
+    parsed = parse_source("void A();\nenum E {\n    X;\n}\n")
+    assert [func.name for func in parsed.functions] == ["A"]
+    assert [value.name for value in parsed.enums[0].values] == ["X"]
+    assert capsys.readouterr().out.count("Semicolons are not required") == 2
+
+def test_warnings_are_kept(tmp_path):
+    fname = tmp_path / "Test.gen"
+    fname.write_text("void A();\n")
+    parser = Parser(str(fname))
+    parser.parse()
+    warning, = parser.warnings
+    assert f"{fname}:1:9" in warning
+    assert "Semicolons are not required" in warning
+
+@pytest.mark.parametrize("source, message", [
+    ("void A(int** x)", "Pointers to pointers aren't supported"),
+    ("void A(int x, int x)", "Duplicate parameter 'x'"),
+    ("@Show\nvoid A()", "Annotations must end with parentheses"),
+    ("@Show(a,)\nvoid A()", "Empty annotation argument"),
+    ("@Show(a\nvoid A()", "Expected ')'"),
+    ("void A(int[0] xs)", "at least one element"),
+    ("void A() void", "Expected the end of the line"),
+    ("class C {\n    @Invalidates()\n\n    void M()\n}", "Whitespace after annotations in a class"),
+    ("class C {\n    void M(int struct_ptr)\n}", "struct_ptr"),
+    ("class C {\n    void M()\n}", "must have a method annotated as @Initializer"),
+    ("void A(int $x)", "Unexpected character '$'"),
+])
+def test_errors(parse_source, capsys, source: str, message: str):
+    with pytest.raises(SystemExit):
+        parse_source(source)
+    output = capsys.readouterr().out
+    assert "Error" in output
+    assert message in output
+
+def test_error_points_at_the_token(parse_source, capsys, tmp_path):
+    with pytest.raises(SystemExit):
+        parse_source("void A()\nvoid B(int x, int x)\n")
+    output = capsys.readouterr().out
+    # the second x's param, starting from its type
+    assert f"{tmp_path / 'Test.gen'}:2:15" in output
+
+def test_unsupported_annotation_warns(parse_source, capsys):
+    parse_source("@Getter(x)\nvoid A()")
+    assert "not supported on objects of type" in capsys.readouterr().out
@@ -0,0 +1,14 @@
+from lower import *
+
+def test_profiled_symbols(lower_sources):
+    sources = {"Test.gen": "@Profile()\nvoid A()\nvoid B()"}
+    file, = lower_sources(sources)
+    assert file.profiled == ("A",)
+    assert file.exported_symbols() == ["A", "B", "A_Profiled", "Test_ProfileRead"]
+    file, = lower_sources(sources, profile_all = True)
+    assert file.profiled == ("A", "B")
+
+def test_nothing_profiled(lower_sources):
+    file, = lower_sources({"Test.gen": "void A()"})
+    assert file.profiled == ()
+    assert file.exported_symbols() == ["A"]
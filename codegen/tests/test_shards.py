@@ -0,0 +1,54 @@
+import os.path as path
+
+from conftest import REPO_ROOT, render
+from deps import *
+from lower import *
+from paths import *
+import c
+import dart
+
+FONT = "class Font {\n    @Initializer()\n    void* InitFont()\n}"
+
+CANVAS = (
+    "enum Mode {\n"
+    "    Fill\n"
+    "    Outline\n"
+    "}\n"
+    "\n"
+    "class Canvas {\n"
+    "    @Initializer()\n"
+    "    void* InitCanvas()\n"
+    "\n"
+    "    void Text(Font* font, char* text)\n"
+    "}"
+)
+
+def test_c_shard_only_includes_enum_dependencies(lower_sources):
+    font, canvas, painter = lower_sources({
+        "Font.gen": FONT,
+        "Canvas.gen": CANVAS,
+        "Painter.gen": "void Paint(Canvas* canvas, Mode mode)",
+    })
+    deps = FileDeps(TypeLookup([font.file, canvas.file, painter.file]))
+    out = render(c.codegen_shard, painter, deps)
+    assert f'#include "{canvas.file.c_shard_path()}"' in out
+    assert font.file.c_shard_path() not in out
+    # ...but the Dart one imports everything whose types it uses
+    dart_out = render(dart.codegen_shard, painter, deps)
+    assert "import 'libCanvas.dart';" in dart_out
+    assert "libFont.dart" not in dart_out
+
+def test_forwarders(parse_source):
+    file = parse_source("void A()", "Thing.gen")
+    assert render(c.codegen_forwarder).endswith(f'#include "{C_OUTPUT_PATH}"')
+    assert render(dart.codegen_forwarder, file).endswith("export '../dart_codegen.dart';\n")
+
+# the hand-written code imports these, so they're committed & have to be what unsharded codegen writes
+def test_committed_forwarders_are_up_to_date(repo_files):
+    for file in repo_files:
+        for shard_path, expected in [
+            (file.dart_shard_path(), render(dart.codegen_forwarder, file)),
+            (file.c_shard_path(), render(c.codegen_forwarder)),
+        ]:
+            with open(path.join(REPO_ROOT, shard_path), "rt", newline = "") as fh:
+                assert fh.read() == expected, shard_path
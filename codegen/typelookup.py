@@ -1,20 +1,51 @@
 from codegen_types import *
+from dataclasses import dataclass
+from typing import Optional, Union
 
+# symbol kinds
+ENUM = "enum"
+CLASS = "class"
+
+@dataclass
+class Symbol:
+    kind: str
+    # the file which declares it
+    file: ParsedGenFile
+    decl: Union[CodegenEnum, CodegenClass]
+
+# Every enum & class across all the .gen files, by name. Built once per run and shared by
+# all the backends - the Dart backend asks about every single param, so this has to be cheap.
 class TypeLookup:
     def __init__(self, files: list[ParsedGenFile]):
-        self.enums: list[str] = []
-        self.classes: list[str] = []
-        
+        self.files = files
+        self.symbols: dict[str, Symbol] = {}
+
         for file in files:
             for enum in file.enums:
-                self.enums.append(enum.name)
+                self.add(Symbol(ENUM, file, enum))
             for class_ in file.classes:
-                self.classes.append(class_.name)
-        
+                self.add(Symbol(CLASS, file, class_))
+
+    # enums & classes all end up at the top level of the Dart output (& enums in the C
+    # header), so two of anything with the same name is an error, even if they're different kinds
+    def add(self, symbol: Symbol):
+        existing = self.symbols.get(symbol.decl.name)
+        if existing is not None:
+            raise ValueError(
+                f"{symbol.kind} {symbol.decl.name} in {symbol.file.name} has the same name as " +
+                f"{existing.kind} {existing.decl.name} in {existing.file.name}"
+            )
+        self.symbols[symbol.decl.name] = symbol
+
+    def get(self, typename: str) -> Optional[Symbol]:
+        return self.symbols.get(typename)
+
     def is_enum(self, typename: str) -> bool:
-        return typename in self.enums
+        symbol = self.symbols.get(typename)
+        return symbol is not None and symbol.kind == ENUM
     def is_class(self, typename: str) -> bool:
-        return typename in self.classes
+        symbol = self.symbols.get(typename)
+        return symbol is not None and symbol.kind == CLASS
     
     def exists(self, typename: str) -> bool:
-        return self.is_enum(typename) or self.is_class(typename)
+        return typename in self.symbols
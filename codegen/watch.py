@@ -0,0 +1,110 @@
+import os
+import os.path as path
+import time
+from typing import Callable
+from termcolor import colored
+
+from codegen_types import *
+from cache import *
+
+# --watch: keeps the parsed .gen files in memory & regenerates whenever one changes, so each
+# regeneration only pays for parsing what actually changed, & lowering & rendering - not for
+# starting Python, importing everything & loading the parse cache. Polls rather than using
+# inotify or similar, so it works anywhere & doesn't need anything installed.
+
+DEFAULT_POLL_INTERVAL_MS = 50
+# editors often save in a few steps (write a temp file, rename, touch...), & "save all" saves a few
+# files at once - anything that happens within this long of the last change is one regeneration
+DEFAULT_DEBOUNCE_MS = 100
+
+# gen file path -> (mtime in ns, size)
+Snapshot = dict[str, tuple[int, int]]
+
+def snapshot(fnames: list[str]) -> Snapshot:
+    out: Snapshot = {}
+    for fname in fnames:
+        try:
+            stat = os.stat(fname)
+        except FileNotFoundError:
+            # deleted between being listed & being looked at
+            continue
+        out[fname] = (stat.st_mtime_ns, stat.st_size)
+    return out
+
+def changed_files(before: Snapshot, after: Snapshot) -> set[str]:
+    return {fname for fname in before.keys() | after.keys() if before.get(fname) != after.get(fname)}
+
+def milliseconds(seconds: float) -> str:
+    return f"{seconds * 1000:.1f}ms"
+
+# Blocks until ctrl+c. regenerate gets every parsed file & the paths of the ones that changed,
+# returns how many outputs it rendered, & raises ValueError if the files don't make sense together.
+def watch(
+    cache: ParseCache,
+    parsed_files: list[ParsedGenFile],
+    list_files: Callable[[], list[str]],
+    regenerate: Callable[[list[ParsedGenFile], set[str]], int],
+    poll_interval: float,
+    debounce: float
+):
+    files = {file.name: file for file in parsed_files}
+    seen = snapshot(list_files())
+    print(f"Watching {len(seen)} .gen files for changes - ctrl+c to stop")
+
+    try:
+        while True:
+            time.sleep(poll_interval)
+            latest = snapshot(list_files())
+            if latest == seen: continue
+
+            # wait for the burst of changes to die down
+            snapshots = 1
+            last_change = time.perf_counter()
+            while time.perf_counter() - last_change < debounce:
+                time.sleep(poll_interval)
+                current = snapshot(list_files())
+                if current != latest:
+                    latest = current
+                    snapshots += 1
+                    last_change = time.perf_counter()
+
+            changed = changed_files(seen, latest)
+            seen = latest
+            rebuild(cache, files, changed, regenerate, last_change, snapshots)
+    except KeyboardInterrupt:
+        print("Stopped watching")
+
+def rebuild(
+    cache: ParseCache,
+    files: dict[str, ParsedGenFile],
+    changed: set[str],
+    regenerate: Callable[[list[ParsedGenFile], set[str]], int],
+    last_change: float,
+    snapshots: int
+):
+    start = time.perf_counter()
+    try:
+        for fname in sorted(changed):
+            if path.exists(fname):
+                files[fname] = cache.parse(fname)
+            else:
+                files.pop(fname, None)
+                cache.forget(fname)
+        outputs = regenerate([files[fname] for fname in sorted(files)], changed)
+    except SystemExit:
+        # the parser's already said what's wrong with it
+        print(colored("Not regenerating until that's fixed", 'red'))
+        return
+    except ValueError as e:
+        print(colored(f"Error: {e}", 'red'))
+        return
+    end = time.perf_counter()
+
+    cache.save()
+
+    what = next(iter(changed)) if len(changed) == 1 else f"{len(changed)} files"
+    coalesced = f", {snapshots} changes coalesced" if snapshots > 1 else ""
+    print(
+        f"{what} changed - rendered {outputs} outputs in {milliseconds(end - start)}, " +
+        f"{milliseconds(end - last_change)} after the last change was seen{coalesced}"
+    )
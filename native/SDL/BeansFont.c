@@ -1,5 +1,4 @@
 #include <SDL2/SDL_ttf.h>
-#include "native/c_codegen.h"
 #include "BeansFont.h"
 
 void PrintFont(BeansFont* bf) {
@@ -42,12 +41,4 @@ int GetTextHeight(BeansFont* bf, char* text) {
     int height;
     GetTextSize(bf, text, NULL, &height);
     return height;
-}
-
-char* BFGetName(BeansFont* bf) {
-    return bf->name;
-}
-
-int BFGetSize(BeansFont* bf) {
-    return bf->size;
 }
\ No newline at end of file
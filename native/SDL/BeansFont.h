@@ -1,8 +1,5 @@
 #pragma once
 #include <SDL2/SDL_ttf.h>
 
-typedef struct {
-    char* name;
-    int size;
-    TTF_Font* font;
-} BeansFont;
\ No newline at end of file
+// the BeansFont struct is generated from BeansFont.gen - font is a TTF_Font*
+#include "native/codegen/BeansFont.h"
\ No newline at end of file
@@ -1,6 +1,29 @@
 #include <SDL2/SDL.h>
 
-#include "native/c_codegen.h"
+#include "native/codegen/Event.h"
+
+// Event.gen gives these enums SDL's own values, so anything SDL says that we know about can be
+// returned as it is. If SDL ever renumbers anything, these'll stop it compiling.
+_Static_assert(SDLEventType_Quit == SDL_QUIT, "SDLEventType_Quit");
+_Static_assert(SDLEventType_LowMemory == SDL_APP_LOWMEMORY, "SDLEventType_LowMemory");
+_Static_assert(SDLEventType_KeyDown == SDL_KEYDOWN, "SDLEventType_KeyDown");
+_Static_assert(SDLEventType_KeyUp == SDL_KEYUP, "SDLEventType_KeyUp");
+_Static_assert(SDLEventType_MouseMove == SDL_MOUSEMOTION, "SDLEventType_MouseMove");
+_Static_assert(SDLEventType_MouseDown == SDL_MOUSEBUTTONDOWN, "SDLEventType_MouseDown");
+_Static_assert(SDLEventType_MouseUp == SDL_MOUSEBUTTONUP, "SDLEventType_MouseUp");
+_Static_assert(SDLEventType_MouseScroll == SDL_MOUSEWHEEL, "SDLEventType_MouseScroll");
+_Static_assert(SDLEventType_WindowEvent == SDL_WINDOWEVENT, "SDLEventType_WindowEvent");
+
+_Static_assert(WindowEventType_Minimized == SDL_WINDOWEVENT_MINIMIZED, "WindowEventType_Minimized");
+_Static_assert(WindowEventType_Restored == SDL_WINDOWEVENT_RESTORED, "WindowEventType_Restored");
+_Static_assert(WindowEventType_FocusGained == SDL_WINDOWEVENT_FOCUS_GAINED, "WindowEventType_FocusGained");
+_Static_assert(WindowEventType_FocusLost == SDL_WINDOWEVENT_FOCUS_LOST, "WindowEventType_FocusLost");
+_Static_assert(WindowEventType_SizeChanged == SDL_WINDOWEVENT_SIZE_CHANGED, "WindowEventType_SizeChanged");
+_Static_assert(WindowEventType_Moved == SDL_WINDOWEVENT_MOVED, "WindowEventType_Moved");
+
+_Static_assert(MouseButton_Left == SDL_BUTTON_LEFT, "MouseButton_Left");
+_Static_assert(MouseButton_Middle == SDL_BUTTON_MIDDLE, "MouseButton_Middle");
+_Static_assert(MouseButton_Right == SDL_BUTTON_RIGHT, "MouseButton_Right");
 
 SDL_Event* CreateEvent() {
     return malloc(sizeof(SDL_Event));
@@ -16,30 +39,32 @@ int Poll(SDL_Event* event) {
 
 SDLEventType GetEventType(SDL_Event* event) {
     switch (event->type) {
-        case SDL_QUIT:            return SDLEventType_Quit;
-        case SDL_APP_LOWMEMORY:   return SDLEventType_LowMemory;
-        case SDL_KEYDOWN:         return SDLEventType_KeyDown;
-        case SDL_KEYUP:           return SDLEventType_KeyUp;
-        case SDL_MOUSEMOTION:     return SDLEventType_MouseMove;
-        case SDL_MOUSEBUTTONDOWN: return SDLEventType_MouseDown;
-        case SDL_MOUSEBUTTONUP:   return SDLEventType_MouseUp;
-        case SDL_MOUSEWHEEL:      return SDLEventType_MouseScroll;
-        case SDL_WINDOWEVENT:     return SDLEventType_WindowEvent;
+        case SDL_QUIT:
+        case SDL_APP_LOWMEMORY:
+        case SDL_KEYDOWN:
+        case SDL_KEYUP:
+        case SDL_MOUSEMOTION:
+        case SDL_MOUSEBUTTONDOWN:
+        case SDL_MOUSEBUTTONUP:
+        case SDL_MOUSEWHEEL:
+        case SDL_WINDOWEVENT:
+            return event->type;
         
-        default:                  return SDLEventType_Unknown;
+        default: return SDLEventType_Unknown;
     }
 }
 
 WindowEventType GetWindowEventData(SDL_Event* event) {
     switch (event->window.event) {
-        case SDL_WINDOWEVENT_MINIMIZED:    return WindowEventType_Minimized;
-        case SDL_WINDOWEVENT_RESTORED:     return WindowEventType_Restored;
-        case SDL_WINDOWEVENT_FOCUS_GAINED: return WindowEventType_FocusGained;
-        case SDL_WINDOWEVENT_FOCUS_LOST:   return WindowEventType_FocusLost;
-        case SDL_WINDOWEVENT_SIZE_CHANGED: return WindowEventType_SizeChanged;
-        case SDL_WINDOWEVENT_MOVED:        return WindowEventType_Moved;
-
-        default:                           return WindowEventType_Unknown;
+        case SDL_WINDOWEVENT_MINIMIZED:
+        case SDL_WINDOWEVENT_RESTORED:
+        case SDL_WINDOWEVENT_FOCUS_GAINED:
+        case SDL_WINDOWEVENT_FOCUS_LOST:
+        case SDL_WINDOWEVENT_SIZE_CHANGED:
+        case SDL_WINDOWEVENT_MOVED:
+            return event->window.event;
+
+        default: return WindowEventType_Unknown;
     }
 }
 
@@ -52,11 +77,12 @@ MouseButton GetMousePressReleaseData(SDL_Event* event, int* x, int* y) {
     *x = event->button.x;
     *y = event->button.y;
     switch (event->button.button) {
-        case SDL_BUTTON_LEFT:   return MouseButton_Left;
-        case SDL_BUTTON_MIDDLE: return MouseButton_Middle;
-        case SDL_BUTTON_RIGHT:  return MouseButton_Right;
+        case SDL_BUTTON_LEFT:
+        case SDL_BUTTON_MIDDLE:
+        case SDL_BUTTON_RIGHT:
+            return event->button.button;
         
-        default:                return MouseButton_Unknown;
+        default: return MouseButton_Unknown;
     }
 }
 
@@ -195,4 +221,47 @@ KeyCode GetKeyPressReleaseData(SDL_Event* event) {
         default: return KeyCode_Unknown;
     }
 
-}
\ No newline at end of file
+}
+
+// How many ints each record Drain writes takes up - EventQueue.recordInts in bin/EventQueue.dart
+// has to match.
+#define EVENT_RECORD_INTS 4
+
+// Copies as many waiting events as fit into records, & returns how many that was. Each record
+// is the SDLEventType, then whatever goes with it:
+//   - KeyDown/KeyUp:       the KeyCode
+//   - MouseMove:           x, y
+//   - MouseDown/MouseUp:   x, y, the MouseButton
+//   - WindowEvent:         the WindowEventType
+// & anything that isn't used is 0.
+int Drain(SDL_Event* event, int* records, int length) {
+    int capacity = length / EVENT_RECORD_INTS;
+    int count = 0;
+    while (count < capacity && SDL_PollEvent(event)) {
+        int* record = records + count * EVENT_RECORD_INTS;
+        record[0] = GetEventType(event);
+        record[1] = 0;
+        record[2] = 0;
+        record[3] = 0;
+
+        switch (record[0]) {
+            case SDLEventType_KeyDown:
+            case SDLEventType_KeyUp:
+                record[1] = GetKeyPressReleaseData(event);
+                break;
+            case SDLEventType_MouseMove:
+                GetMouseMoveData(event, &record[1], &record[2]);
+                break;
+            case SDLEventType_MouseDown:
+            case SDLEventType_MouseUp:
+                record[3] = GetMousePressReleaseData(event, &record[1], &record[2]);
+                break;
+            case SDLEventType_WindowEvent:
+                record[1] = GetWindowEventData(event);
+                break;
+        }
+
+        count++;
+    }
+    return count;
+}
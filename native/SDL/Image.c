@@ -21,12 +21,4 @@ Image* InitImage(RenderWindow* rw, char* fname) {
 void DestroyImage(Image* image) {
     SDL_DestroyTexture(image->imageTexture);
     free(image);
-}
-
-int ImageGetWidth(Image* image) {
-    return image->width;
-}
-
-int ImageGetHeight(Image* image) {
-    return image->height;
 }
\ No newline at end of file
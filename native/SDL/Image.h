@@ -2,9 +2,5 @@
 
 #include <SDL2/SDL.h>
 
-typedef struct {
-    SDL_Texture* imageTexture;
-    
-    int width;
-    int height;
-} Image;
\ No newline at end of file
+// the Image struct is generated from Image.gen - imageTexture is an SDL_Texture*
+#include "native/codegen/Image.h"
\ No newline at end of file
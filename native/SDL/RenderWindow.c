@@ -2,7 +2,6 @@
 #include <SDL2/SDL_ttf.h>
 
 #include "RenderWindow.h"
-#include "native/c_codegen.h"
 #include "BeansFont.h"
 #include "Image.h"
 
@@ -134,6 +133,12 @@ void DrawPoint(RenderWindow* rw, int x, int y) {
     SDL_RenderDrawPoint(rw->ren, x, y);
 }
 
+void DrawPoints(RenderWindow* rw, int* xs, int* ys, int count) {
+    for (int i = 0; i < count; i++) {
+        SDL_RenderDrawPoint(rw->ren, xs[i], ys[i]);
+    }
+}
+
 void DrawLine(RenderWindow* rw, int x1, int y1, int x2, int y2) {
     SDL_RenderDrawLine(rw->ren, x1, y1, x2, y2);
 }
@@ -2,7 +2,7 @@
 
 #include <SDL2/SDL.h>
 
-#include "native/c_codegen.h"
+#include "native/codegen/RenderWindow.h"
 
 typedef struct {
     SDL_Cursor* arrow;
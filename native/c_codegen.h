@@ -1,63 +1,47 @@
 #ifndef C_CODEGEN_H
 #define C_CODEGEN_H
 
+// for offsetof & uint8_t
+#include <stddef.h>
+#include <stdint.h>
+
 // old-style booleans for Dart compatibility
 typedef int BOOL;
 #define TRUE 1
 #define FALSE 0
 
-// ----------NATIVE/SDL/RENDERWINDOW.GEN----------
-
-typedef enum {
-    SDLInitCode_Success = 0,
-    SDLInitCode_InitVideo_Fail = 1,
-    SDLInitCode_TTF_Init_Fail = 2,
-    SDLInitCode_CreateWindow_Fail = 3,
-    SDLInitCode_CreateRenderer_Fail = 4,
-} SDLInitCode;
-
-typedef enum {
-    Cursor_Arrow = 0,
-    Cursor_Hand = 1,
-    Cursor_SizeAll = 2,
-    Cursor_SizeVertical = 3,
-    Cursor_SizeHorizontal = 4,
-} Cursor;
-
 // ----------NATIVE/SDL/BEANSFONT.GEN----------
 
-// ----------NATIVE/SDL/IMAGE.GEN----------
-
 // ----------NATIVE/SDL/EVENT.GEN----------
 
 typedef enum {
-    SDLEventType_Quit = 0,
-    SDLEventType_LowMemory = 1,
-    SDLEventType_KeyDown = 2,
-    SDLEventType_KeyUp = 3,
-    SDLEventType_MouseMove = 4,
-    SDLEventType_MouseDown = 5,
-    SDLEventType_MouseUp = 6,
-    SDLEventType_MouseScroll = 7,
-    SDLEventType_WindowEvent = 8,
-    SDLEventType_Unknown = 9,
+    SDLEventType_Quit = 256,
+    SDLEventType_LowMemory = 258,
+    SDLEventType_KeyDown = 768,
+    SDLEventType_KeyUp = 769,
+    SDLEventType_MouseMove = 1024,
+    SDLEventType_MouseDown = 1025,
+    SDLEventType_MouseUp = 1026,
+    SDLEventType_MouseScroll = 1027,
+    SDLEventType_WindowEvent = 512,
+    SDLEventType_Unknown = 0,
 } SDLEventType;
 
 typedef enum {
-    WindowEventType_Minimized = 0,
-    WindowEventType_Restored = 1,
-    WindowEventType_FocusGained = 2,
-    WindowEventType_FocusLost = 3,
-    WindowEventType_SizeChanged = 4,
-    WindowEventType_Moved = 5,
-    WindowEventType_Unknown = 6,
+    WindowEventType_Minimized = 7,
+    WindowEventType_Restored = 9,
+    WindowEventType_FocusGained = 12,
+    WindowEventType_FocusLost = 13,
+    WindowEventType_SizeChanged = 6,
+    WindowEventType_Moved = 4,
+    WindowEventType_Unknown = 0,
 } WindowEventType;
 
 typedef enum {
-    MouseButton_Left = 0,
-    MouseButton_Middle = 1,
-    MouseButton_Right = 2,
-    MouseButton_Unknown = 3,
+    MouseButton_Left = 1,
+    MouseButton_Middle = 2,
+    MouseButton_Right = 3,
+    MouseButton_Unknown = 0,
 } MouseButton;
 
 typedef enum {
@@ -185,4 +169,48 @@ typedef enum {
     KeyCode_Unknown = 121,
 } KeyCode;
 
+// ----------NATIVE/SDL/IMAGE.GEN----------
+
+// ----------NATIVE/SDL/RENDERWINDOW.GEN----------
+
+typedef enum {
+    SDLInitCode_Success = 0,
+    SDLInitCode_InitVideo_Fail = 1,
+    SDLInitCode_TTF_Init_Fail = 2,
+    SDLInitCode_CreateWindow_Fail = 3,
+    SDLInitCode_CreateRenderer_Fail = 4,
+} SDLInitCode;
+
+typedef enum {
+    Cursor_Arrow = 0,
+    Cursor_Hand = 1,
+    Cursor_SizeAll = 2,
+    Cursor_SizeVertical = 3,
+    Cursor_SizeHorizontal = 4,
+} Cursor;
+
+// ----------NATIVE/SDL/BEANSFONT.GEN STRUCTS----------
+
+typedef struct {
+    char* name;
+    int size;
+    void* font;
+} BeansFont;
+_Static_assert(sizeof(BeansFont) == 24, "the generated Dart thinks BeansFont is 24 bytes");
+_Static_assert(offsetof(BeansFont, name) == 0, "the generated Dart thinks BeansFont.name is at 0");
+_Static_assert(offsetof(BeansFont, size) == 8, "the generated Dart thinks BeansFont.size is at 8");
+_Static_assert(offsetof(BeansFont, font) == 16, "the generated Dart thinks BeansFont.font is at 16");
+
+// ----------NATIVE/SDL/IMAGE.GEN STRUCTS----------
+
+typedef struct {
+    void* imageTexture;
+    int width;
+    int height;
+} Image;
+_Static_assert(sizeof(Image) == 16, "the generated Dart thinks Image is 16 bytes");
+_Static_assert(offsetof(Image, imageTexture) == 0, "the generated Dart thinks Image.imageTexture is at 0");
+_Static_assert(offsetof(Image, width) == 8, "the generated Dart thinks Image.width is at 8");
+_Static_assert(offsetof(Image, height) == 12, "the generated Dart thinks Image.height is at 12");
+
 #endif // C_CODEGEN_H
\ No newline at end of file
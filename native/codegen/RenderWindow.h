@@ -0,0 +1,2 @@
+// unsharded - everything's in here
+#include "native/c_codegen.h"
\ No newline at end of file
@@ -0,0 +1,37 @@
+// generated for native/SDL/BeansFont.gen
+
+#include <stdatomic.h>
+#include <stdint.h>
+#include <stdlib.h>
+#include <string.h>
+
+// ----------DEFERRED FINALIZERS----------
+
+typedef struct DeferredNode {
+    void* ptr;
+    struct DeferredNode* next;
+} DeferredNode;
+
+void DestroyFont(void* struct_ptr);
+static _Atomic(DeferredNode*) BeansFont_deferred = NULL;
+
+void BeansFont_DeferDestroy(void* struct_ptr) {
+    DeferredNode* node = malloc(sizeof(DeferredNode));
+    node->ptr = struct_ptr;
+    node->next = atomic_load(&BeansFont_deferred);
+    while (!atomic_compare_exchange_weak(&BeansFont_deferred, &node->next, node));
+}
+
+int BeansFont_DestroyDeferred(void) {
+    DeferredNode* node = atomic_exchange(&BeansFont_deferred, NULL);
+    int count = 0;
+    while (node != NULL) {
+        DeferredNode* next = node->next;
+        DestroyFont(node->ptr);
+        free(node);
+        node = next;
+        count++;
+    }
+    return count;
+}
+
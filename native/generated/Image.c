@@ -0,0 +1,37 @@
+// generated for native/SDL/Image.gen
+
+#include <stdatomic.h>
+#include <stdint.h>
+#include <stdlib.h>
+#include <string.h>
+
+// ----------DEFERRED FINALIZERS----------
+
+typedef struct DeferredNode {
+    void* ptr;
+    struct DeferredNode* next;
+} DeferredNode;
+
+void DestroyImage(void* struct_ptr);
+static _Atomic(DeferredNode*) Image_deferred = NULL;
+
+void Image_DeferDestroy(void* struct_ptr) {
+    DeferredNode* node = malloc(sizeof(DeferredNode));
+    node->ptr = struct_ptr;
+    node->next = atomic_load(&Image_deferred);
+    while (!atomic_compare_exchange_weak(&Image_deferred, &node->next, node));
+}
+
+int Image_DestroyDeferred(void) {
+    DeferredNode* node = atomic_exchange(&Image_deferred, NULL);
+    int count = 0;
+    while (node != NULL) {
+        DeferredNode* next = node->next;
+        DestroyImage(node->ptr);
+        free(node);
+        node = next;
+        count++;
+    }
+    return count;
+}
+
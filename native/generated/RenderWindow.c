@@ -0,0 +1,63 @@
+// generated for native/SDL/RenderWindow.gen
+
+#include <stdatomic.h>
+#include <stdint.h>
+#include <stdlib.h>
+#include <string.h>
+
+// ----------BATCHED CALLS----------
+
+void SetColour(void* struct_ptr, int r, int g, int b, int a);
+void DrawPoint(void* struct_ptr, int x, int y);
+void DrawLine(void* struct_ptr, int x1, int y1, int x2, int y2);
+void DrawRect(void* struct_ptr, int x, int y, int w, int h);
+void FillRect(void* struct_ptr, int x, int y, int w, int h);
+void DrawText(void* struct_ptr, void* font, char* text, int x, int y, int r, int g, int b, int a);
+void DrawImage(void* struct_ptr, void* image, int x, int y, double scale);
+
+static double slot_double(int64_t slot) {
+    double out;
+    memcpy(&out, &slot, sizeof(out));
+    return out;
+}
+
+void RenderWindow_RunBatch(void* struct_ptr, int64_t* commands, int length) {
+    int at = 0;
+    while (at < length) {
+        int64_t header = commands[at];
+        int64_t* args = commands + at + 1;
+        switch ((int)(header & 0xFFFFFFFF)) {
+            case 0: {
+                SetColour(struct_ptr, (int)args[0], (int)args[1], (int)args[2], (int)args[3]);
+                break;
+            }
+            case 1: {
+                DrawPoint(struct_ptr, (int)args[0], (int)args[1]);
+                break;
+            }
+            case 2: {
+                DrawLine(struct_ptr, (int)args[0], (int)args[1], (int)args[2], (int)args[3]);
+                break;
+            }
+            case 3: {
+                DrawRect(struct_ptr, (int)args[0], (int)args[1], (int)args[2], (int)args[3]);
+                break;
+            }
+            case 4: {
+                FillRect(struct_ptr, (int)args[0], (int)args[1], (int)args[2], (int)args[3]);
+                break;
+            }
+            case 5: {
+                char* string1 = (char*)(args + 8);
+                DrawText(struct_ptr, (void*)(intptr_t)args[0], string1, (int)args[2], (int)args[3], (int)args[4], (int)args[5], (int)args[6], (int)args[7]);
+                break;
+            }
+            case 6: {
+                DrawImage(struct_ptr, (void*)(intptr_t)args[0], (int)args[1], (int)args[2], slot_double(args[3]));
+                break;
+            }
+        }
+        at += (int)(header >> 32);
+    }
+}
+